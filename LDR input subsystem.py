@@ -1,6 +1,8 @@
 from pymata4 import pymata4 
 import time
+import calibration
 board = pymata4.Pymata4() 
+luxTable = calibration.LDR_lux_table() # raw reading -> lux, source: https://www.emant.com/316002.page (to calculate lux)
 
 def read_ldr_value(): 
     """
@@ -24,8 +26,7 @@ def read_ldr_value():
                 print("night")
             else:
                 print("day")
-            voltage = dataAverage*0.0048828125
-            lux = ((2500/voltage)-500/2) #source: https://www.emant.com/316002.page (to calculate lux)
+            lux = luxTable[round(dataAverage)] # lux of the second's average reading, the table only has whole ADC values so it's rounded first
             print(lux)
             readCount = 0
             
@@ -1,22 +1,14 @@
-from pymata4 import pymata4
-import time
-
-board = pymata4.Pymata4()
+import sonarping
 
 def sonar_reading():
     """
     Function that sets up the sonar tester and reads the hight values
+    This is the height mode of the sonar ping scheduler now (python sonarping.py --height), it needs the firmware/sonarping.h firmware
     """
     triggerPin = 7
     echoPin = 6
-   
-    board.set_pin_mode_sonar(triggerPin, echoPin, timeout=400000)
-    try:
-        while True:
-            data = board.sonar_read(triggerPin)
-            distance = data[0]  # this is the distance data only 
-            print(distance) # this prints the distance data from the Sonar sensor on the wood 
-            
 
-    except KeyboardInterrupt:
-        print("finished ")
+    sonarping.height_mode(triggerPin=triggerPin, echoPin=echoPin, maxRange=400) # prints the distance data from the Sonar sensor on the wood as it arrives, CTRL C to finish
+
+if __name__ == "__main__":
+    sonar_reading()
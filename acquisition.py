@@ -0,0 +1,165 @@
+# Acquisition script
+# This script collects sensor samples from pymata4 pin callbacks as they arrive, so the control loop doesn't have to poll for them.
+# Samples are kept by their timestamp, so a polled read of a value the board hasn't updated yet (the same sample again) is dropped instead of counted twice.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+from collections import deque
+import threading
+import time
+
+# pymata4 callback pin types
+DIGITAL_INPUT = 0
+ANALOG_INPUT = 2
+SONAR = 12
+
+sampleBufferSize = 256 # Max samples kept per sensor between drains, oldest are dropped past this
+
+_pinSensors = {} # (pin type, pin) -> sensor name
+_buffers = {} # sensor name -> deque of (timestamp, value)
+_latest = {} # sensor name -> (value, timestamp) of the last sample
+_sampleCounts = {} # sensor name -> new samples taken since the counts were last reset
+_countStart = {} # sensor name -> time.time() the counts were last reset
+_lock = threading.Lock() # pymata4 calls back from its reporter thread
+
+def register_sensor(name, pinType, pin):
+    """
+    Function to map a pin to a sensor name so its callback samples get buffered under that name.
+    Parameters:
+        name (sensor name, e.g. "sonar1")
+        pinType (DIGITAL_INPUT, ANALOG_INPUT or SONAR)
+        pin (pin number as pymata4 reports it, the trigger pin for sonars)
+    Returns:
+        callback (function to pass to the pymata4 set_pin_mode_* call)
+    """
+    _pinSensors[(pinType, pin)] = name
+    _buffers[name] = deque(maxlen=sampleBufferSize)
+    _sampleCounts[name] = 0
+    _countStart[name] = time.time()
+    return pin_callback
+
+def _add_sample(name, value, timestamp):
+    """
+    Stores a sample if it's newer than the last one for that sensor. Call with _lock held.
+    """
+    if not timestamp or timestamp <= _latest.get(name, (0, 0))[1]:
+        return False # Nothing reported yet, or a sample already taken
+    _buffers[name].append((timestamp, value))
+    _latest[name] = (value, timestamp)
+    _sampleCounts[name] += 1
+    return True
+
+def pin_callback(data):
+    """
+    pymata4 callback for every registered pin. Stores the timestamped sample.
+    Parameters:
+        data ([pin type, pin, value, timestamp])
+    Returns:
+        None
+    """
+    name = _pinSensors.get((data[0], data[1]))
+    if name is None:
+        return
+    with _lock:
+        _add_sample(name, data[2], data[3])
+
+def poll_sample(name, reading):
+    """
+    Function to take a polled read. pymata4's reads give the last value the board reported, so polling faster than it reports gives the same sample again, that's dropped.
+    Parameters:
+        name (sensor name)
+        reading ([value, timestamp] from a board read, e.g. board.analog_read(pin))
+    Returns:
+        new (True if it was a new sample)
+    """
+    with _lock:
+        return _add_sample(name, reading[0], reading[1])
+
+def latest(name):
+    """
+    Function to get the last sample received for a sensor.
+    Parameters:
+        name (sensor name)
+    Returns:
+        [value, timestamp] ([0, 0] if nothing has been received, like pymata4's reads)
+    """
+    value, timestamp = _latest.get(name, (0, 0))
+    return [value, timestamp]
+
+def drain(name):
+    """
+    Function to take all the samples a sensor has received since the last drain.
+    Parameters:
+        name (sensor name)
+    Returns:
+        samples (list of (timestamp, value), oldest first)
+    """
+    with _lock:
+        samples = list(_buffers[name])
+        _buffers[name].clear()
+    return samples
+
+def drain_mean(name, convert=None):
+    """
+    Function to get the mean of the samples a sensor has received since the last drain.
+    If none have arrived (pymata4 only calls back on a change) the last value is used.
+    Parameters:
+        name (sensor name)
+        convert (optional function applied to each raw value first, e.g. setup.thermistor_convert)
+    Returns:
+        mean value
+    """
+    samples = drain(name)
+    if not samples:
+        samples = [(0, latest(name)[0])]
+    total = 0
+    for timestamp, value in samples:
+        if convert is not None:
+            value = convert(value)
+        total += value
+    return total / len(samples)
+
+def freshness(name, now=None):
+    """
+    Function to get how old a sensor's newest sample is and how many new samples a second it has been getting.
+    Parameters:
+        name (sensor name)
+        now (time.time() to measure to, defaults to now)
+    Returns:
+        age (s since the newest sample, inf if there hasn't been one), sampleRate (new samples per s since the counts were reset)
+    """
+    if now is None:
+        now = time.time()
+    timestamp = _latest.get(name, (0, 0))[1]
+    age = now - timestamp if timestamp else float("inf")
+    return age, _sampleCounts[name] / max(now - _countStart[name], 1e-9)
+
+def reset_counts():
+    """
+    Function to restart every sensor's sample rate count.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    now = time.time()
+    with _lock:
+        for name in _sampleCounts:
+            _sampleCounts[name] = 0
+            _countStart[name] = now
+
+def freshness_lines():
+    """
+    Gets every sensor's freshness() as lines to print.
+    Parameters:
+        None
+    Returns:
+        lines (list of strings)
+    """
+    lines = []
+    for name in _sampleCounts:
+        age, sampleRate = freshness(name)
+        lines.append('{:<10}{:>7.1f} new samples/s, '.format(name, sampleRate) + ("newest {:.2f}s old".format(age) if age != float("inf") else "none yet"))
+    return lines
@@ -0,0 +1,190 @@
+# Adaptive timing script
+# This script decides when each stage ends from the approach sonar, the side road presence sensor and the pedestrian button, instead of the fixed trafficTimings.
+# Green stages (1 main road, 4 side road and pedestrians) run at least their minimum, are extended while vehicles keep arriving, end early (gap out) once
+# no vehicle has been seen on their approach for the gap time and another approach is waiting, and never go past their maximum (max out).
+# The main road rests in green while nothing else is waiting. Amber and all red stages keep their trafficTimings length, but never go under their minimum.
+# It also counts vehicles as they're detected so vehicles served per hour and average wait can be compared with the fixed plan over the same arrivals.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+MAIN = 0
+SIDE = 1
+greenStages = {1: MAIN, 4: SIDE} # Green stage -> approach it serves
+
+class AdaptiveTiming:
+    """
+    Vehicle actuated stage timing for one intersection. Keeps its own detector state and arrival/green history, stage_done() is called every loop.
+    """
+
+    def __init__(self, approachHistory, sideHistory, greenBounds, clearanceMinimums, gapSeconds, approachDetectDistance, sidePresenceDistance, startTime):
+        """
+        Parameters:
+            approachHistory (RingBuffer of main road approach sonar readings, in cm)
+            sideHistory (RingBuffer of side road presence sonar readings, in cm)
+            greenBounds (dict of green stage (1 or 4) -> (minimum, maximum) length in s)
+            clearanceMinimums (shortest length in s for each of the 6 stages, only used for the amber/all red ones)
+            gapSeconds (time without a detection on the green approach before it can gap out)
+            approachDetectDistance (approach readings under this count as a vehicle)
+            sidePresenceDistance (side readings under this count as a vehicle)
+            startTime (perf_counter time stage 1 started)
+        """
+        self.approachHistory = approachHistory
+        self.sideHistory = sideHistory
+        self.greenBounds = greenBounds
+        self.clearanceMinimums = clearanceMinimums
+        self.gapSeconds = gapSeconds
+        self.detectDistance = (approachDetectDistance, sidePresenceDistance)
+
+        self.startTime = startTime
+        self._lastAppendCount = [approachHistory.appendCount, sideHistory.appendCount]
+        self._detected = [False, False] # Whether each detector currently sees a vehicle
+        self._lastDetection = [startTime, startTime] # Last time each detector saw a vehicle
+        self._waiting = [False, False] # A vehicle has arrived since its approach last went green
+
+        self.arrivals = ([], []) # Arrival times for each approach
+        self.greens = ([[startTime, None]], []) # [start, end (None while green)] for each approach
+        self.gapOutCount = 0
+        self.maxOutCount = 0
+
+    def _observe(self, now):
+        """
+        Reads any new sonar readings, recording an arrival whenever a detector goes from empty to seeing a vehicle.
+        """
+        for approach, history in enumerate((self.approachHistory, self.sideHistory)):
+            if history.appendCount == self._lastAppendCount[approach]:
+                continue
+            self._lastAppendCount[approach] = history.appendCount
+            detected = history.newest < self.detectDistance[approach]
+            if detected:
+                self._lastDetection[approach] = now
+                if not self._detected[approach]:
+                    self.arrivals[approach].append(now)
+                    self._waiting[approach] = True
+            self._detected[approach] = detected
+
+    def stage_done(self, state, stageDuration, now):
+        """
+        Function to check if the current stage should end.
+        Parameters:
+            state (setup.state)
+            stageDuration (time in s since the stage started)
+            now (perf_counter time)
+        Returns:
+            stageOver (True/False)
+        """
+        self._observe(now)
+        curStage = state.curStage
+
+        # Amber and all red, as long as trafficTimings says but no shorter than the minimum
+        if curStage not in greenStages:
+            return stageDuration > max(state.trafficTimings[curStage-1], self.clearanceMinimums[curStage-1])
+
+        approach = greenStages[curStage]
+        minGreen, maxGreen = self.greenBounds[curStage]
+        if stageDuration < minGreen:
+            return False
+
+        # Is anyone waiting for the other green
+        if approach == MAIN:
+            otherWaiting = self._waiting[SIDE] or self._detected[SIDE] or state.pedButtonCount > 0
+        else:
+            otherWaiting = self._waiting[MAIN] or self._detected[MAIN]
+        if approach == MAIN and not otherWaiting:
+            return False # Rest in main road green
+
+        if stageDuration >= maxGreen:
+            self.maxOutCount += 1
+            return True
+        if now - self._lastDetection[approach] > self.gapSeconds and (otherWaiting or approach == SIDE):
+            self.gapOutCount += 1
+            return True
+        return False # Extend
+
+    def stage_started(self, curStage, now):
+        """
+        Function to record a new stage starting, for the green history.
+        Parameters:
+            curStage (stage that just started)
+            now (perf_counter time it started)
+        Returns:
+            None
+        """
+        for approach in (MAIN, SIDE):
+            if self.greens[approach] and self.greens[approach][-1][1] is None:
+                self.greens[approach][-1][1] = now
+        if curStage in greenStages:
+            approach = greenStages[curStage]
+            self.greens[approach].append([now, None])
+            self._waiting[approach] = False
+
+    def _adaptive_waits(self, approach, now):
+        """
+        Gets the wait of every arrival on an approach that has been served, from the actual green history.
+        """
+        waits = []
+        greens = self.greens[approach]
+        greenIndex = 0
+        for arrival in self.arrivals[approach]:
+            # Skip greens that had ended before this arrival (arrivals are in time order)
+            while greenIndex < len(greens) and greens[greenIndex][1] is not None and greens[greenIndex][1] <= arrival:
+                greenIndex += 1
+            if greenIndex == len(greens):
+                break # Not served yet
+            waits.append(max(0.0, greens[greenIndex][0] - arrival))
+        return waits
+
+    def _fixed_waits(self, approach, fixedPlan, now):
+        """
+        Gets the wait every arrival on an approach would have had if the fixed plan had been running from the same start time.
+        """
+        cycleLength = sum(fixedPlan)
+        greenStage = 1 if approach == MAIN else 4
+        greenStart = sum(fixedPlan[:greenStage-1])
+        greenEnd = greenStart + fixedPlan[greenStage-1]
+        waits = []
+        for arrival in self.arrivals[approach]:
+            phase = (arrival - self.startTime) % cycleLength
+            wait = 0.0 if greenStart <= phase < greenEnd else (greenStart - phase) % cycleLength
+            if arrival + wait <= now:
+                waits.append(wait)
+        return waits
+
+    def report(self, fixedPlan, now):
+        """
+        Function to compare this run with the fixed plan over the same arrivals.
+        Parameters:
+            fixedPlan (the 6 fixed stage lengths in s, e.g. setup.state.trafficTimingsDefault)
+            now (perf_counter time to report up to)
+        Returns:
+            results (dict of plan name (adaptive, fixed) -> dict of vehiclesPerHour, averageWait (s), served, waiting)
+        """
+        hours = max(now - self.startTime, 1e-9) / 3600
+        arrivalCount = len(self.arrivals[MAIN]) + len(self.arrivals[SIDE])
+        results = {}
+        for planName in ["adaptive", "fixed"]:
+            waits = []
+            for approach in (MAIN, SIDE):
+                waits += self._adaptive_waits(approach, now) if planName == "adaptive" else self._fixed_waits(approach, fixedPlan, now)
+            results[planName] = {
+                "vehiclesPerHour": len(waits) / hours,
+                "averageWait": sum(waits) / len(waits) if waits else 0.0,
+                "served": len(waits),
+                "waiting": arrivalCount - len(waits),
+            }
+        return results
+
+    def report_lines(self, fixedPlan, now):
+        """
+        Gets report() as lines to print.
+        Parameters:
+            fixedPlan (the 6 fixed stage lengths in s)
+            now (perf_counter time to report up to)
+        Returns:
+            lines (list of strings)
+        """
+        lines = ["Adaptive timing over " + str(round(now - self.startTime)) + "s: " + str(len(self.arrivals[MAIN])) + " main road and " + str(len(self.arrivals[SIDE])) + " side road vehicles, "
+                 + str(self.gapOutCount) + " gap outs, " + str(self.maxOutCount) + " max outs."]
+        for planName, result in self.report(fixedPlan, now).items():
+            lines.append('{:<9}{:>8.1f} vehicles/hour served, average wait {:.1f}s ({} still waiting)'.format(planName, result["vehiclesPerHour"], result["averageWait"], result["waiting"]))
+        return lines
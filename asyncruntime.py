@@ -0,0 +1,210 @@
+# Async runtime script
+# This script runs normal operation on asyncio (pymata-express), with stage tracking, display multiplexing, sensor polling,
+# pedestrian debounce and the maintenance lockout check as separate coroutines sharing one board connection.
+# The setup/outputstage/inputstage functions are reused as is, so stages and trafficTimings behave the same as main.py's normal operating mode.
+# Run with: python asyncruntime.py [com port]
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import asyncio
+import sys
+import time
+from pymata_express.pymata_express import PymataExpress
+from pymata4.private_constants import PrivateConstants
+
+# get required global variables, functions, etc
+import setup
+import outputstage
+import inputstage
+import displayrefresh
+import framecompiler
+import portwrite
+import sensorstore
+
+class AsyncBoardBridge:
+    """
+    pymata4 style (non async) front for a PymataExpress board, so setup/outputstage/inputstage can use it as setup.board.
+    Writes are queued and sent in order by writer(), reads come from values cached by the pin callbacks.
+    """
+
+    def __init__(self, expressBoard):
+        self.expressBoard = expressBoard
+        self._writeQueue = asyncio.Queue()
+        self._inputs = {} # (pin type, pin) -> [value, timestamp]
+
+    def _queue(self, methodName, *args, **kwargs):
+        self._writeQueue.put_nowait((methodName, args, kwargs))
+
+    def _input_callback(self, pinType, callback):
+        """
+        Makes the async pin callback that caches the value and passes it on to the (non async) callback from setup.
+        """
+        async def input_callback(data):
+            self._inputs[(pinType, data[1])] = [data[2], data[3]]
+            if callback is not None:
+                callback(data)
+        return input_callback
+
+    async def writer(self):
+        """
+        Coroutine which sends the queued writes to the board in order.
+        """
+        while True:
+            methodName, args, kwargs = await self._writeQueue.get()
+            try:
+                await getattr(self.expressBoard, methodName)(*args, **kwargs)
+            finally:
+                self._writeQueue.task_done()
+
+    async def drain(self):
+        """
+        Waits until everything queued so far has been sent.
+        """
+        await self._writeQueue.join()
+
+    # Writes, uses the same port shadow as pymata4 so the port/dirty check code sees the right pin levels
+    def digital_write(self, pin, value):
+        port = portwrite.set_pin(pin, value)
+        self._send_command((PrivateConstants.DIGITAL_MESSAGE + port, portwrite.portShadow[port] & 0x7f, (portwrite.portShadow[port] >> 7) & 0x7f))
+
+    def _send_command(self, command):
+        self._queue("_send_command", list(command))
+
+    def _send_sysex(self, sysexCommand, sysexData=None):
+        self._queue("_send_sysex", sysexCommand, sysexData)
+
+    def set_pin_mode_digital_output(self, pin):
+        self._queue("set_pin_mode_digital_output", pin)
+
+    def set_pin_mode_digital_input(self, pin, callback=None):
+        self._queue("set_pin_mode_digital_input", pin, callback=self._input_callback(PrivateConstants.INPUT, callback))
+
+    def set_pin_mode_analog_input(self, pin, callback=None):
+        self._queue("set_pin_mode_analog_input", pin, callback=self._input_callback(PrivateConstants.ANALOG, callback))
+
+    def set_pin_mode_sonar(self, triggerPin, echoPin, callback=None, timeout=80000):
+        self._queue("set_pin_mode_sonar", triggerPin, echoPin, callback=self._input_callback(PrivateConstants.SONAR, callback), timeout=timeout)
+
+    def enable_analog_reporting(self, pin):
+        self._queue("enable_analog_reporting", pin)
+
+    def disable_analog_reporting(self, pin):
+        self._queue("disable_analog_reporting", pin)
+
+    # Reads, from the callback cache
+    def digital_read(self, pin):
+        return self._inputs.get((PrivateConstants.INPUT, pin), [0, 0])
+
+    def analog_read(self, pin):
+        return self._inputs.get((PrivateConstants.ANALOG, pin), [0, 0])
+
+    def sonar_read(self, triggerPin):
+        return self._inputs.get((PrivateConstants.SONAR, triggerPin), [0, 0])
+
+async def periodic(period, job, stopEvent):
+    """
+    Coroutine which runs job every period seconds until stopEvent is set. Missed periods are skipped rather than run back to back.
+    """
+    nextRun = time.perf_counter()
+    while not stopEvent.is_set():
+        job()
+        nextRun += period
+        delay = nextRun - time.perf_counter()
+        if delay < 0:
+            nextRun = time.perf_counter()
+            delay = 0
+        await asyncio.sleep(delay)
+
+async def display_task(bridge, stopEvent):
+    """
+    Coroutine which multiplexes the 7 seg display, spreading the 4 digits evenly over each refresh period.
+    """
+    digitPeriod = 1.0 / (4 * setup.displayRefreshHz)
+    nextDigit = time.perf_counter()
+    while not stopEvent.is_set():
+        stringToDisplay, lightsInputArray, buzzerBit = displayrefresh.published()
+        stringScrollOffset = int(time.time()) % 5
+        for i in range(4):
+            frame = framecompiler.compile_frame(stringToDisplay, stringScrollOffset, i, lightsInputArray, buzzerBit)
+            outputstage.emit_frames(setup.state, [frame], 0, 2) # No stabilising sleeps, waiting for the writes to go out paces it instead
+            await bridge.drain()
+            nextDigit += digitPeriod
+            delay = nextDigit - time.perf_counter()
+            if delay < 0:
+                nextDigit = time.perf_counter()
+                delay = 0
+            await asyncio.sleep(delay)
+
+def pedestrian_check():
+    """
+    Pedestrian debounce job. Stage 4 (pedestrian green) doesn't track presses, same as stage_tracker.
+    """
+    if setup.state.curStage != 4:
+        outputstage.pedestrian_tracker(setup.state)
+
+async def run_normal_operation(comPort=None):
+    """
+    Connects to the board and runs normal operation until the maintenance lockout switch is closed.
+    Parameters:
+        comPort (serial port, or None to search for the Arduino)
+    Returns:
+        None
+    """
+    expressBoard = PymataExpress(com_port=comPort, baud_rate=500000, autostart=False, close_loop_on_shutdown=False)
+    await expressBoard.start_aio()
+    bridge = AsyncBoardBridge(expressBoard)
+    writerTask = asyncio.create_task(bridge.writer())
+
+    setup.connect_board(bridge)
+    setup.initialise()
+    await bridge.drain()
+
+    if setup.sensorLogEnabled:
+        sensorstore.start_store(setup.sensorLogDirectory, setup.sensorLogSegmentBytes)
+    outputstage.stage_tracker_reset(setup.state)
+    inputstage.sensor_reset()
+    displayrefresh.externalRefresh = True # stage_tracker only publishes the display state, display_task shows it
+
+    stopEvent = asyncio.Event()
+
+    def maintenance_check():
+        if bridge.digital_read(setup.maintLockoutPin)[0] == 1:
+            print("\nMaintenance lockout switch activated. Stopping normal operation...")
+            stopEvent.set()
+
+    print("\nStage 1: ")
+    tasks = [
+        asyncio.create_task(periodic(setup.normOpLoopTime, lambda: outputstage.stage_tracker(setup.state), stopEvent)),
+        asyncio.create_task(display_task(bridge, stopEvent)),
+        asyncio.create_task(periodic(0.25, inputstage.sensor_check, stopEvent)),
+        asyncio.create_task(periodic(5, inputstage.close_distance_print, stopEvent)),
+        asyncio.create_task(periodic(0.02, pedestrian_check, stopEvent)),
+        asyncio.create_task(periodic(0.05, maintenance_check, stopEvent)),
+    ]
+    stopWaiter = asyncio.create_task(stopEvent.wait())
+    try:
+        # Stop when asked to, or as soon as any of the tasks fails
+        done, pending = await asyncio.wait(tasks + [stopWaiter], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is not stopWaiter and task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks + [stopWaiter]:
+            task.cancel()
+        await asyncio.gather(*tasks, stopWaiter, return_exceptions=True)
+        displayrefresh.externalRefresh = False
+        sensorstore.stop_store()
+
+        # Clear shift register outputs and stop the buzzer before disconnecting
+        setup.shift_reg_reset()
+        await bridge.drain()
+        writerTask.cancel()
+        await expressBoard.shutdown()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_normal_operation(sys.argv[1] if len(sys.argv) > 1 else None))
+    except KeyboardInterrupt:
+        print("\nStopped.")
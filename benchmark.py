@@ -0,0 +1,431 @@
+# Benchmark script
+# This script measures the control loop and output stage against the virtual board (no Arduino needed) and saves the results as JSON.
+# Run with: python benchmark.py [--output results.json] [--baseline old.json] [--threshold 0.1] [--loop-seconds 10]
+# With --baseline, any metric more than threshold (as a fraction) worse than the baseline is reported and the exit code is 1.
+# All metrics are lower is better.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+import numpy as np
+
+# Everything below runs on the virtual board
+os.environ["BOARD_BACKEND"] = "virtual"
+
+# get required global variables, functions, etc
+import setup
+import outputstage
+import outputmanager
+import framecompiler
+import sensorstore
+import virtualboard
+import main
+from intersectionstate import IntersectionState
+
+outputModes = ["digital", "port", "sysex"]
+
+def fresh_board(realtime):
+    """
+    Function to swap in a new virtual board with the default sensor waveforms and re-initialise for it.
+    Parameters:
+        realtime (block writes to the simulated link speed)
+    Returns:
+        board (VirtualBoard)
+    """
+    if setup.board is not None:
+        setup.shutdown_board() # Stop the old board's reporter thread, it would take CPU time from the next benchmark
+    board = virtualboard.default_virtual_board()
+    board.realtime = realtime
+    setup.connect_board(board)
+    setup.initialise()
+    outputmanager.invalidate()
+    framecompiler.clear_frame_cache()
+    return board
+
+def set_output_state():
+    """
+    Function to set the display and light state the output functions read, as in stage 1.
+    """
+    setup.state.curStage = 1
+    setup.state.lightsInputArray = [0,0,1,1,0,0,1,0]
+    setup.state.stringToDisplay = "stg1 "
+
+def bench_output_messages(calls=50):
+    """
+    Function to measure the serial traffic of each output function, for each output mode with and without the dirty check.
+    Parameters:
+        calls (number of calls to average over)
+    Returns:
+        metrics (dict of metric name -> value)
+    """
+    outputFunctions = [
+        ("seven_seg_and_lights", lambda: outputstage.seven_seg_and_lights(setup.state), 4),
+        ("light_control", lambda: outputstage.light_control(setup.state), 1),
+        ("seven_seg_display", lambda: outputstage.seven_seg_display(setup.state), 4),
+        ("shift_reg_reset", setup.shift_reg_reset, 1),
+    ] # (name, function, frames per call)
+
+    metrics = {}
+    for outputMode in outputModes:
+        for dirtyCheck in [False, True]:
+            for name, function, framesPerCall in outputFunctions:
+                board = fresh_board(False)
+                setup.state.outputMode = outputMode
+                setup.state.outputDirtyCheck = dirtyCheck
+                set_output_state()
+                function() # First call fills the shift registers, so we measure the steady state
+
+                messagesBefore = board.messagesSent
+                bytesBefore = board.bytesSent
+                linkTimeBefore = board.linkBusyTime
+                for _ in range(calls):
+                    function()
+                prefix = "output." + outputMode + (".dirtycheck." if dirtyCheck else ".") + name
+                metrics[prefix + ".messages_per_frame"] = (board.messagesSent - messagesBefore) / (calls * framesPerCall)
+                metrics[prefix + ".bytes_per_frame"] = (board.bytesSent - bytesBefore) / (calls * framesPerCall)
+                metrics[prefix + ".link_ms_per_call"] = (board.linkBusyTime - linkTimeBefore) * 1000 / calls
+    return metrics
+
+def bench_normal_operation(loopSeconds=10, stageSeconds=1):
+    """
+    Function to run main.normal_operating_mode on a realtime virtual board and measure the loop period and stage transition latency.
+    The maintenance switch is closed after loopSeconds to end it.
+    Parameters:
+        loopSeconds (how long to run normal operation for)
+        stageSeconds (length of every stage, shorter than normal so there are transitions to measure)
+    Returns:
+        metrics (dict of metric name -> value)
+    """
+    board = fresh_board(True)
+    setup.state.trafficTimingsDefault = [stageSeconds] * 6
+    setup.state.trafficTimings = [stageSeconds] * 6
+    board.set_waveform("digital", setup.maintLockoutPin, lambda t, endTime=time.perf_counter() - board.startTime + loopSeconds: 1 if t > endTime else 0)
+
+    loopTimes = []
+    transitionLatencies = []
+    stageTracker = outputstage.stage_tracker
+    def timed_stage_tracker(state):
+        loopTimes.append(time.perf_counter())
+        previousStage = state.curStage
+        dueTime = state.stageStart + state.trafficTimings[previousStage-1]
+        stageTracker(state)
+        if state.curStage != previousStage:
+            transitionLatencies.append(state.stageStart - dueTime)
+
+    outputstage.stage_tracker = timed_stage_tracker
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as sensorLogDirectory:
+            setup.sensorLogDirectory = sensorLogDirectory # Keep the sensor log writing (as it would) but out of the way
+            main.normal_operating_mode()
+            sensorstore.stop_store()
+    finally:
+        outputstage.stage_tracker = stageTracker
+
+    loopPeriods = np.diff(loopTimes) * 1000
+    metrics = {}
+    for percentile in [50, 90, 99]:
+        metrics["loop.period_ms.p" + str(percentile)] = float(np.percentile(loopPeriods, percentile))
+    metrics["loop.period_ms.max"] = float(loopPeriods.max())
+    if transitionLatencies:
+        metrics["stage.transition_latency_ms.mean"] = float(np.mean(transitionLatencies)) * 1000
+        metrics["stage.transition_latency_ms.max"] = float(np.max(transitionLatencies)) * 1000
+    return metrics
+
+def bench_sensor_reads(samples=5000):
+    """
+    Function to measure the Python side cost of one thermistor and LDR sample.
+    Parameters:
+        samples (number of reads to average over)
+    Returns:
+        metrics (dict of metric name -> value)
+    """
+    fresh_board(False)
+    metrics = {}
+    for name, function in [("thermistor_read", setup.thermistor_read), ("LDR_read", setup.LDR_read)]:
+        startTime = time.perf_counter()
+        for _ in range(samples):
+            function()
+        metrics["sensor." + name + ".us_per_sample"] = (time.perf_counter() - startTime) * 1e6 / samples
+    return metrics
+
+# Stands in for the setup module in the global lookup version of the hot path below
+globalState = types.ModuleType("globalState")
+
+# The old hot path kept these as module globals (outputstage's) instead of passing them around
+lightsInputArray = [0,0,1,1,0,0,1,0]
+stringToDisplay = "     "
+outputTime = time # outputstage's time module, swapped along with it for one that doesn't sleep while the hot path is timed
+stageBranchTime = outputstage.stageBranchTime
+stageDurationError = outputstage.stageDurationError
+stageLastDuration = outputstage.stageLastDuration
+pedestrianPresses = outputstage.pedestrianPresses
+
+def _global_stage_tracker():
+    """
+    stage_tracker as it was before IntersectionState, with every value a globalState attribute. Only the branches the benchmark reaches are kept,
+    and the newest thermistor reading is read the same way as now so only where the values are looked up differs.
+    """
+    global lightsInputArray
+
+    # Check if we need to iterate stage number
+    if outputTime.perf_counter() - globalState.stageStart > globalState.trafficTimings[globalState.curStage-1]:
+        stageDuration = outputTime.perf_counter() - globalState.stageStart
+        stageLastDuration[globalState.curStage-1].set(stageDuration)
+        stageDurationError[globalState.curStage-1].observe(stageDuration - globalState.trafficTimings[globalState.curStage-1])
+
+        globalState.trafficTimings = globalState.trafficTimingsBuffer
+
+        globalState.thermistorTimingAdded = False
+        globalState.LDRTimingAdded = False
+        globalState.trafficTimingsBuffer = globalState.trafficTimingsDefault.copy()
+
+        globalState.curStage = (globalState.curStage + 1)
+        if globalState.curStage == 7:
+            globalState.curStage = 1
+
+        globalState.stageStart = outputTime.perf_counter()
+        sensorstore.record(sensorstore.STAGE, globalState.curStage)
+
+    # Check LDR and set new timings if needed
+    if globalState.dayNightStatus == "night" and globalState.LDRTimingAdded != True:
+        globalState.trafficTimingsBuffer[0] = 45
+        globalState.trafficTimingsBuffer[3] = 10
+        globalState.LDRTimingAdded = True
+
+    # Check temperature and set new timings if needed
+    if globalState.pastThermReading.newest > 35 and globalState.thermistorTimingAdded != True:
+        globalState.trafficTimingsBuffer[0] = globalState.trafficTimingsBuffer[0] + 5
+        globalState.trafficTimingsBuffer[3] = globalState.trafficTimingsBuffer[3] + 5
+        globalState.thermistorTimingAdded = True
+
+    branchStart = outputTime.perf_counter()
+
+    # Stage 1 check
+    if globalState.curStage == 1:
+        lightsInputArray = [0,0,1,1,0,0,1,0]
+
+        _global_seven_seg_string_set()
+        _global_pedestrian_tracker()
+        _global_seven_seg_and_lights()
+
+    stageBranchTime[globalState.curStage-1].observe(outputTime.perf_counter() - branchStart)
+
+def _global_seven_seg_string_set():
+    """
+    seven_seg_string_set as it was before IntersectionState (the modes the benchmark uses).
+    """
+    global stringToDisplay
+
+    if globalState.sevenSegMode == "custom":
+        stringToDisplay = globalState.customSevenSegString + " "
+    elif globalState.sevenSegMode == "stage":
+        stringToDisplay = "stg" + str(globalState.curStage) + " "
+
+def _global_pedestrian_tracker():
+    """
+    pedestrian_tracker as it was before IntersectionState (poll mode).
+    """
+    _global_pedestrian_button_update(globalState.board.digital_read(globalState.pedButtonPin)[0], outputTime.perf_counter())
+
+def _global_pedestrian_button_update(buttonValue, curTime):
+    """
+    pedestrian_button_update as it was before IntersectionState.
+    """
+    if buttonValue == 1 and curTime > globalState.lastPedButtonPress + 0.5 and globalState.pedButtonDown == False:
+        globalState.lastPedButtonPress = curTime
+        globalState.pedButtonCount += 1
+        pedestrianPresses.inc()
+        sensorstore.record(sensorstore.PED_BUTTON, 1)
+        globalState.pedButtonDown = True
+    elif buttonValue == 0 and curTime > globalState.lastPedButtonPress + 0.1 and globalState.pedButtonDown == True:
+        globalState.pedButtonDown = False
+        sensorstore.record(sensorstore.PED_BUTTON, 0)
+
+def _global_seven_seg_and_lights():
+    """
+    seven_seg_and_lights as it was before IntersectionState (without the display refresh thread).
+    """
+    buzzerBit = 1 if globalState.curStage == 4 else 0
+    stringScrollOffset = int(outputTime.time()) % 5
+    subWait = 0.0007
+    frames = [framecompiler.compile_frame(stringToDisplay, stringScrollOffset, i, lightsInputArray, buzzerBit) for i in range(4)]
+    _global_emit_frames(frames, subWait, 2)
+
+def _global_emit_frames(frames, subWait, repeats):
+    """
+    emit_frames as it was before IntersectionState (digital mode).
+    """
+    pins = (globalState.sevenSegSer, globalState.lightSer, globalState.sSegControl, globalState.srclk, globalState.rclk)
+
+    if globalState.outputDirtyCheck:
+        frames = outputmanager.filter_frames(frames, pins[0:3], repeats)
+        if not frames:
+            return
+    else:
+        outputmanager.invalidate()
+
+    for frame in frames:
+        _global_shift_out_frame(frame, subWait, repeats)
+
+def _global_shift_out_frame(frame, subWait, repeats):
+    """
+    shift_out_frame as it was before IntersectionState.
+    """
+    board = globalState.board
+    dirtyCheck = globalState.outputDirtyCheck
+
+    for segBit, lightBit, ctrlBit in frame:
+        if segBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(globalState.sevenSegSer, segBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(globalState.sevenSegSer,segBit)
+            if subWait:
+                outputTime.sleep(subWait)
+        if lightBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(globalState.lightSer, lightBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(globalState.lightSer,lightBit)
+            if subWait:
+                outputTime.sleep(subWait)
+        if ctrlBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(globalState.sSegControl, ctrlBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(globalState.sSegControl,ctrlBit)
+            if subWait:
+                outputTime.sleep(subWait)
+        for _ in range(repeats):
+            board.digital_write(globalState.srclk,1)
+        for _ in range(repeats):
+            board.digital_write(globalState.srclk,0)
+        if subWait:
+            outputTime.sleep(subWait)
+
+    for _ in range(repeats):
+        board.digital_write(globalState.rclk,1)
+    if subWait:
+        outputTime.sleep(subWait)
+    for _ in range(repeats):
+        board.digital_write(globalState.rclk,0)
+    if subWait:
+        outputTime.sleep(subWait)
+
+def bench_hot_path(loops=20, repeats=25):
+    """
+    Function to compare one normal operation loop of outputstage.stage_tracker (stage timing, 7 seg string, pedestrian button, then all 4 frames
+    clocked out through emit_frames and shift_out_frame in digital mode) against the same loop as it was before IntersectionState, with every value a module attribute.
+    Both run on a virtual board in the middle of a long stage 1 with the button up. The stabilising sleeps are skipped so only the Python side is timed.
+    It's run without and with the dirty check. The 4 digits' frames all differ, so every frame is latched every loop either way, the dirty check only skips data pin writes.
+    The runs are interleaved and the quickest of repeats runs is taken for each (slower runs are other processes getting in the way, like timeit).
+    Parameters:
+        loops (loops per run)
+        repeats (runs of each version)
+    Returns:
+        metrics (dict of metric name -> value)
+    """
+    global outputTime
+
+    fresh_board(False)
+    state = setup.state
+    state.trafficTimings = [1e9] * 6
+    state.stageStart = time.perf_counter()
+    for name in IntersectionState.__slots__:
+        setattr(globalState, name, getattr(state, name))
+    globalState.trafficTimingsBuffer = state.trafficTimingsBuffer.copy()
+    globalState.sevenSegSer, globalState.lightSer, globalState.sSegControl, globalState.srclk, globalState.rclk = state.shiftRegisterPins
+
+    def run(stageTracker, *args):
+        startTime = time.perf_counter()
+        for _ in range(loops):
+            stageTracker(*args)
+        return time.perf_counter() - startTime
+
+    metrics = {}
+    outputTime = types.SimpleNamespace(perf_counter=time.perf_counter, time=time.time, sleep=lambda seconds: None)
+    outputstage.time = outputTime
+    try:
+        for dirtyCheck in [False, True]:
+            state.outputDirtyCheck = dirtyCheck
+            globalState.outputDirtyCheck = dirtyCheck
+            times = {"state": [], "globals": []}
+            for _ in range(repeats):
+                times["state"].append(run(outputstage.stage_tracker, state))
+                times["globals"].append(run(_global_stage_tracker))
+            stateTime, globalsTime = (min(times[name]) for name in ["state", "globals"])
+            prefix = "hotpath.dirtycheck." if dirtyCheck else "hotpath."
+            metrics[prefix + "state.us_per_loop"] = stateTime * 1e6 / loops
+            metrics[prefix + "globals.us_per_loop"] = globalsTime * 1e6 / loops
+            metrics[prefix + "state_to_globals_ratio"] = stateTime / globalsTime
+    finally:
+        outputTime = time
+        outputstage.time = time
+    return metrics
+
+def compare(metrics, baselineMetrics, threshold):
+    """
+    Function to find metrics that got worse than the baseline by more than the threshold.
+    Parameters:
+        metrics (dict of metric name -> value from this run)
+        baselineMetrics (dict of metric name -> value from the baseline run)
+        threshold (allowed fractional increase, e.g. 0.1 for 10%)
+    Returns:
+        regressions (list of (metric name, baseline value, value))
+    """
+    regressions = []
+    for name, value in metrics.items():
+        if name not in baselineMetrics:
+            continue
+        baselineValue = baselineMetrics[name]
+        if value > baselineValue * (1 + threshold) and value - baselineValue > 1e-9:
+            regressions.append((name, baselineValue, value))
+    return regressions
+
+def run_benchmarks(loopSeconds=10):
+    """
+    Function to run every benchmark.
+    Parameters:
+        loopSeconds (how long to run normal operation for)
+    Returns:
+        results (dict with the run info and the metrics)
+    """
+    metrics = {}
+    metrics.update(bench_output_messages())
+    metrics.update(bench_sensor_reads())
+    metrics.update(bench_hot_path())
+    metrics.update(bench_normal_operation(loopSeconds))
+    return {
+        "info": {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(), "machine": platform.machine(), "loopSeconds": loopSeconds},
+        "metrics": metrics,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Control loop and output stage benchmarks on the virtual board.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to save the results to")
+    parser.add_argument("--baseline", help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed fractional increase over the baseline before it counts as a regression")
+    parser.add_argument("--loop-seconds", type=float, default=10, help="how long to run normal operation for")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.loop_seconds)
+    for name, value in sorted(results["metrics"].items()):
+        print(name + ": " + '{:.4f}'.format(value))
+    with open(args.output, "w") as resultsFile:
+        json.dump(results, resultsFile, indent=2)
+    print("\nSaved results to " + args.output)
+
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            baselineMetrics = json.load(baselineFile)["metrics"]
+        regressions = compare(results["metrics"], baselineMetrics, args.threshold)
+        for name, baselineValue, value in regressions:
+            print("Regression: " + name + " went from " + '{:.4f}'.format(baselineValue) + " to " + '{:.4f}'.format(value))
+        if regressions:
+            sys.exit(1)
+        print("No regressions over " + str(round(args.threshold*100)) + "% against " + args.baseline)
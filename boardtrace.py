@@ -0,0 +1,236 @@
+# Board trace script
+# This script wraps the board (pymata4, virtual or the async bridge) to count calls, bytes sent and call latency per method and pin,
+# and can write every call to a compact binary trace file for offline analysis.
+# Run with: python boardtrace.py <trace file> to print a per method/pin summary of a trace file.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import struct
+import sys
+import time
+import numpy as np
+from pymata4.private_constants import PrivateConstants
+
+# Method ids used in the trace file, don't reorder (append new ones at the end)
+METHODS = ("digital_write", "digital_pin_write", "_send_command", "_send_sysex", "digital_read", "analog_read", "sonar_read",
+           "set_pin_mode_digital_output", "set_pin_mode_digital_input", "set_pin_mode_analog_input", "set_pin_mode_sonar",
+           "enable_analog_reporting", "disable_analog_reporting")
+_methodIds = {name: i for i, name in enumerate(METHODS)}
+
+# Trace file format: header, then fixed size little endian records
+TRACE_MAGIC = b"BTRC"
+TRACE_VERSION = 1
+_headerStruct = struct.Struct("<4sHd") # magic, version, wall clock time at the start of the trace
+_recordStruct = struct.Struct("<QBBhHf") # ns since start, method id, pin (255 for none), value (written or read, -1 for none), bytes sent, latency in s
+traceDtype = np.dtype([("time", "<u8"), ("method", "u1"), ("pin", "u1"), ("value", "<i2"), ("bytes", "<u2"), ("latency", "<f4")])
+flushSize = 65536 # Bytes of records buffered before they're written to the file
+
+NO_PIN = 255
+NO_VALUE = -1
+
+class TracingBoard:
+    """
+    Wraps a board and records every traced call. Anything not traced is passed straight through to the wrapped board.
+    Bytes sent are the Firmata message sizes (reads are served from pymata4's cache so send nothing).
+    Recording is a dict lookup and a few additions per call (plus a struct pack when writing a trace file), cheap enough to leave on.
+    """
+
+    def __init__(self, board, traceFileName=None):
+        """
+        Parameters:
+            board (board to wrap)
+            traceFileName (binary trace file to write, or None to only keep the counters)
+        """
+        self.board = board
+        self.startTime = time.perf_counter()
+        self.stats = {} # (method id, pin) -> [calls, bytes sent, total latency, worst latency]
+        self._traceFile = None
+        self._traceBuffer = None
+        if traceFileName is not None:
+            self._traceFile = open(traceFileName, "wb")
+            self._traceFile.write(_headerStruct.pack(TRACE_MAGIC, TRACE_VERSION, time.time()))
+            self._traceBuffer = bytearray()
+
+    def __getattr__(self, name):
+        return getattr(self.board, name)
+
+    def _record(self, methodId, pin, value, byteCount, startTime):
+        latency = time.perf_counter() - startTime
+        stat = self.stats.get((methodId, pin))
+        if stat is None:
+            stat = self.stats[(methodId, pin)] = [0, 0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += byteCount
+        stat[2] += latency
+        if latency > stat[3]:
+            stat[3] = latency
+        if self._traceBuffer is not None:
+            self._traceBuffer += _recordStruct.pack(int((startTime - self.startTime) * 1e9), methodId, pin, max(-32768, min(32767, int(value))), byteCount, latency)
+            if len(self._traceBuffer) >= flushSize:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes any buffered trace records to the file.
+        """
+        if self._traceBuffer:
+            buffered = self._traceBuffer
+            self._traceBuffer = bytearray()
+            self._traceFile.write(buffered)
+            self._traceFile.flush()
+
+    # Writes
+    def digital_write(self, pin, value):
+        startTime = time.perf_counter()
+        self.board.digital_write(pin, value)
+        self._record(0, pin, value, 3, startTime) # pymata4 sends the whole port as a 3 byte message
+
+    def digital_pin_write(self, pin, value):
+        startTime = time.perf_counter()
+        self.board.digital_pin_write(pin, value)
+        self._record(1, pin, value, 3, startTime)
+
+    def _send_command(self, command):
+        startTime = time.perf_counter()
+        self.board._send_command(command)
+        # Port messages are counted against the port number
+        if PrivateConstants.DIGITAL_MESSAGE <= command[0] < PrivateConstants.DIGITAL_MESSAGE + 16:
+            self._record(2, command[0] - PrivateConstants.DIGITAL_MESSAGE, command[1] | (command[2] << 7), len(command), startTime)
+        else:
+            self._record(2, NO_PIN, command[0], len(command), startTime)
+
+    def _send_sysex(self, sysex_command, sysex_data=None):
+        startTime = time.perf_counter()
+        self.board._send_sysex(sysex_command, sysex_data)
+        self._record(3, NO_PIN, sysex_command, len(sysex_data or []) + 3, startTime) # Start, command and end bytes around the data
+
+    def set_pin_mode_digital_output(self, pin_number):
+        startTime = time.perf_counter()
+        self.board.set_pin_mode_digital_output(pin_number)
+        self._record(7, pin_number, NO_VALUE, 3, startTime)
+
+    def set_pin_mode_digital_input(self, pin_number, callback=None):
+        startTime = time.perf_counter()
+        self.board.set_pin_mode_digital_input(pin_number, callback=callback)
+        self._record(8, pin_number, NO_VALUE, 6, startTime) # Pin mode and report digital port
+
+    def set_pin_mode_analog_input(self, pin_number, callback=None):
+        startTime = time.perf_counter()
+        self.board.set_pin_mode_analog_input(pin_number, callback=callback)
+        self._record(9, pin_number, NO_VALUE, 5, startTime) # Pin mode and report analog
+
+    def set_pin_mode_sonar(self, trigger_pin, echo_pin, callback=None, timeout=80000):
+        startTime = time.perf_counter()
+        self.board.set_pin_mode_sonar(trigger_pin, echo_pin, callback=callback, timeout=timeout)
+        self._record(10, trigger_pin, echo_pin, 8, startTime) # Sonar config sysex
+
+    def enable_analog_reporting(self, pin):
+        startTime = time.perf_counter()
+        self.board.enable_analog_reporting(pin)
+        self._record(11, pin, NO_VALUE, 2, startTime)
+
+    def disable_analog_reporting(self, pin):
+        startTime = time.perf_counter()
+        self.board.disable_analog_reporting(pin)
+        self._record(12, pin, NO_VALUE, 2, startTime)
+
+    # Reads
+    def digital_read(self, pin):
+        startTime = time.perf_counter()
+        reading = self.board.digital_read(pin)
+        self._record(4, pin, reading[0], 0, startTime)
+        return reading
+
+    def analog_read(self, pin):
+        startTime = time.perf_counter()
+        reading = self.board.analog_read(pin)
+        self._record(5, pin, reading[0], 0, startTime)
+        return reading
+
+    def sonar_read(self, trigger_pin):
+        startTime = time.perf_counter()
+        reading = self.board.sonar_read(trigger_pin)
+        self._record(6, trigger_pin, reading[0], 0, startTime)
+        return reading
+
+    def shutdown(self):
+        self.close_trace()
+        self.board.shutdown()
+
+    def close_trace(self):
+        """
+        Writes the rest of the trace and closes the file. Counting carries on.
+        """
+        if self._traceFile is not None:
+            self.flush()
+            self._traceFile.close()
+            self._traceFile = None
+            self._traceBuffer = None
+
+    def report(self):
+        """
+        Gets one line per method and pin with calls, bytes sent and latency, most bytes first.
+        Parameters:
+            None
+        Returns:
+            reportLines (list of strings)
+        """
+        return summary_lines(self.stats)
+
+def summary_lines(stats):
+    """
+    Function to format per method/pin stats as readable lines, most bytes first.
+    Parameters:
+        stats (dict of (method id, pin) -> [calls, bytes sent, total latency, worst latency])
+    Returns:
+        reportLines (list of strings)
+    """
+    reportLines = []
+    totalBytes = sum(stat[1] for stat in stats.values()) or 1
+    for (methodId, pin), (calls, byteCount, totalLatency, worstLatency) in sorted(stats.items(), key=lambda item: (-item[1][1], -item[1][0])):
+        pinName = "" if pin == NO_PIN else (" port " if methodId == 2 else " pin ") + str(pin)
+        reportLines.append(METHODS[methodId] + pinName + ": " + str(calls) + " calls, " + str(byteCount) + " bytes (" + str(round(byteCount*100/totalBytes,1)) + "%), mean "
+                           + '{:.1f}'.format(totalLatency*1e6/calls) + " us, worst " + '{:.1f}'.format(worstLatency*1e6) + " us")
+    return reportLines
+
+def read_trace(traceFileName):
+    """
+    Function to load a trace file.
+    Parameters:
+        traceFileName (file written by TracingBoard)
+    Returns:
+        startTime (wall clock time the trace started)
+        records (numpy structured array with fields time (ns since start), method, pin, value, bytes, latency (s))
+    """
+    with open(traceFileName, "rb") as traceFile:
+        magic, version, startTime = _headerStruct.unpack(traceFile.read(_headerStruct.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(traceFileName + " is not a version " + str(TRACE_VERSION) + " board trace")
+        data = traceFile.read()
+    recordCount = len(data) // traceDtype.itemsize # A trace cut off mid record just loses that record
+    return startTime, np.frombuffer(data, dtype=traceDtype, count=recordCount)
+
+def trace_stats(records):
+    """
+    Function to get per method/pin stats (same as TracingBoard.stats) from trace records.
+    Parameters:
+        records (from read_trace)
+    Returns:
+        stats (dict of (method id, pin) -> [calls, bytes sent, total latency, worst latency])
+    """
+    stats = {}
+    keys = records["method"].astype(np.uint16) * 256 + records["pin"]
+    for key in np.unique(keys):
+        selected = records[keys == key]
+        stats[(int(key) // 256, int(key) % 256)] = [len(selected), int(selected["bytes"].sum()), float(selected["latency"].sum()), float(selected["latency"].max())]
+    return stats
+
+if __name__ == "__main__":
+    startTime, records = read_trace(sys.argv[1])
+    duration = records["time"][-1] / 1e9 if len(records) else 0
+    print(str(len(records)) + " calls over " + '{:.1f}'.format(duration) + " s from " + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(startTime)))
+    if duration > 0:
+        print('{:.0f}'.format(records["bytes"].sum() / duration) + " bytes/s sent")
+    print("\n".join(summary_lines(trace_stats(records))))
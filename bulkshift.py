@@ -0,0 +1,177 @@
+# Bulk shift script
+# This script packs compiled shift register frames into a single Firmata sysex message so the Arduino clocks them out itself.
+# The matching firmware side is in firmware/bulkshift.h.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import portwrite
+
+# Sysex command id for bulk shifting. 0x01-0x0F are left free by Firmata for user defined commands.
+BULK_SHIFT = 0x0C
+
+# Firmata/FirmataExpress only buffers this many sysex data bytes, so a message can't be bigger than this
+maxSysexDataBytes = 64
+
+# Bit positions of each step byte
+SEG_VALUE = 0x01
+LIGHT_VALUE = 0x02
+CTRL_VALUE = 0x04
+SEG_DRIVEN = 0x08
+LIGHT_DRIVEN = 0x10
+CTRL_DRIVEN = 0x20
+
+def encode_step(segBit, lightBit, ctrlBit):
+    """
+    Function to pack one frame step into a 7 bit sysex byte.
+    Parameters:
+        segBit, lightBit, ctrlBit (0, 1 or None if that line isn't driven)
+    Returns:
+        stepByte
+    """
+    stepByte = 0
+    if segBit is not None:
+        stepByte |= SEG_DRIVEN
+        if segBit:
+            stepByte |= SEG_VALUE
+    if lightBit is not None:
+        stepByte |= LIGHT_DRIVEN
+        if lightBit:
+            stepByte |= LIGHT_VALUE
+    if ctrlBit is not None:
+        stepByte |= CTRL_DRIVEN
+        if ctrlBit:
+            stepByte |= CTRL_VALUE
+    return stepByte
+
+def encode_bulk_shift(frames, pins, holdMicros):
+    """
+    Function to build the sysex data for a bulk shift. Every frame is shifted in and latched, then held for holdMicros before the next one.
+    Parameters:
+        frames (list of compiled frames from framecompiler.compile_frame)
+        pins (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+        holdMicros (time to hold each latched frame, in microseconds, max 16383)
+    Returns:
+        sysexData (list of 7 bit data bytes, not including the sysex start/command/end bytes)
+    """
+    if holdMicros < 0 or holdMicros > 0x3fff:
+        raise ValueError("holdMicros must be between 0 and 16383")
+
+    sysexData = list(pins)
+    sysexData.append(holdMicros & 0x7f)
+    sysexData.append((holdMicros >> 7) & 0x7f)
+    sysexData.append(len(frames))
+    for frame in frames:
+        sysexData.append(len(frame))
+        for segBit, lightBit, ctrlBit in frame:
+            sysexData.append(encode_step(segBit, lightBit, ctrlBit))
+
+    if len(sysexData) > maxSysexDataBytes:
+        raise ValueError("Too many frames for one bulk shift message (" + str(len(sysexData)) + " bytes)")
+    return sysexData
+
+def send_bulk_shift(board, frames, pins, holdMicros):
+    """
+    Function to send frames to the board as one bulk shift sysex message.
+    Parameters:
+        board (pymata4 board)
+        frames (list of compiled frames)
+        pins (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+        holdMicros (time to hold each latched frame, in microseconds)
+    Returns:
+        None
+    """
+    board._send_sysex(BULK_SHIFT, encode_bulk_shift(frames, pins, holdMicros))
+
+    # The firmware leaves the data lines where the last step put them, keep the port shadow in step
+    for frame in frames:
+        for step in frame:
+            for pin, bit in zip(pins, step):
+                if bit is not None:
+                    portwrite.set_pin(pin, bit)
+    portwrite.set_pin(pins[3], 0)
+    portwrite.set_pin(pins[4], 0)
+
+def decode_bulk_shift(sysexData):
+    """
+    Function which does what the firmware does with a bulk shift message, but returns the pin writes instead of doing them.
+    Parameters:
+        sysexData (data bytes from encode_bulk_shift)
+    Returns:
+        pinWrites (list of (pin, value) in the order the firmware writes them)
+    """
+    sevenSegSer, lightSer, sSegControl, srclk, rclk = sysexData[0:5]
+    frameCount = sysexData[7]
+    pinWrites = []
+
+    index = 8
+    for _ in range(frameCount):
+        stepCount = sysexData[index]
+        index += 1
+        for stepByte in sysexData[index:index+stepCount]:
+            if stepByte & SEG_DRIVEN:
+                pinWrites.append((sevenSegSer, 1 if stepByte & SEG_VALUE else 0))
+            if stepByte & LIGHT_DRIVEN:
+                pinWrites.append((lightSer, 1 if stepByte & LIGHT_VALUE else 0))
+            if stepByte & CTRL_DRIVEN:
+                pinWrites.append((sSegControl, 1 if stepByte & CTRL_VALUE else 0))
+            pinWrites.append((srclk, 1))
+            pinWrites.append((srclk, 0))
+        index += stepCount
+        pinWrites.append((rclk, 1))
+        pinWrites.append((rclk, 0))
+    return pinWrites
+
+def expected_pin_writes(frames, pins):
+    """
+    Function to get the pin writes a list of frames should turn into, worked out straight from the frames.
+    Parameters:
+        frames (list of compiled frames)
+        pins (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+    Returns:
+        pinWrites (list of (pin, value))
+    """
+    sevenSegSer, lightSer, sSegControl, srclk, rclk = pins
+    pinWrites = []
+    for frame in frames:
+        for step in frame:
+            for pin, bit in zip((sevenSegSer, lightSer, sSegControl), step):
+                if bit is not None:
+                    pinWrites.append((pin, bit))
+            pinWrites += [(srclk, 1), (srclk, 0)]
+        pinWrites += [(rclk, 1), (rclk, 0)]
+    return pinWrites
+
+def loopback_check():
+    """
+    Loopback test of the encoder. Encodes some frames, decodes the sysex bytes like the firmware would and checks the pin sequence.
+    Parameters:
+        None
+    Returns:
+        None (raises AssertionError on a mismatch)
+    """
+    pins = (9, 6, 10, 7, 8)
+    fullFrame = ((0,0,0),(1,1,0),(1,0,1),(0,0,0),(1,1,1),(1,1,1),(0,0,1),(1,0,0))
+    displayFrame = tuple((bit, None, 1) for bit in (1,0,1,0,1,0,1,0))
+    lightsFrame = tuple((None, bit, None) for bit in (0,1,0,0,1,1,0,0))
+    testFrames = [[fullFrame], [fullFrame, displayFrame, lightsFrame, fullFrame], [lightsFrame], []]
+
+    for frames in testFrames:
+        sysexData = encode_bulk_shift(frames, pins, 2000)
+        assert all(0 <= byte <= 0x7f for byte in sysexData), "Sysex data byte out of range"
+        assert (sysexData[5] | (sysexData[6] << 7)) == 2000, "Hold time decoded wrong"
+        assert decode_bulk_shift(sysexData) == expected_pin_writes(frames, pins), "Pin sequence mismatch"
+
+    # Anything over the 64 byte sysex limit is rejected
+    try:
+        encode_bulk_shift([fullFrame] * 7, pins, 0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Oversized message was not rejected")
+
+    print("Bulk shift loopback check passed.")
+
+if __name__ == "__main__":
+    loopback_check()
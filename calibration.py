@@ -0,0 +1,71 @@
+# Calibration script
+# This script builds lookup tables from raw 10 bit ADC values (0-1023) to engineering units for the thermistor and LDR,
+# so a reading is converted with a table lookup instead of the full equations, and whole arrays of raw values can be converted at once.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import numpy as np
+
+adcMax = 1023 # Highest 10 bit ADC value
+adcValues = np.arange(adcMax + 1)
+
+def adc_voltage_table(supplyVoltage=5.0):
+    """
+    Function to build the table of ADC value to voltage.
+    Parameters:
+        supplyVoltage (ADC reference voltage)
+    Returns:
+        table (1024 voltages, in V)
+    """
+    return adcValues * (supplyVoltage / adcMax)
+
+def thermistor_table(steinHartA, steinHartB, steinHartC, fixedResistor=100000, supplyVoltage=5.0):
+    """
+    Function to build the table of thermistor ADC value to temperature, from the Steinhart-Hart equation.
+    0 and 1023 (shorted/open thermistor) have no real resistance, so they're given the same temperature as 1 and 1022.
+    Parameters:
+        steinHartA, steinHartB, steinHartC (Steinhart-Hart coefficients)
+        fixedResistor (the divider's fixed resistor, in ohms)
+        supplyVoltage (divider and ADC reference voltage)
+    Returns:
+        table (1024 temperatures, in celsius)
+    """
+    thermVoltage = np.clip(adcValues, 1, adcMax - 1) * (supplyVoltage / adcMax) # Get voltage at divider junction
+    thermResistance = (fixedResistor * thermVoltage) / (supplyVoltage - thermVoltage) # Then get the resistance of the thermistor
+    logResistance = np.log(thermResistance)
+    return 1 / (steinHartA + steinHartB * logResistance + steinHartC * logResistance**3) - 273.15 # From https://en.wikipedia.org/wiki/Steinhart%E2%80%93Hart_equation
+
+def LDR_voltage_table(supplyVoltage=5.0):
+    """
+    Function to build the table of LDR ADC value to voltage at the divider junction.
+    Parameters:
+        supplyVoltage (divider and ADC reference voltage)
+    Returns:
+        table (1024 voltages, in V)
+    """
+    return adc_voltage_table(supplyVoltage)
+
+def LDR_lux_table():
+    """
+    Function to build the table of LDR ADC value to light level, with the formula from the LDR input subsystem test script.
+    0 (no light reading at all) is given the same level as 1.
+    Parameters:
+        None
+    Returns:
+        table (1024 light levels, in lux)
+    """
+    voltage = np.clip(adcValues, 1, adcMax) * 0.0048828125
+    return (2500 / voltage) - 500/2 # source: https://www.emant.com/316002.page (to calculate lux)
+
+def convert(table, rawValues):
+    """
+    Function to convert an array of raw ADC values with a table, e.g. for logs and plots.
+    Parameters:
+        table (one of the tables above)
+        rawValues (array like of 0-1023 ADC values)
+    Returns:
+        values (numpy array)
+    """
+    return table[np.clip(np.asarray(rawValues, dtype=np.intp), 0, adcMax)]
@@ -0,0 +1,167 @@
+# Display refresh script
+# This script multiplexes the 7 segment display (and refreshes the lights) from a background thread at a set rate, so the control loop doesn't have to.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import threading
+import time
+import math
+
+# get required global variables, functions, etc
+import setup
+import framecompiler
+import outputstage
+
+# What the worker should show, (stringToDisplay, lightsInputArray, buzzerBit). Replaced as a whole so the worker never sees half an update.
+_published = ("     ", (0,0,0,0,0,0,0,0), 0)
+_thread = None
+externalRefresh = False # Set when something other than the refresh thread (e.g. the async runtime) is multiplexing the display
+_stopEvent = threading.Event()
+
+# Refresh timing stats
+refreshCount = 0
+_lastRefresh = None
+_periodMean = 0.0
+_periodM2 = 0.0
+
+def publish(stringToDisplay, lightsInputArray, buzzerBit):
+    """
+    Function to hand the refresh worker a new string, lights and buzzer state to show.
+    Parameters:
+        stringToDisplay (5 character display string)
+        lightsInputArray (8 light bits)
+        buzzerBit (1 to turn on the buzzer)
+    Returns:
+        None
+    """
+    global _published
+
+    _published = (stringToDisplay, tuple(lightsInputArray), buzzerBit)
+
+def published():
+    """
+    Function to get the latest published display state.
+    Parameters:
+        None
+    Returns:
+        (stringToDisplay, lightsInputArray, buzzerBit)
+    """
+    return _published
+
+def is_running():
+    """
+    Function to check if the display is being refreshed in the background (by the refresh worker or externally).
+    Parameters:
+        None
+    Returns:
+        running (True/False)
+    """
+    return externalRefresh or (_thread is not None and _thread.is_alive())
+
+def start_display_refresh(targetHz):
+    """
+    Function to start the refresh worker. Does nothing if it's already running.
+    Parameters:
+        targetHz (full display refreshes per second to aim for)
+    Returns:
+        None
+    """
+    global _thread
+
+    if is_running():
+        return
+    reset_refresh_stats()
+    _stopEvent.clear()
+    _thread = threading.Thread(target=_refresh_worker, args=(targetHz,), daemon=True)
+    _thread.start()
+
+def stop_display_refresh():
+    """
+    Function to stop the refresh worker and wait for it to finish its current refresh.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global _thread
+
+    if _thread is None:
+        return
+    _stopEvent.set()
+    _thread.join()
+    _thread = None
+
+def _refresh_worker(targetHz):
+    """
+    Refresh worker thread. Shows the latest published state once per period, without trying to catch up on missed periods.
+    """
+    global refreshCount
+    global _lastRefresh
+    global _periodMean
+    global _periodM2
+
+    period = 1.0 / targetHz
+    subWait = 0.0007 # <------ Experimentally derived!! (same as outputstage.seven_seg_and_lights)
+    nextRefresh = time.perf_counter()
+
+    while not _stopEvent.is_set():
+        stringToDisplay, lightsInputArray, buzzerBit = _published
+        stringScrollOffset = int(time.time()) % 5
+
+        # Take the board one digit at a time so the control loop can still get writes in
+        for i in range(4):
+            frame = framecompiler.compile_frame(stringToDisplay, stringScrollOffset, i, lightsInputArray, buzzerBit)
+            with setup.boardLock:
+                outputstage.emit_frames(setup.state, [frame], subWait, 2)
+
+        # Running mean/variance of the refresh period (Welford)
+        now = time.perf_counter()
+        if _lastRefresh is not None:
+            refreshPeriod = now - _lastRefresh
+            delta = refreshPeriod - _periodMean
+            _periodMean += delta / refreshCount
+            _periodM2 += delta * (refreshPeriod - _periodMean)
+        _lastRefresh = now
+        refreshCount += 1
+
+        nextRefresh += period
+        delay = nextRefresh - time.perf_counter()
+        if delay > 0:
+            _stopEvent.wait(delay)
+        else:
+            nextRefresh = time.perf_counter() # Running behind, start the next period from now
+
+def refresh_stats():
+    """
+    Function to get the refresh worker's achieved rate and jitter since it was started.
+    Parameters:
+        None
+    Returns:
+        achievedHz (mean full display refreshes per second)
+        jitter (standard deviation of the refresh period, in s)
+    """
+    if refreshCount < 2:
+        return 0.0, 0.0
+    achievedHz = 1.0 / _periodMean if _periodMean > 0 else 0.0
+    jitter = math.sqrt(_periodM2 / (refreshCount - 1))
+    return achievedHz, jitter
+
+def reset_refresh_stats():
+    """
+    Function to reset the refresh timing stats.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global refreshCount
+    global _lastRefresh
+    global _periodMean
+    global _periodM2
+
+    refreshCount = 0
+    _lastRefresh = None
+    _periodMean = 0.0
+    _periodM2 = 0.0
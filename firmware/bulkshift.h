@@ -0,0 +1,77 @@
+// Bulk shift extension for FirmataExpress
+// Clocks out the shift register frames sent by bulkshift.py in one sysex message instead of one DIGITAL_MESSAGE per pin edge.
+// Created by Emrys Pham
+// Creation date: 18/10/2026
+// Version: 1.0
+//
+// To use, copy this file next to FirmataExpress.ino, add
+//     #include "bulkshift.h"
+// near the top of FirmataExpress.ino, and add this case to the switch in sysexCallback():
+//     case BULK_SHIFT:
+//       bulkShift(argc, argv);
+//       break;
+// Then upload FirmataExpress as usual.
+
+#ifndef BULKSHIFT_H
+#define BULKSHIFT_H
+
+#define BULK_SHIFT 0x0C // Must match BULK_SHIFT in bulkshift.py
+
+// Bits of each step byte, must match bulkshift.py
+#define SEG_VALUE    0x01
+#define LIGHT_VALUE  0x02
+#define CTRL_VALUE   0x04
+#define SEG_DRIVEN   0x08
+#define LIGHT_DRIVEN 0x10
+#define CTRL_DRIVEN  0x20
+
+// Message layout:
+// argv[0..4] sevenSegSer, lightSer, sSegControl, srclk, rclk pins
+// argv[5..6] hold time per frame in microseconds (lsb, msb, 7 bits each)
+// argv[7]    frame count
+// then per frame: step count, followed by that many step bytes (bit 7 of the register first)
+void bulkShift(byte argc, byte *argv)
+{
+  if (argc < 8) {
+    return;
+  }
+
+  byte sevenSegSer = argv[0];
+  byte lightSer = argv[1];
+  byte sSegControl = argv[2];
+  byte srclk = argv[3];
+  byte rclk = argv[4];
+  unsigned int holdMicros = argv[5] | (argv[6] << 7);
+  byte frameCount = argv[7];
+
+  byte index = 8;
+  for (byte frame = 0; frame < frameCount; frame++) {
+    if (index >= argc) {
+      return; // Truncated message, don't read past the end
+    }
+    byte stepCount = argv[index++];
+    for (byte step = 0; step < stepCount && index < argc; step++) {
+      byte stepByte = argv[index++];
+      if (stepByte & SEG_DRIVEN) {
+        digitalWrite(sevenSegSer, (stepByte & SEG_VALUE) ? HIGH : LOW);
+      }
+      if (stepByte & LIGHT_DRIVEN) {
+        digitalWrite(lightSer, (stepByte & LIGHT_VALUE) ? HIGH : LOW);
+      }
+      if (stepByte & CTRL_DRIVEN) {
+        digitalWrite(sSegControl, (stepByte & CTRL_VALUE) ? HIGH : LOW);
+      }
+      digitalWrite(srclk, HIGH);
+      digitalWrite(srclk, LOW);
+    }
+
+    // Push to shift register outputs and hold so multiplexed digits are visible
+    digitalWrite(rclk, HIGH);
+    digitalWrite(rclk, LOW);
+    if (holdMicros > 0) {
+      delayMicroseconds(holdMicros);
+    }
+  }
+}
+
+#endif
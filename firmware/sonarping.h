@@ -0,0 +1,95 @@
+// Sonar ping scheduler extension for FirmataExpress
+// Pings the sonars set up by sonarping.py one at a time, with a gap after every echo so one sonar's ping can't be heard by the next,
+// and reports every ping (echo or timeout) with the board time it was triggered at.
+// Created by Emrys Pham
+// Creation date: 18/10/2026
+// Version: 1.0
+//
+// To use, copy this file next to FirmataExpress.ino, add
+//     #include "sonarping.h"
+// near the top of FirmataExpress.ino, add this case to the switch in sysexCallback():
+//     case SONAR_SCHEDULE:
+//       sonarSchedule(argc, argv);
+//       break;
+// and call sonarPingPoll(); at the end of loop(). Then upload FirmataExpress as usual.
+// Don't also set the scheduled sonars up with set_pin_mode_sonar, FirmataExpress would ping them as well.
+
+#ifndef SONARPING_H
+#define SONARPING_H
+
+#define SONAR_SCHEDULE 0x0D // Must match SONAR_SCHEDULE in sonarping.py
+#define SONAR_ECHO     0x0E // Must match SONAR_ECHO in sonarping.py
+#define MAX_SCHEDULED_SONARS 6
+
+byte scheduledTrig[MAX_SCHEDULED_SONARS];
+byte scheduledEcho[MAX_SCHEDULED_SONARS];
+byte scheduledCount = 0;
+byte nextScheduled = 0;
+unsigned long pingGapMicros = 10000;
+unsigned long pingTimeoutMicros = 25000;
+unsigned long lastPingEnd = 0;
+
+// Message layout:
+// argv[0..1] gap after each ping in milliseconds (lsb, msb, 7 bits each)
+// argv[2..4] echo timeout in microseconds (7 bits each, lsb first)
+// argv[5]    sonar count (0 stops pinging)
+// then per sonar: trigger pin, echo pin
+void sonarSchedule(byte argc, byte *argv)
+{
+  if (argc < 6) {
+    return;
+  }
+  byte count = argv[5];
+  if (count > MAX_SCHEDULED_SONARS || argc < 6 + 2 * count) {
+    return; // Too many sonars or a truncated message
+  }
+
+  pingGapMicros = (unsigned long)(argv[0] | (argv[1] << 7)) * 1000UL;
+  pingTimeoutMicros = (unsigned long)argv[2] | ((unsigned long)argv[3] << 7) | ((unsigned long)argv[4] << 14);
+  for (byte i = 0; i < count; i++) {
+    scheduledTrig[i] = argv[6 + 2 * i];
+    scheduledEcho[i] = argv[7 + 2 * i];
+    pinMode(scheduledTrig[i], OUTPUT);
+    digitalWrite(scheduledTrig[i], LOW);
+    pinMode(scheduledEcho[i], INPUT);
+  }
+  if (count != scheduledCount) {
+    nextScheduled = 0;
+  }
+  scheduledCount = count;
+}
+
+// Echo report layout:
+// [0]    sonar index, in the order they were scheduled
+// [1..2] distance in cm (lsb, msb, 7 bits each), 0 for a timeout
+// [3..6] micros() when the ping was triggered, low 28 bits (7 bits each, lsb first)
+void sonarPingPoll()
+{
+  if (scheduledCount == 0 || micros() - lastPingEnd < pingGapMicros) {
+    return;
+  }
+
+  byte index = nextScheduled;
+  nextScheduled = (nextScheduled + 1) % scheduledCount;
+
+  // 10us trigger pulse, then time the echo pulse
+  digitalWrite(scheduledTrig[index], HIGH);
+  delayMicroseconds(10);
+  digitalWrite(scheduledTrig[index], LOW);
+  unsigned long triggerTime = micros();
+  unsigned long echoMicros = pulseIn(scheduledEcho[index], HIGH, pingTimeoutMicros);
+  lastPingEnd = micros();
+
+  unsigned int distance = echoMicros / 58; // Sound goes there and back at about 58us per cm
+  byte report[7];
+  report[0] = index;
+  report[1] = distance & 0x7f;
+  report[2] = (distance >> 7) & 0x7f;
+  report[3] = triggerTime & 0x7f;
+  report[4] = (triggerTime >> 7) & 0x7f;
+  report[5] = (triggerTime >> 14) & 0x7f;
+  report[6] = (triggerTime >> 21) & 0x7f;
+  Firmata.sendSysex(SONAR_ECHO, 7, report);
+}
+
+#endif
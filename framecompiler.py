@@ -0,0 +1,133 @@
+# Frame compiler script
+# This script turns what the output stage wants to show (7 seg string, lights, buzzer) into ready-to-emit shift register frames and caches them.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+from collections import OrderedDict
+
+# get required global variables, functions, etc
+import setup
+
+# A frame is a tuple of 8 steps in shift order (bit 7 is shifted first, so it ends up on output 7 after latching).
+# Each step is (sevenSegSer bit, lightSer bit, sSegControl bit). A bit of None means that line is not driven for the step.
+frameCacheSize = 256 # Max number of frames kept before the least recently used one is evicted
+frameCacheHits = 0
+frameCacheMisses = 0
+_frameCache = OrderedDict()
+
+def scroll_substring(displayString, scrollOffset):
+    """
+    Function to get the 4 characters of the display string that are visible at a given scroll offset.
+    Parameters:
+        displayString (5 character string, the last character is the gap between scrolls)
+        scrollOffset (0-4)
+    Returns:
+        subStringToDisplay (visible characters)
+    """
+    subStringToDisplay = displayString[scrollOffset:min(scrollOffset+4,5)]
+    if scrollOffset != 0 and scrollOffset != 1:
+        subStringToDisplay = subStringToDisplay + displayString[0:(scrollOffset-1)]
+    return subStringToDisplay
+
+def _build_frame(displayString, scrollOffset, digitIndex, lightsPattern, buzzerBit, frameType):
+    """
+    Function that does the actual (uncached) frame building. See compile_frame.
+    """
+    # Lights only frame, the 7 seg registers are left alone
+    if frameType == "lights":
+        return tuple((None, lightsPattern[i], None) for i in range(8)[::-1])
+
+    subStringToDisplay = scroll_substring(displayString, scrollOffset)
+    char = subStringToDisplay[digitIndex]
+
+    # Skip seven segment related bits if the character is a period, only the lights get refreshed
+    if char == ".":
+        if lightsPattern is None:
+            return ()
+        return tuple((None, lightsPattern[i], None) for i in range(8)[::-1])
+
+    # Digit select outputs, the active digit is pulled low
+    if frameType == "display":
+        sSegControlOut = [1,1,1,1,1,0,0,0]
+    else:
+        sSegControlOut = [1,1,1,1,0,0,0,0]
+    sSegControlOut[digitIndex] = 0
+    sSegControlOut[5] = buzzerBit
+
+    # Segment bits, decimal place bit goes on output 7 if the next character is a period
+    segBits = [int(bit) for bit in setup.sevenSegLookupDict[char]]
+    if subStringToDisplay[(digitIndex+1) % 4] == ".":
+        segBits.append(1)
+    else:
+        segBits.append(0)
+
+    frame = []
+    for i in range(8)[::-1]:
+        if lightsPattern is None:
+            frame.append((segBits[i], None, sSegControlOut[i]))
+        else:
+            frame.append((segBits[i], lightsPattern[i], sSegControlOut[i]))
+    return tuple(frame)
+
+def compile_frame(displayString, scrollOffset, digitIndex, lightsPattern, buzzerBit, frameType="full"):
+    """
+    Function to get the shift register frame for one digit, from the cache where possible.
+    Parameters:
+        displayString (string being scrolled on the 7 seg)
+        scrollOffset (current scroll offset, 0-4)
+        digitIndex (digit being multiplexed, 0-3)
+        lightsPattern (8 light bits, or None if the lights aren't driven)
+        buzzerBit (1 to turn on the buzzer)
+        frameType (out of [full, display, lights])
+    Returns:
+        frame (tuple of 8 (sevenSegSer, lightSer, sSegControl) steps in shift order)
+    """
+    global frameCacheHits
+    global frameCacheMisses
+
+    if lightsPattern is not None:
+        lightsPattern = tuple(lightsPattern)
+    key = (displayString, scrollOffset, digitIndex, lightsPattern, buzzerBit, frameType)
+
+    frame = _frameCache.get(key)
+    if frame is not None:
+        frameCacheHits += 1
+        _frameCache.move_to_end(key)
+        return frame
+
+    frameCacheMisses += 1
+    frame = _build_frame(displayString, scrollOffset, digitIndex, lightsPattern, buzzerBit, frameType)
+    _frameCache[key] = frame
+    if len(_frameCache) > frameCacheSize:
+        _frameCache.popitem(last=False) # Evict least recently used
+    return frame
+
+def cache_hit_rate():
+    """
+    Function to get the fraction of compile_frame calls served from the cache.
+    Parameters:
+        None
+    Returns:
+        hitRate (0 to 1, 0 if nothing has been compiled yet)
+    """
+    total = frameCacheHits + frameCacheMisses
+    if total == 0:
+        return 0.0
+    return frameCacheHits / total
+
+def clear_frame_cache():
+    """
+    Function to empty the frame cache and reset the hit counters. Needed if the 7 seg lookup table changes.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global frameCacheHits
+    global frameCacheMisses
+
+    _frameCache.clear()
+    frameCacheHits = 0
+    frameCacheMisses = 0
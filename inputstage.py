@@ -0,0 +1,164 @@
+# Input stage script
+# This script polls and checks the sensor readings used in normal operation (ultrasonics, thermistor, LDR).
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import time
+
+# get required global variables, functions, etc
+import setup
+import acquisition
+import metrics
+import sensorstore
+
+sonarCheckFlipFlop = 1
+sonarStillSince = None # Time the sonar 1 vehicle was first seen stopped, None if it's moving
+
+# Poll mode read latency of each sensor
+sensorReadTime = {sensorName: metrics.histogram("sensor." + sensorName + ".read_time") for sensorName in ["sonar1","sonar2","therm","LDR"]}
+# New samples per second and age of the newest sample of each sensor
+sensorSampleRate = {sensorName: metrics.gauge("sensor." + sensorName + ".sample_rate") for sensorName in ["sonar1","sonar2","therm","LDR"]}
+sensorSampleAge = {sensorName: metrics.gauge("sensor." + sensorName + ".sample_age") for sensorName in ["sonar1","sonar2","therm","LDR"]}
+
+def sensor_reset():
+    """
+    Function to clear sensor readings left over from before normal operation was entered.
+    Parameters:
+        None
+    Outputs:
+        None
+    """
+    global sonarCheckFlipFlop
+    global sonarStillSince
+
+    sonarCheckFlipFlop = 1
+    sonarStillSince = None
+    setup.sonarFilter1.reset()
+    setup.sonarFilter2.reset()
+    for sensorName in ["sonar1","sonar2","therm","LDR","pedButton"]:
+        acquisition.drain(sensorName) # Throw away samples from before normal operation
+    acquisition.reset_counts()
+
+def sensor_check():
+    """
+    Function which polls the sensors and, every second call, updates the sensor histories and checks for broken down/speeding vehicles.
+    Only new samples are used, a polled read the board hasn't updated since the last one is dropped.
+    Should be called every 0.25s.
+    Parameters:
+        None
+    Outputs:
+        None
+    """
+    global sonarCheckFlipFlop
+    global sonarStillSince
+
+    sonarCheckFlipFlop = (sonarCheckFlipFlop + 1) % 2 # Run true read every 2 cycles
+    # Samples arrive through the pin callbacks in callback mode (and every sonar echo does in scheduled sonar mode), so there's nothing to poll.
+    # The exception is the sonars, pymata4 doesn't call back for a 0 (no echo) reading, so their cached reads are polled in both modes to see them.
+    # Polled reads go into the same sample buffers as the callbacks, so both modes are handled the same from here on.
+    if setup.sonarScheduler is None:
+        readStart = time.perf_counter()
+        acquisition.poll_sample("sonar1", setup.board.sonar_read(setup.sonar1Trig))
+        sensorReadTime["sonar1"].observe(time.perf_counter() - readStart)
+        time.sleep(0.0001)
+        readStart = time.perf_counter()
+        acquisition.poll_sample("sonar2", setup.board.sonar_read(setup.sonar2Trig))
+        sensorReadTime["sonar2"].observe(time.perf_counter() - readStart)
+        time.sleep(0.0001)
+    if setup.acquisitionMode == "poll":
+        readStart = time.perf_counter()
+        acquisition.poll_sample("therm", setup.board.analog_read(setup.thermPin))
+        sensorReadTime["therm"].observe(time.perf_counter() - readStart)
+        time.sleep(0.0001)
+        readStart = time.perf_counter()
+        acquisition.poll_sample("LDR", setup.board.analog_read(setup.LDRPin))
+        sensorReadTime["LDR"].observe(time.perf_counter() - readStart)
+
+    # Every sonar sample goes through the filter, not just the newest
+    for sonarTime, sonarValue in acquisition.drain("sonar1"):
+        setup.sonarFilter1.update(sonarValue, sonarTime)
+    for sonarTime, sonarValue in acquisition.drain("sonar2"):
+        setup.sonarFilter2.update(sonarValue, sonarTime)
+
+    if sonarCheckFlipFlop != 1:
+        return
+
+    # Get latest filtered readings (maxRange if a sonar has nothing in range), and the mean of the new thermistor and LDR samples
+    readingTime = time.time()
+    sonarStale = setup.sonarFilter1.check_stale(readingTime)
+    setup.sonarFilter2.check_stale(readingTime)
+    sonarMean1 = setup.sonarFilter1.distance
+    sonarMean2 = setup.sonarFilter2.distance
+    thermMean = acquisition.drain_mean("therm", setup.thermistor_convert)
+    LDRMean = acquisition.drain_mean("LDR", setup.LDR_convert)
+
+    # Log to the persistent store (written off the control loop)
+    sensorstore.record(sensorstore.SONAR1, sonarMean1)
+    sensorstore.record(sensorstore.SONAR2, sonarMean2)
+    sensorstore.record(sensorstore.THERM, thermMean)
+    sensorstore.record(sensorstore.LDR, LDRMean)
+
+    # Summaries for long history plots
+    for sensorName in ["sonar1","sonar2","therm","LDR"]:
+        sampleAge, sampleRate = acquisition.freshness(sensorName, readingTime)
+        sensorSampleAge[sensorName].set(sampleAge)
+        sensorSampleRate[sensorName].set(sampleRate)
+    setup.sensorRollups["sonar1"].add(sonarMean1, readingTime)
+    setup.sensorRollups["sonar2"].add(sonarMean2, readingTime)
+    setup.sensorRollups["therm"].add(thermMean, readingTime)
+    setup.sensorRollups["LDR"].add(LDRMean, readingTime)
+
+    setup.pastSonarReading.append(sonarMean1) # append latest filtered distance, the oldest one drops off
+    setup.sonarReadCount += 1
+
+    setup.pastSonarReading2.append(sonarMean2) # append latest filtered distance, the oldest one drops off
+    setup.sonarReadCount2 += 1
+
+    setup.pastThermReading.append(thermMean) # append latest mean reading (filtered), the oldest one drops off
+    setup.thermReadCount += 1
+
+    setup.pastLDRReading.append(LDRMean) # append latest mean reading (filtered), the oldest one drops off
+    setup.LDRReadCount += 1
+    if setup.pastLDRReading[-1] < 2.5:
+        setup.state.dayNightStatus = "day"
+    else:
+        setup.state.dayNightStatus = "night"
+
+    # No checks without a current estimate (nothing in range)
+    if sonarStale:
+        sonarStillSince = None
+        return
+
+    # Check for fast vehicles, from the filter's velocity estimate
+    sonarVelocity = setup.sonarFilter1.velocity
+    if sonarVelocity > setup.speedingVelocity and setup.sonarFilter1.count > 5:
+        print("\nWarning: Speeding vehicle detected.")
+
+    # Keep track of how long the vehicle has been stopped for
+    if abs(sonarVelocity) < setup.breakdownStillVelocity:
+        if sonarStillSince is None:
+            sonarStillSince = readingTime
+    else:
+        sonarStillSince = None
+
+    # Make sure theres enough data to make a judgement...
+    if setup.sonarFilter1.count > 10:
+        # and check if a vehicle has broken down.
+        brokenDown = sonarStillSince is not None and readingTime - sonarStillSince >= setup.breakdownStillSeconds and sonarMean1 < setup.breakdownDistance
+        if brokenDown and setup.state.curStage == 1: # specific case for feature
+            print("\nWarning: Broken down vehicle detected during main road green.")
+        elif brokenDown and setup.state.curStage != 1: # general case
+            print("\nWarning: Broken down vehicle detected.")
+
+def close_distance_print():
+    """
+    Function to print the closest vehicle distance. Should be called every 5s.
+    Parameters:
+        None
+    Outputs:
+        None
+    """
+    print("\nCurrent closest vehicle at " + '{:.2f}'.format(setup.pastSonarReading[-1]) + "cm. ")
+    setup.lastCloseDistPrint = time.perf_counter()
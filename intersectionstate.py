@@ -0,0 +1,76 @@
+# Intersection state script
+# This script has the state normal operation's hot path (stage tracking, pedestrian button, 7 seg and lights) reads and changes every loop.
+# It's one object with fixed slots, passed into the hot functions, so each value is one attribute lookup on a local instead of a module global lookup then a module attribute lookup.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+class IntersectionState:
+    """
+    Pins, timings, stage, buffers and flags for one intersection. Made by setup.initialise() as setup.state.
+    The board, lock, pins and pastThermReading are the same objects as the setup globals, everything else lives only here.
+    """
+
+    __slots__ = (
+        # Board and pins
+        "board", "boardLock", "shiftRegisterPins", "s5FlashPin", "pedButtonPin",
+        # Output
+        "outputMode", "bulkShiftHoldMicros", "outputDirtyCheck",
+        # Timings
+        "trafficTimingsDefault", "trafficTimings", "trafficTimingsBuffer", "nightGreenTimings", "hotGreenExtra", "hotTemperature",
+        # Stage
+        "curStage", "stageStart", "loopStart", "timingEngine",
+        # Buffers
+        "pastThermReading", "lightsInputArray", "stringToDisplay",
+        # Flags and statuses
+        "thermistorTimingAdded", "LDRTimingAdded", "dayNightStatus", "tempStatus", "sevenSegMode", "customSevenSegString",
+        # Pedestrian button
+        "pedButtonCount", "lastPedButtonPress", "pedButtonDown",
+    )
+
+    def __init__(self, board, boardLock, shiftRegisterPins, s5FlashPin, pedButtonPin, pastThermReading):
+        """
+        Parameters:
+            board (connected board)
+            boardLock (lock held when writing to the board from more than one thread)
+            shiftRegisterPins (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+            s5FlashPin (stage 5 flashing light pin)
+            pedButtonPin (pedestrian button pin)
+            pastThermReading (thermistor reading history)
+        """
+        self.board = board
+        self.boardLock = boardLock
+        self.shiftRegisterPins = shiftRegisterPins
+        self.s5FlashPin = s5FlashPin
+        self.pedButtonPin = pedButtonPin
+
+        self.outputMode = "digital" # How shift register frames are sent, out of [digital, port, sysex]. sysex needs the bulk shift firmware (firmware/bulkshift.h)
+        self.bulkShiftHoldMicros = 2000 # Time the firmware holds each multiplexed digit for in sysex mode
+        self.outputDirtyCheck = True # Skip shift register frames and data pin writes that wouldn't change anything
+
+        self.trafficTimingsDefault = [15,5,3,15,5,3] # Default traffic timings to copy from
+        self.trafficTimings = [15,5,3,15,5,3] # Init to default traffic timings in seconds
+        self.trafficTimingsBuffer = [15,5,3,15,5,3] # Init buffer for storing uncommitted changes to main timing array
+        self.nightGreenTimings = (45, 10) # Main road and side road green times in s used at night
+        self.hotGreenExtra = 5 # Time in s added to both greens when it's hot
+        self.hotTemperature = 35 # Temperature in celsius above which it counts as hot
+
+        self.curStage = 1 # Init current stage
+        self.stageStart = 0 # Init time the current stage started
+        self.loopStart = 0 # Time normal operation was entered
+        self.timingEngine = None # adaptivetiming.AdaptiveTiming deciding when stages end, None for the fixed trafficTimings
+
+        self.pastThermReading = pastThermReading
+        self.lightsInputArray = [0,0,0,0,0,0,0,0] # [red main, yellow main, green main, red side, yellow side, green side, red pedestrian, green pedestrian]
+        self.stringToDisplay = "     " # String shown on the 7 seg
+
+        self.thermistorTimingAdded = False # Init flag for whether timings were edited due to thermistor temp
+        self.LDRTimingAdded = False # Init flag for whether timings were edited due to LDR readings
+        self.dayNightStatus = "day" # Whether it is day or night right now
+        self.tempStatus = "normal" # Init temperature status
+        self.sevenSegMode = "stage" # Out of [stage, custom, opmode, temp, daynight]
+        self.customSevenSegString = "abcd" # This is a placeholder for before the user chooses to switch the 7 seg mode.
+
+        self.pedButtonCount = 0
+        self.lastPedButtonPress = -1
+        self.pedButtonDown = False
@@ -0,0 +1,160 @@
+# Live plot script
+# This script draws the four sensor histories in one window and keeps it updated while sampling carries on.
+# The line artists are reused and only they are redrawn over a saved background (blitting), unless an axis needs rescaling.
+# Headless, the plot is rendered with Agg in a worker process and saved to an image file instead, so plotting never holds up sampling.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import multiprocessing
+import os
+import queue
+import numpy as np
+
+# (title, y axis label) for each history, in the order they're passed to update()
+sensorPlotInfo = [("Ultrasonic sensor 1", "Distance (cm)"), ("Ultrasonic sensor 2", "Height (cm)"), ("Thermistor", "Temperature (C)"), ("LDR", "Voltage (V)")]
+
+class LivePlot:
+    """
+    One figure with a subplot per sensor. update() replaces the line data and redraws just the lines.
+    """
+
+    def __init__(self, historyLength, samplePeriod=0.5, blit=True):
+        """
+        Parameters:
+            historyLength (readings in each history)
+            samplePeriod (time between readings in s, for the x axis)
+            blit (redraw only the lines, if the backend supports it)
+        """
+        import matplotlib.pyplot as plt # Imported here so the headless worker can pick the backend first
+
+        self.figure, self.axes = plt.subplots(len(sensorPlotInfo), 1, sharex=True, figsize=(8, 8))
+        self.blit = blit and self.figure.canvas.supports_blit
+        xAxis = np.linspace(-historyLength*samplePeriod, 0, historyLength)
+        self.lines = []
+        for axis, (title, yLabel) in zip(self.axes, sensorPlotInfo):
+            line, = axis.plot(xAxis, np.zeros(historyLength), animated=self.blit)
+            self.lines.append(line)
+            axis.set_title(title, fontsize="small")
+            axis.set_ylabel(yLabel)
+            axis.set_xlim(xAxis[0], xAxis[-1])
+        self.axes[-1].set_xlabel("Time before now (s)")
+        self.figure.tight_layout()
+
+        # Whenever the whole figure is drawn (first draw, resize, rescale), save the background and put the lines back on it
+        self._background = None
+        if self.blit:
+            self.figure.canvas.mpl_connect("draw_event", self._on_draw)
+        self.figure.canvas.draw()
+
+    def _on_draw(self, event):
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for axis, line in zip(self.axes, self.lines):
+            axis.draw_artist(line)
+
+    def update(self, histories):
+        """
+        Shows new histories.
+        Parameters:
+            histories (one array of readings per sensor, oldest first)
+        Returns:
+            None
+        """
+        rescaled = False
+        for axis, line, history in zip(self.axes, self.lines, histories):
+            line.set_ydata(history)
+            # Only rescale when the data leaves the current limits, so most updates can blit
+            lowest, highest = np.min(history), np.max(history)
+            bottom, top = axis.get_ylim()
+            if lowest < bottom or highest > top:
+                margin = max((highest - lowest) * 0.1, 1e-3)
+                axis.set_ylim(lowest - margin, highest + margin)
+                rescaled = True
+
+        canvas = self.figure.canvas
+        if not self.blit or rescaled or self._background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            self._draw_lines()
+            canvas.blit(self.figure.bbox)
+        canvas.flush_events()
+
+    def is_open(self):
+        """
+        Function to check the window hasn't been closed.
+        """
+        import matplotlib.pyplot as plt
+        return plt.fignum_exists(self.figure.number)
+
+    def close(self):
+        import matplotlib.pyplot as plt
+        plt.close(self.figure)
+
+def _agg_worker(plotQueue, historyLength, samplePeriod, fileName):
+    """
+    Worker process for headless plotting. Renders each set of histories it's sent and saves it over fileName.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    livePlot = LivePlot(historyLength, samplePeriod, blit=False)
+    while True:
+        histories = plotQueue.get()
+        if histories is None:
+            break
+        livePlot.update(histories)
+        # Save to a temporary file first so anything watching the image never sees half a file
+        tempFileName = fileName + ".tmp.png"
+        livePlot.figure.savefig(tempFileName)
+        os.replace(tempFileName, fileName)
+
+class AggPlotWorker:
+    """
+    Renders live plots in a separate process. submit() never waits, if the worker is still busy with the last plot the new one is dropped.
+    """
+
+    def __init__(self, historyLength, samplePeriod, fileName):
+        """
+        Parameters:
+            historyLength (readings in each history)
+            samplePeriod (time between readings in s, for the x axis)
+            fileName (image file the plot is saved to, e.g. live_plot.png)
+        """
+        context = multiprocessing.get_context("spawn") # Don't fork the board connection's threads
+        self._queue = context.Queue(maxsize=1)
+        self._process = context.Process(target=_agg_worker, args=(self._queue, historyLength, samplePeriod, fileName), daemon=True)
+        self._process.start()
+        self.droppedCount = 0
+
+    def submit(self, histories):
+        """
+        Sends histories to be plotted.
+        Parameters:
+            histories (one array of readings per sensor, oldest first)
+        Returns:
+            None
+        """
+        try:
+            self._queue.put_nowait([np.array(history) for history in histories])
+        except queue.Full:
+            self.droppedCount += 1
+
+    def close(self):
+        """
+        Stops the worker once it's finished the plot it's on.
+        """
+        try:
+            # Clear anything waiting so the stop gets through
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
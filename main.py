@@ -5,17 +5,21 @@
 
 # Module import
 import time
-import matplotlib.pyplot as plt
+startupStart = time.perf_counter() # For the startup time report
 from pymata4 import pymata4
-import numpy as np
 import math
 
 # Custom file import
 import setup
 import outputstage
+import displayrefresh
+import inputstage
+import scheduler
+import metrics
+import sensorstore
+import acquisition
 
-# Init our required variable, functions, etc
-setup.initialise()
+loopPeriod = metrics.histogram("loop.period") # Time between normal operation loops
 
 def main_menu():
     """
@@ -36,10 +40,17 @@ def main_menu():
             print("0. Exit")
             print("========================")
 
-            # Re-enable polling for thermistor pin
-            setup.board.enable_analog_reporting(setup.thermPin)
+            # Still connecting on the first pass, initialise() does the reset itself when it's done
+            if setup.board_ready():
+                # Re-enable polling for thermistor pin
+                setup.board.enable_analog_reporting(setup.thermPin)
 
-            setup.shift_reg_reset() # Clear shift register outputs and stop the buzzer.
+                setup.shift_reg_reset() # Clear shift register outputs and stop the buzzer.
+
+            # Startup time report, the first time the menu is shown
+            if metrics.gauge("startup.menu").value is None and metrics.gauge("startup.imports").value is not None:
+                metrics.gauge("startup.menu").set(time.perf_counter() - startupStart)
+                print("Menu shown " + str(round(metrics.gauge("startup.menu").value,2)) + "s after start (imports " + str(round(metrics.gauge("startup.imports").value,2)) + "s).")
 
             try:
                 userChoice = int(input("Enter mode of operation: "))
@@ -53,9 +64,14 @@ def main_menu():
                 time.sleep(1)
                 continue
 
+            # Every option needs the board
+            setup.wait_for_board()
+
             if userChoice == 1:
                 if setup.board.digital_read(setup.maintLockoutPin)[0] == 0:
                     normal_operating_mode()
+                    stop_display_refresh()
+                    sensorstore.stop_store()
                 else:
                     print("Normal operation is unavailable as the maintenance switch is closed. Returning to the main menu.")
                     time.sleep(1)
@@ -83,123 +99,97 @@ def main_menu():
                 setup.board.digital_write(setup.rclk,0)
                 setup.board.digital_write(setup.s5FlashPin,0)
 
-                setup.board.shutdown()
+                setup.shutdown_board()
                 quit()
 
         #System: go back to main menu if user press CTRL C
         except KeyboardInterrupt:
             print("\nGoing back to main menu...")
-            setup.shift_reg_reset()
+            stop_display_refresh()
+            sensorstore.stop_store()
+            if setup.board_ready(): # CTRL C while still connecting, there's nothing to reset yet
+                setup.shift_reg_reset()
             continue
 
-def normal_operating_mode():
+def stop_display_refresh():
     """
-    Entry point into the normal operating mode. Handles initial check of the maintenance switch and then starts the normal operation loop.
+    Stops the display refresh thread if normal operation started it, and reports how well it kept up.
     Parameters: None
     Returns: None
     """
 
-    # Init loopStart variable to entry into normal op 
-    setup.loopStart = time.perf_counter()
-    lastSonarCheck = -1
-    sonarCheckFlipFlop = 1
-    sonarBuffer1 = []
-    sonarBuffer2 = []
-    thermBuffer = []
-    LDRBuffer = []
-    lastLoopTime = 0
-    setup.stageStart = time.perf_counter()
-    setup.curStage = 1
-    setup.thermistorTimingAdded = False
-    setup.LDRTimingAdded = False
-    setup.trafficTimingsBuffer = setup.trafficTimingsDefault.copy()
-
-    # Check LDR and set new timings if needed
-    if setup.dayNightStatus == "night" and setup.LDRTimingAdded != True:
-        setup.trafficTimingsBuffer[0] = 45
-        setup.trafficTimingsBuffer[3] = 10
-        setup.LDRTimingAdded = True
-
-    # Check temperature and set new timings if needed
-    if setup.pastThermReading[-1] > 35 and setup.thermistorTimingAdded != True:
-        setup.trafficTimingsBuffer[0] = setup.trafficTimingsBuffer[0] + 5
-        setup.trafficTimingsBuffer[3] = setup.trafficTimingsBuffer[3] + 5
-        setup.thermistorTimingAdded = True
+    if not displayrefresh.is_running():
+        return
+    displayrefresh.stop_display_refresh()
+    achievedHz, jitter = displayrefresh.refresh_stats()
+    print("\nDisplay refreshed at " + str(round(achievedHz,1)) + " Hz (target " + str(setup.displayRefreshHz) + " Hz, jitter " + str(round(jitter*1000,2)) + " ms).")
+
+def normal_operating_mode(extraTasks=()):
+    """
+    Entry point into the normal operating mode. Handles initial check of the maintenance switch and then starts the normal operation loop.
+    Parameters: extraTasks (optional (name, period, job) tuples to run alongside, e.g. the supervisor's status updates)
+    Returns: None
+    """
+
+    global loopScheduler
+    global lastLoopTime
+
+    # Log sensor readings to disk from a background writer
+    if setup.sensorLogEnabled:
+        sensorstore.start_store(setup.sensorLogDirectory, setup.sensorLogSegmentBytes)
+
+    # Reset stage tracking and sensor buffers on entry into normal op
+    outputstage.stage_tracker_reset(setup.state)
+    inputstage.sensor_reset()
+    lastLoopTime = time.perf_counter()
+
+    # Hand 7 seg multiplexing over to the refresh thread so the loop runs at its own cadence
+    if setup.displayRefreshMode == "thread":
+        displayrefresh.start_display_refresh(setup.displayRefreshHz)
+
+    # Periodic jobs. The scheduler sleeps until the next one is due rather than busy waiting.
+    loopScheduler = scheduler.Scheduler()
+    loopScheduler.add_task("stage", setup.normOpLoopTime, normal_operation_step)
+    loopScheduler.add_task("sensors", 0.25, inputstage.sensor_check) # Poll and check sonar readings for broken down/speeding vehicles
+    loopScheduler.add_task("closeDistPrint", 5, inputstage.close_distance_print, startDelay=0.5)
+    for taskName, taskPeriod, taskJob in extraTasks:
+        loopScheduler.add_task(taskName, taskPeriod, taskJob)
 
     print("\nStage 1: ")
 
-    while True:
-        if time.perf_counter() > lastLoopTime + setup.normOpLoopTime:
-            # Check maintenance switch
-            if setup.board.digital_read(setup.maintLockoutPin)[0] == 1:
-                print("\nMaintenance lockout switch activated. Returning to main menu...")
-                time.sleep(1)
-                break
+    loopScheduler.run()
+
+def normal_operation_step():
+    """
+    One pass of the normal operation loop. Checks the maintenance switch and does the stage tracking. Run every setup.normOpLoopTime by the scheduler.
+    Parameters: None
+    Returns: None
+    """
+
+    global lastLoopTime
+
+    # Check maintenance switch
+    if setup.board.digital_read(setup.maintLockoutPin)[0] == 1:
+        print("\nMaintenance lockout switch activated. Returning to main menu...")
+        print("\n".join(loopScheduler.report()))
+        if setup.state.timingEngine is not None:
+            print("\n".join(setup.state.timingEngine.report_lines(setup.state.trafficTimingsDefault, time.perf_counter())))
+        if setup.sonarScheduler is not None:
+            print("\n".join(setup.sonarScheduler.report_lines()))
+        print("\n".join(acquisition.freshness_lines()))
+        time.sleep(1)
+        loopScheduler.stop()
+        return
 
-            # Loop time display, print in place so we don't spam the console
-            print("Last loop took " + str(round(time.perf_counter()-lastLoopTime,2)) + "s.\r    ",end="")
+    # Record loop time (view it from maintenance mode)
+    curTime = time.perf_counter()
+    loopPeriod.observe(curTime - lastLoopTime)
 
-            # Iterate loop time to track from this loop
-            lastLoopTime = time.perf_counter()
+    # Iterate loop time to track from this loop
+    lastLoopTime = curTime
 
-            # Do stage tracking functions
-            outputstage.stage_tracker()
-            
-            # Poll and check sonar readings for broken down/speeding vehicles
-            if time.process_time() > lastSonarCheck + 0.25:
-                sonarCheckFlipFlop = (sonarCheckFlipFlop + 1) % 2 # Run true read every 2 cycles
-                lastSonarCheck = time.process_time()
-                sonarBuffer1.append(setup.board.sonar_read(setup.sonar1Trig)[0])
-                time.sleep(0.0001)
-                sonarBuffer2.append(setup.board.sonar_read(setup.sonar2Trig)[0])
-                time.sleep(0.0001)
-                thermBuffer.append(setup.thermistor_read())
-                time.sleep(0.0001)
-                LDRBuffer.append(setup.LDR_read())
-
-                if sonarCheckFlipFlop == 1:
-                    setup.pastSonarReading.append(np.mean(sonarBuffer1)) # append latest mean reading (filtered)
-                    setup.pastSonarReading.pop(0) # and remove the oldest one
-                    setup.sonarReadCount += 1
-                    sonarBuffer1 = [] # reset buffer
-
-                    setup.pastSonarReading2.append(np.mean(sonarBuffer2)) # append latest mean reading (filtered)
-                    setup.pastSonarReading2.pop(0) # and remove the oldest one
-                    setup.sonarReadCount2 += 1
-                    sonarBuffer2 = [] # reset buffer
-
-                    setup.pastThermReading.append(np.mean(thermBuffer)) # append latest mean reading (filtered)
-                    setup.pastThermReading.pop(0) # and remove the oldest one
-                    setup.thermReadCount += 1
-                    thermBuffer = [] # reset buffer
-
-                    setup.pastLDRReading.append(np.mean(LDRBuffer)) # append latest mean reading (filtered)
-                    setup.pastLDRReading.pop(0) # and remove the oldest one
-                    setup.LDRReadCount += 1
-                    LDRBuffer = [] # reset buffer
-                    if setup.pastLDRReading[-1] < 2.5:
-                        setup.dayNightStatus = "day"
-                    else:
-                        setup.dayNightStatus = "night"
-
-                    # Check if we should print the closest vehicle distance
-                    if time.process_time() > setup.lastCloseDistPrint + 5:
-                        print("\nCurrent closest vehicle at " + '{:.2f}'.format(setup.pastSonarReading[-1]) + "cm. ")
-                        setup.lastCloseDistPrint = time.process_time()
-
-                    # Check for fast vehicles (10 cm/s)
-                    if (setup.pastSonarReading[-1]-setup.pastSonarReading[-2])/0.5 > 10 and setup.sonarReadCount > 5:
-                        print("\nWarning: Speeding vehicle detected.")
-                    # Make sure theres enough data to make a judgement...
-                    if setup.sonarReadCount > 10:
-                        # and check if a vehicle has broken down.
-                        if (np.std(setup.pastSonarReading[-6:]) < 1) and setup.curStage == 1 and np.mean(setup.pastSonarReading[-3:]) < 50: # specific case for feature
-                            print("\nWarning: Broken down vehicle detected during main road green.")
-                        elif (np.std(setup.pastSonarReading[-6:]) < 1) and setup.curStage != 1 and np.mean(setup.pastSonarReading[-3:]) < 50: # general case 
-                            print("\nWarning: Broken down vehicle detected.")
-
-        time.sleep(0.0001)
-        
+    # Do stage tracking functions
+    outputstage.stage_tracker(setup.state)
 
 def maintenance_mode_entry():
     """
@@ -254,7 +244,7 @@ def maintenance_mode():
     """
     
     # Allow only these inputs here
-    validMaintModeInputs = [0,1,2]
+    validMaintModeInputs = [0,1,2,3,4]
 
     # Main maintenance mode menu loop
     while True:
@@ -262,6 +252,8 @@ def maintenance_mode():
         print("MAINTENANCE MODE")
         print("1. Paramteter view")
         print("2. Paramteter edit")
+        print("3. Runtime metrics view")
+        print("4. Runtime metrics save to file")
         print("0. Exit")
         print("========================")
 
@@ -304,6 +296,13 @@ def maintenance_mode():
                 print("Entering parameter edit mode.")
                 time.sleep(1)
                 maintenance_mode_edit()
+            case 3:
+                print("\n".join(metrics.format_snapshot()))
+                print("\n".join(setup.board.report()))
+                time.sleep(1)
+            case 4:
+                print("Runtime metrics saved to " + metrics.dump_snapshot() + ".")
+                time.sleep(1)
 
 def maintenance_mode_view():
     """
@@ -359,7 +358,7 @@ def maintenance_mode_view():
                 time.sleep(1)
                 continue
             case 2:
-                print("The seven segment display is currently in '" + setup.sevenSegMode + "'.")
+                print("The seven segment display is currently in '" + setup.state.sevenSegMode + "'.")
                 time.sleep(1)
                 continue
 
@@ -461,24 +460,76 @@ def maintenance_mode_edit():
                                 time.sleep(1)
                                 continue
                             # Change to lowercase since thats what our 7 seg dictionary supports
-                            setup.customSevenSegString = customSevenSegStringInput.ljust(4).lower() # from https://docs.python.org/3/library/stdtypes.html#str.ljust , we want to only pass in 4 character strings
-                            print("Custom message '" + setup.customSevenSegString + "' set.")
+                            setup.state.customSevenSegString = customSevenSegStringInput.ljust(4).lower() # from https://docs.python.org/3/library/stdtypes.html#str.ljust , we want to only pass in 4 character strings
+                            print("Custom message '" + setup.state.customSevenSegString + "' set.")
                             break
                     # Push mode to the global variable for 7 seg mode
-                    setup.sevenSegMode = newSevenSegMode
+                    setup.state.sevenSegMode = newSevenSegMode
                     break
                 time.sleep(1)
                 continue
 
+def live_sensor_plot():
+    """
+    Samples the sensors like normal operation does and shows all four histories in one live updating graph until CTRL C (or the window is closed).
+    Headless (setup.livePlotMode = "headless") the graph is saved to setup.livePlotFile by a worker process instead.
+    Parameters: None
+    Returns: None
+    """
+
+    import matplotlib.pyplot as plt # Loaded when needed, it's the slowest import by far
+    import numpy as np # Only the graphs need numpy, so the menu comes up without it
+    import liveplot
+
+    inputstage.sensor_reset()
+    histories = [setup.pastSonarReading, setup.pastSonarReading2, setup.pastThermReading, setup.pastLDRReading]
+
+    if setup.livePlotMode == "headless":
+        plotWorker = liveplot.AggPlotWorker(setup.sensorHistoryLength, 0.5, setup.livePlotFile)
+        print("Saving the live graph to " + setup.livePlotFile + ". Press CTRL C to stop.")
+    else:
+        livePlot = liveplot.LivePlot(setup.sensorHistoryLength, 0.5)
+        plt.show(block=False)
+        print("Showing the live graph. Close it or press CTRL C to stop.")
+
+    def plot_step():
+        # Copies, as the histories change under the plot as sampling goes on
+        latestHistories = [np.array(history.ordered()) for history in histories]
+        if setup.livePlotMode == "headless":
+            plotWorker.submit(latestHistories)
+        elif livePlot.is_open():
+            livePlot.update(latestHistories)
+        else:
+            plotScheduler.stop()
+
+    # Sampling at the normal operation rate, plotting at a bounded frame rate
+    plotScheduler = scheduler.Scheduler()
+    plotScheduler.add_task("sensors", 0.25, inputstage.sensor_check)
+    plotScheduler.add_task("plot", 1.0/setup.livePlotMaxFps, plot_step)
+    try:
+        plotScheduler.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if setup.livePlotMode == "headless":
+            plotWorker.close()
+        else:
+            livePlot.close()
+    print("\n Returning to data observation menu...")
+    time.sleep(1)
+
 def data_observation_mode():
     """
     The true maintenance menu which allows entry into parameter viewing and editing modes.
     Parameters: None
     Returns: None
     """
+
+    import matplotlib.pyplot as plt # Loaded when needed, it's the slowest import by far
+    import numpy as np
     
     # Allow only these inputs here
-    validObsModeInputs = [0,1,2,3,4,5,6,7]
+    validObsModeInputs = [0,1,2,3,4,5,6,7,8,9,10]
 
     # Main observation mode menu loop
     while True:
@@ -491,6 +542,9 @@ def data_observation_mode():
         print("5. LDR reading")
         print("6. Temperature graph")
         print("7. LDR graph")
+        print("8. Long history graph (all sensors)")
+        print("9. Live graph (all sensors)")
+        print("10. Sensor log graph (all sensors, read back from disk)")
         print("0. Exit")
         print("========================")
 
@@ -522,10 +576,10 @@ def data_observation_mode():
                 # source: https://sparkbyexamples.com/python/python-get-the-last-n-elements-of-a-list/#google_vignette (to get the last few element)
                 # sources: https://www.tutorialspoint.com/how-to-plot-a-graph-in-python (to make a graph)
                 print("Loading ultrasonic sensor 1's data...")
-                xAxis = np.linspace(-20,0,40).tolist() # set our x axis for plotting
-                yAxis = setup.pastSonarReading # grab our distance values
-                if setup.sonarReadCount < 40: # check we have enough real data
-                    print("The normal operation mode has not been run long enough to collect 20s of data. Displaying plot of available data...")
+                xAxis = np.linspace(-setup.sensorHistoryLength/2,0,setup.sensorHistoryLength) # set our x axis for plotting, one reading every 0.5s
+                yAxis = setup.pastSonarReading.ordered() # grab our distance values
+                if setup.sonarReadCount < setup.sensorHistoryLength: # check we have enough real data
+                    print("The normal operation mode has not been run long enough to collect " + str(setup.sensorHistoryLength//2) + "s of data. Displaying plot of available data...")
                 plt.plot(xAxis, yAxis)
                 plt.xlabel ("Time before epoch (s)")
                 plt.ylabel("Distance (cm)")
@@ -533,20 +587,21 @@ def data_observation_mode():
                 plt.title("Ultrasonic Sensor 1 Distance Graph")
                 plt.savefig("Ultrasonic_Sensor_1_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
                 plt.show()
+                plt.close() # Start the next graph on a fresh figure
             case 2:
                 try:
                     while True:
                         curTherm = (setup.thermistor_read() + setup.lastThermistor)/2.0 # get mean (filtered) thermistor reading
                         setup.lastThermistor = curTherm * 2.0 - setup.lastThermistor
                         if curTherm >= 35:
-                            setup.tempStatus = "hot"
+                            setup.state.tempStatus = "hot"
                         elif curTherm > 20 and curTherm < 25:
-                            setup.tempStatus = "normal"
+                            setup.state.tempStatus = "normal"
                         elif curTherm <= 20:
-                            setup.tempStatus = "cold"
+                            setup.state.tempStatus = "cold"
                         else:
-                            setup.tempStatus = "none" 
-                        print("Current temperature is " + str(int(round(curTherm,0))) + " degrees celsius (" + setup.tempStatus + ").               \r",end="")
+                            setup.state.tempStatus = "none" 
+                        print("Current temperature is " + str(int(round(curTherm,0))) + " degrees celsius (" + setup.state.tempStatus + ").               \r",end="")
                         time.sleep(0.1) # Doesn't need to be that fast.
                 except KeyboardInterrupt:
                     print("\n Returning to data observation menu...")
@@ -557,13 +612,13 @@ def data_observation_mode():
                     setup.board.disable_analog_reporting(setup.thermPin)
                     setup.board.disable_analog_reporting(setup.LDRPin)
 
-                    outputstage.seven_seg_string_set()
-                    if setup.sevenSegMode == "opmode":
-                        outputstage.stringToDisplay = "data" + " "
+                    outputstage.seven_seg_string_set(setup.state)
+                    if setup.state.sevenSegMode == "opmode":
+                        setup.state.stringToDisplay = "data" + " "
 
                     # Main 7 seg loop
                     while True:
-                        outputstage.seven_seg_display()
+                        outputstage.seven_seg_display(setup.state)
                         time.sleep(0.0001)
 
                 except KeyboardInterrupt:
@@ -577,10 +632,10 @@ def data_observation_mode():
                 # source: https://sparkbyexamples.com/python/python-get-the-last-n-elements-of-a-list/#google_vignette (to get the last few element)
                 # sources: https://www.tutorialspoint.com/how-to-plot-a-graph-in-python (to make a graph)
                 print("Loading ultrasonic sensor 2's data...")
-                xAxis = np.linspace(-20,0,40).tolist() # set our x axis for plotting
-                yAxis = setup.pastSonarReading2 # grab our distance values
-                if setup.sonarReadCount2 < 40: # check we have enough real data
-                    print("The normal operation mode has not been run long enough to collect 20s of data. Displaying plot of available data...")
+                xAxis = np.linspace(-setup.sensorHistoryLength/2,0,setup.sensorHistoryLength) # set our x axis for plotting, one reading every 0.5s
+                yAxis = setup.pastSonarReading2.ordered() # grab our distance values
+                if setup.sonarReadCount2 < setup.sensorHistoryLength: # check we have enough real data
+                    print("The normal operation mode has not been run long enough to collect " + str(setup.sensorHistoryLength//2) + "s of data. Displaying plot of available data...")
                 plt.plot(xAxis, yAxis)
                 plt.xlabel ("Time before epoch (s)")
                 plt.ylabel("Height (cm)")
@@ -588,16 +643,17 @@ def data_observation_mode():
                 plt.title("Ultrasonic Sensor 2 Height Graph")
                 plt.savefig("Ultrasonic_Sensor_2_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
                 plt.show()
+                plt.close() # Start the next graph on a fresh figure
             case 5:
                 try:
                     while True:
                         curLDR = (setup.LDR_read() + setup.lastLDR)/2.0 # get mean (filtered) thermistor reading
                         setup.lastLDR = curLDR * 2.0 - setup.lastLDR
                         if curLDR < 2.5:
-                            setup.dayNightStatus = "day"
+                            setup.state.dayNightStatus = "day"
                         else:
-                            setup.dayNightStatus = "night"
-                        print("It is currently " + setup.dayNightStatus + ".               \r",end="")
+                            setup.state.dayNightStatus = "night"
+                        print("It is currently " + setup.state.dayNightStatus + ".               \r",end="")
                         time.sleep(0.1) # Doesn't need to be that fast.
                 except KeyboardInterrupt:
                     print("\n Returning to data observation menu...")
@@ -606,10 +662,10 @@ def data_observation_mode():
                 # source: https://sparkbyexamples.com/python/python-get-the-last-n-elements-of-a-list/#google_vignette (to get the last few element)
                 # sources: https://www.tutorialspoint.com/how-to-plot-a-graph-in-python (to make a graph)
                 print("Loading thermistor's data...")
-                xAxis = np.linspace(-20,0,40).tolist() # set our x axis for plotting
-                yAxis = setup.pastThermReading # grab our temp values
-                if setup.thermReadCount < 40: # check we have enough real data
-                    print("The normal operation mode has not been run long enough to collect 20s of data. Displaying plot of available data...")
+                xAxis = np.linspace(-setup.sensorHistoryLength/2,0,setup.sensorHistoryLength) # set our x axis for plotting, one reading every 0.5s
+                yAxis = setup.pastThermReading.ordered() # grab our temp values
+                if setup.thermReadCount < setup.sensorHistoryLength: # check we have enough real data
+                    print("The normal operation mode has not been run long enough to collect " + str(setup.sensorHistoryLength//2) + "s of data. Displaying plot of available data...")
                 plt.plot(xAxis, yAxis)
                 plt.xlabel ("Time before epoch (s)")
                 plt.ylabel("Temperature (degrees Celsius)")
@@ -617,14 +673,15 @@ def data_observation_mode():
                 plt.title("Thermistor temperature graph")
                 plt.savefig("Thermistor_Temperature_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
                 plt.show()
+                plt.close() # Start the next graph on a fresh figure
             case 7:
                 # source: https://sparkbyexamples.com/python/python-get-the-last-n-elements-of-a-list/#google_vignette (to get the last few element)
                 # sources: https://www.tutorialspoint.com/how-to-plot-a-graph-in-python (to make a graph)
                 print("Loading LDR's data...")
-                xAxis = np.linspace(-20,0,40).tolist() # set our x axis for plotting
-                yAxis = setup.pastLDRReading # grab our voltage values
-                if setup.LDRReadCount < 40: # check we have enough real data
-                    print("The normal operation mode has not been run long enough to collect 20s of data. Displaying plot of available data...")
+                xAxis = np.linspace(-setup.sensorHistoryLength/2,0,setup.sensorHistoryLength) # set our x axis for plotting, one reading every 0.5s
+                yAxis = setup.pastLDRReading.ordered() # grab our voltage values
+                if setup.LDRReadCount < setup.sensorHistoryLength: # check we have enough real data
+                    print("The normal operation mode has not been run long enough to collect " + str(setup.sensorHistoryLength//2) + "s of data. Displaying plot of available data...")
                 plt.plot(xAxis, yAxis)
                 plt.xlabel ("Time before epoch (s)")
                 plt.ylabel("Voltage (V)")
@@ -632,6 +689,67 @@ def data_observation_mode():
                 plt.title("LDR graph of voltage at junction")
                 plt.savefig("LDR_Voltage_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
                 plt.show()
+                plt.close() # Start the next graph on a fresh figure
+            case 8:
+                # Plot from the 1s/1min/1h rollups, so this is quick however long normal operation has run
+                resolutionInputs = {"1": (1, "s"), "2": (60, "min"), "3": (3600, "h")}
+                resolutionInput = input("Enter resolution (1. per second, 2. per minute, 3. per hour): ")
+                if resolutionInput not in resolutionInputs:
+                    print("Invalid input. Please try again.")
+                    time.sleep(1)
+                    continue
+                bucketSeconds, timeUnit = resolutionInputs[resolutionInput]
+
+                figure, axes = plt.subplots(4, 1, sharex=True)
+                for axis, sensorName, yLabel in zip(axes, ["sonar1","sonar2","therm","LDR"], ["Distance (cm)","Height (cm)","Temperature (C)","Voltage (V)"]):
+                    summary = setup.sensorRollups[sensorName].series(bucketSeconds)
+                    xAxis = (summary["time"] - time.time()) / bucketSeconds # Time before now
+                    axis.fill_between(xAxis, summary["min"], summary["max"], alpha=0.3) # Range of readings in each bucket
+                    axis.plot(xAxis, summary["mean"])
+                    axis.set_ylabel(yLabel)
+                axes[-1].set_xlabel("Time before now (" + timeUnit + ")")
+                axes[0].set_title("Sensor history (mean and range per " + timeUnit + ")")
+                plt.savefig("Sensor_History_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
+                plt.show()
+                plt.close() # Start the next graph on a fresh figure
+            case 9:
+                live_sensor_plot()
+            case 10:
+                # Read the persistent sensor log back for a chosen window, so readings from earlier runs (not just this one's 20s histories and rollups) can be looked at
+                try:
+                    windowHours = float(input("Enter how many hours back to plot: "))
+                    if windowHours <= 0:
+                        raise ValueError
+                except ValueError:
+                    print("Invalid input. Please try again.")
+                    time.sleep(1)
+                    continue
+                endTime = time.time()
+                startTime = endTime - windowHours*3600
+                bucketSeconds, timeUnit = (60, "min") if windowHours <= 2 else (3600, "h")
+
+                print("Loading the sensor log from " + setup.sensorLogDirectory + "...")
+                sensorLogs = [sensorstore.read_range(setup.sensorLogDirectory, channel, startTime, endTime) for channel in [sensorstore.SONAR1, sensorstore.SONAR2, sensorstore.THERM, sensorstore.LDR]]
+                if not any(len(times) for times, values, channels in sensorLogs):
+                    print("The sensor log has no readings from the last " + str(windowHours) + " hours.")
+                    time.sleep(1)
+                    continue
+
+                figure, axes = plt.subplots(4, 1, sharex=True)
+                for axis, (times, values, channels), yLabel in zip(axes, sensorLogs, ["Distance (cm)","Height (cm)","Temperature (C)","Voltage (V)"]):
+                    axis.plot((times - endTime) / bucketSeconds, values) # Time before now
+                    axis.set_ylabel(yLabel)
+                axes[-1].set_xlim(-windowHours*3600/bucketSeconds, 0)
+                axes[-1].set_xlabel("Time before now (" + timeUnit + ")")
+                axes[0].set_title("Sensor log for the last " + str(windowHours) + " hours")
+                plt.savefig("Sensor_Log_Graph_" + time.strftime("%H_%M_%S", time.gmtime())) # save graph on close of plot
+                plt.show()
+                plt.close() # Start the next graph on a fresh figure
 
 # Main program starts from here
-main_menu()
\ No newline at end of file
+if __name__ == "__main__": # So the benchmarks and plot worker process can import this without connecting or starting the menu
+    # Connect to the Arduino and init our required variable, functions, etc in the background while the menu comes up
+    metrics.gauge("startup.imports").set(time.perf_counter() - startupStart)
+    setup.start_board(startupStart)
+
+    main_menu()
\ No newline at end of file
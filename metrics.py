@@ -0,0 +1,193 @@
+# Metrics script
+# This script is the in-process metrics registry (counters, gauges and fixed bucket latency histograms) used to watch loop and stage timing.
+# Recording a value is a few attribute updates and a bisect, so it's cheap enough to do every loop.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+from bisect import bisect_left
+import json
+import time
+
+# Default histogram bucket upper bounds, in seconds (the last bucket catches everything above them)
+defaultBuckets = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+_registry = {} # metric name -> Counter, Gauge or Histogram
+
+class Counter:
+    """
+    Count of events, e.g. pedestrian presses.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+    def snapshot(self):
+        return {"type": "counter", "value": self.value}
+
+class Gauge:
+    """
+    Last value of something, e.g. the last duration of a stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def reset(self):
+        self.value = None
+
+    def snapshot(self):
+        return {"type": "gauge", "value": self.value}
+
+class Histogram:
+    """
+    Distribution of values over fixed buckets, with the count, sum, min and max kept exactly.
+    Values can be negative (e.g. a stage ending early), they land in the first bucket.
+    """
+
+    def __init__(self, name, buckets=defaultBuckets):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def observe(self, value):
+        self.bucketCounts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def reset(self):
+        self.bucketCounts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+
+    def percentile(self, percent):
+        """
+        Gets an estimate of a percentile, as the upper bound of the bucket it falls in (capped to the max seen).
+        Parameters:
+            percent (0-100)
+        Returns:
+            value (None if nothing has been recorded)
+        """
+        if self.count == 0:
+            return None
+        target = self.count * percent / 100.0
+        runningCount = 0
+        for i, bucketCount in enumerate(self.bucketCounts):
+            runningCount += bucketCount
+            if runningCount >= target and bucketCount > 0:
+                if i == len(self.buckets):
+                    return self.maximum
+                return min(self.buckets[i], self.maximum)
+        return self.maximum
+
+    def snapshot(self):
+        if self.count == 0:
+            return {"type": "histogram", "count": 0}
+        return {
+            "type": "histogram",
+            "count": self.count,
+            "mean": self.total / self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {("<=" + str(bound)): bucketCount for bound, bucketCount in zip(self.buckets, self.bucketCounts)} | {"inf": self.bucketCounts[-1]},
+        }
+
+def _get(metricClass, name, *args):
+    metric = _registry.get(name)
+    if metric is None:
+        metric = metricClass(name, *args)
+        _registry[name] = metric
+    return metric
+
+def counter(name):
+    """
+    Gets the counter with this name, making it if needed. Keep the returned object to avoid the lookup in hot code.
+    """
+    return _get(Counter, name)
+
+def gauge(name):
+    """
+    Gets the gauge with this name, making it if needed.
+    """
+    return _get(Gauge, name)
+
+def histogram(name, buckets=defaultBuckets):
+    """
+    Gets the histogram with this name, making it if needed. buckets is only used when it's made.
+    """
+    return _get(Histogram, name, buckets)
+
+def reset():
+    """
+    Function to zero every metric. The metric objects are kept, so references held by other modules stay valid.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    for metric in _registry.values():
+        metric.reset()
+
+def snapshot():
+    """
+    Function to get the current value of every metric.
+    Parameters:
+        None
+    Returns:
+        snapshot (dict of metric name -> dict of values)
+    """
+    return {name: _registry[name].snapshot() for name in sorted(_registry)}
+
+def format_snapshot():
+    """
+    Function to get a snapshot as readable lines, with times in ms.
+    Parameters:
+        None
+    Returns:
+        lines (list of strings)
+    """
+    lines = []
+    for name, values in snapshot().items():
+        if values["type"] != "histogram":
+            lines.append(name + ": " + str(values["value"]))
+        elif values["count"] == 0:
+            lines.append(name + ": no samples")
+        else:
+            lines.append(name + ": " + str(values["count"]) + " samples, mean " + '{:.2f}'.format(values["mean"]*1000) + " ms, p50 " + '{:.2f}'.format(values["p50"]*1000)
+                         + " ms, p99 " + '{:.2f}'.format(values["p99"]*1000) + " ms, max " + '{:.2f}'.format(values["max"]*1000) + " ms")
+    return lines
+
+def dump_snapshot(fileName=None):
+    """
+    Function to save a snapshot as JSON.
+    Parameters:
+        fileName (file to save to, defaults to metrics_<date>_<time>.json)
+    Returns:
+        fileName (file it was saved to)
+    """
+    if fileName is None:
+        fileName = "metrics_" + time.strftime("%Y%m%d_%H%M%S") + ".json"
+    with open(fileName, "w") as metricsFile:
+        json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "metrics": snapshot()}, metricsFile, indent=2)
+    return fileName
@@ -0,0 +1,109 @@
+# Output manager script
+# This script keeps a shadow of what each shift register has latched so frames and pin writes that wouldn't change anything can be skipped.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import portwrite
+
+# Last latched outputs of the (7 seg, lights, 7 seg control) shift registers, each a list of Q0-Q7. None until something has been latched.
+latchedState = None
+framesSkipped = 0 # Number of frames not sent because they were already latched
+writesAvoided = 0 # Number of digital_write calls avoided, from skipped frames and data pins already at the right level
+
+def pin_level(pin):
+    """
+    Function to get the level a digital output pin was last written to (from the shared port shadow).
+    Parameters:
+        pin (Arduino digital pin)
+    Returns:
+        level (0 or 1)
+    """
+    return (portwrite.portShadow[pin // 8] >> (pin % 8)) & 1
+
+def pin_needs_write(pin, value, repeats=1):
+    """
+    Function to check if a data pin write would change anything. Counts the writes avoided if it wouldn't.
+    Parameters:
+        pin (Arduino digital pin)
+        value (0 or 1)
+        repeats (number of times the write would have been sent)
+    Returns:
+        needsWrite (True if the pin isn't already at value)
+    """
+    global writesAvoided
+
+    if pin_level(pin) == value:
+        writesAvoided += repeats
+        return False
+    return True
+
+def frame_write_count(frame, repeats):
+    """
+    Function to get the number of digital_write calls it takes to shift out and latch a frame.
+    Parameters:
+        frame (compiled frame)
+        repeats (number of times each write is sent)
+    Returns:
+        writeCount
+    """
+    writeCount = 2 * repeats # rclk up and down
+    for step in frame:
+        writeCount += (3 - step.count(None) + 2) * repeats # driven data lines, srclk up and down
+    return writeCount
+
+def filter_frames(frames, dataPins, repeats):
+    """
+    Function which drops frames that would latch exactly what the shift registers already show, and updates the latched shadow for the rest.
+    Frames are assumed to be sent in order right after this is called.
+    Parameters:
+        frames (list of compiled frames)
+        dataPins (sevenSegSer, lightSer, sSegControl)
+        repeats (number of times each write would be sent, for counting avoided writes)
+    Returns:
+        framesToSend (list of compiled frames)
+    """
+    global latchedState
+    global framesSkipped
+    global writesAvoided
+
+    # Undriven lines keep shifting in whatever level the pin was left at
+    levels = [pin_level(pin) for pin in dataPins]
+    framesToSend = []
+
+    for frame in frames:
+        if latchedState is None:
+            newState = [[0]*8, [0]*8, [0]*8]
+        else:
+            newState = [register.copy() for register in latchedState]
+        for step in frame:
+            for line in range(3):
+                if step[line] is not None:
+                    levels[line] = step[line]
+                # Each clock moves Qn to Qn+1 and shifts the serial line into Q0
+                newState[line] = [levels[line]] + newState[line][:7]
+
+        # A frame only needs sending if it changes the latched outputs
+        if latchedState is not None and newState == latchedState:
+            framesSkipped += 1
+            writesAvoided += frame_write_count(frame, repeats)
+            continue
+        if latchedState is None and len(frame) < 8:
+            newState = None # Still don't know what the registers hold
+        latchedState = newState
+        framesToSend.append(frame)
+
+    return framesToSend
+
+def invalidate():
+    """
+    Function to forget the latched shadow, e.g. after the shift registers were written without going through the output manager.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global latchedState
+
+    latchedState = None
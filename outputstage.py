@@ -10,271 +10,405 @@ import time
 
 # get required global variables, functions, etc
 import setup
-
-def seven_seg_and_lights():
+import framecompiler
+import bulkshift
+import portwrite
+import outputmanager
+import displayrefresh
+import acquisition
+import metrics
+import sensorstore
+import adaptivetiming
+
+# Runtime metrics, looked up once here so recording them is cheap
+stageBranchTime = [metrics.histogram("stage_tracker.stage" + str(stage) + ".branch_time") for stage in range(1,7)] # Time spent in each stage's branch of stage_tracker
+stageDurationError = [metrics.histogram("stage." + str(stage) + ".duration_error") for stage in range(1,7)] # How much longer each stage actually ran than its trafficTimings entry (fixed timing only)
+stageLastDuration = [metrics.gauge("stage." + str(stage) + ".last_duration") for stage in range(1,7)]
+pedestrianPresses = metrics.counter("pedestrian.presses")
+
+# Lights for each stage, [red main, yellow main, green main, red side, yellow side, green side, red pedestrian, green pedestrian]
+stageLights = [
+    [0,0,1,1,0,0,1,0],
+    [0,1,0,1,0,0,1,0],
+    [1,0,0,1,0,0,1,0],
+    [1,0,0,0,0,1,0,1],
+    [1,0,0,0,1,0,0,0],
+    [1,0,0,1,0,0,1,0],
+]
+
+def seven_seg_and_lights(state):
     """
     Function which controls shift registers for traffic lights and 7 seg display. 
-    lightsInputArray and stringToDisplay must both be set before calling this. The code was written this way as passing variables appears to affect performance.
+    state.lightsInputArray and state.stringToDisplay must both be set before calling this.
     Parameters:
-        - None
+        - state (setup.state)
     Outputs:
         - None
     """
 
-    # Get offset for scrolling based on (kinda) random modulus and scroll every second
-    stringScrollOffset = int(time.time()) % 5
+    stringToDisplay = state.stringToDisplay
+    lightsInputArray = state.lightsInputArray
+
+    # Turn on buzzer if current stage is 4
+    buzzerBit = 1 if state.curStage == 4 else 0
 
-    # Slice string to get only 4 chars
-    subStringToDisplay = stringToDisplay[stringScrollOffset:min(stringScrollOffset+4,5)]
-    if stringScrollOffset != 0 and stringScrollOffset != 1:
-        subStringToDisplay = subStringToDisplay + stringToDisplay[0:(stringScrollOffset-1)]
+    # Leave it to the refresh thread if it's running
+    if displayrefresh.is_running():
+        displayrefresh.publish(stringToDisplay, lightsInputArray, buzzerBit)
+        return
 
-    # For correcting indexes if the string has a period
-    dotOffset = 0
+    # Get offset for scrolling based on (kinda) random modulus and scroll every second
+    stringScrollOffset = int(time.time()) % 5
 
     # Stabilise outputs by waiting this value
     subWait = 0.0007 # <------ Experimentally derived!!
 
-    # Display each digit 
-    for i in range(len(subStringToDisplay)):
-        sSegControlOut = [1,1,1,1,0,0,0,0]
-        sSegControlOut[i] = 0
-        if setup.curStage == 4: # Turn on buzzer if current stage is 4
-            sSegControlOut[5] = 1
-        # Skip seven segment related code if the string character we're on is .
-        if subStringToDisplay[i] == ".":
-            dotOffset += 1
-            for i in lightsInputArray[::-1]:
-                setup.board.digital_write(setup.lightSer,i)
+    # Display each digit. Write commands repeated to make sure they're sent. 
+    frames = [framecompiler.compile_frame(stringToDisplay, stringScrollOffset, i, lightsInputArray, buzzerBit) for i in range(4)]
+    emit_frames(state, frames, subWait, 2)
+
+def emit_frames(state, frames, subWait, repeats):
+    """
+    Function which sends compiled frames to the shift registers using the output mode set in state.outputMode.
+    Parameters:
+        - state (setup.state)
+        - frames (list of compiled frames, latched one after another)
+        - subWait (time to wait between writes in digital mode)
+        - repeats (number of times each write is sent in digital mode)
+    Outputs:
+        - None
+    """
+
+    board = state.board
+    pins = state.shiftRegisterPins
+    outputMode = state.outputMode
+
+    # Don't re-send frames the shift registers are already showing
+    if state.outputDirtyCheck:
+        frames = outputmanager.filter_frames(frames, pins[0:3], repeats)
+        if not frames:
+            return
+    else:
+        outputmanager.invalidate()
+
+    # Let the Arduino clock everything out from one sysex message
+    if outputMode == "sysex":
+        bulkshift.send_bulk_shift(board, frames, pins, state.bulkShiftHoldMicros)
+        return
+
+    # Batch data and clock edges into whole port writes
+    if outputMode == "port":
+        for frame in frames:
+            portwrite.shift_out_frame(board, frame, pins, subWait, repeats)
+        return
+
+    for frame in frames:
+        shift_out_frame(state, frame, subWait, repeats)
+
+def shift_out_frame(state, frame, subWait, repeats):
+    """
+    Function which clocks a compiled frame into the shift registers and latches it.
+    Parameters:
+        - state (setup.state)
+        - frame (compiled frame from framecompiler.compile_frame)
+        - subWait (time to wait after each group of repeated writes to let the outputs stabilise, 0 for no wait)
+        - repeats (number of times each write is sent)
+    Outputs:
+        - None
+    """
+
+    board = state.board
+    sevenSegSer, lightSer, sSegControl, srclk, rclk = state.shiftRegisterPins
+    dirtyCheck = state.outputDirtyCheck
+
+    for segBit, lightBit, ctrlBit in frame:
+        # Data lines already at the right level are skipped when dirty checking
+        if segBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(sevenSegSer, segBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(sevenSegSer,segBit)
+            if subWait:
                 time.sleep(subWait)
-                setup.board.digital_write(setup.srclk,1)
-                setup.board.digital_write(setup.srclk,0)
-            setup.board.digital_write(setup.rclk,1)
-            setup.board.digital_write(setup.rclk,0)
-            continue 
-        
-        # Writing our decimal place bit to shift register
-        if subStringToDisplay[(i+1) % 4] == ".":
-            setup.board.digital_write(setup.sevenSegSer,1)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sevenSegSer,1)
-        else:
-            setup.board.digital_write(setup.sevenSegSer,0)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sevenSegSer,0)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.lightSer,lightsInputArray[7])
-        time.sleep(subWait)
-        setup.board.digital_write(setup.lightSer,lightsInputArray[7])
-        time.sleep(subWait)
-        setup.board.digital_write(setup.srclk,1)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.srclk,1)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.srclk,0)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.srclk,0)
-        time.sleep(subWait)
-        
-        # Write remaining bits to shift register. Write commands repeated to make sure they're sent. 
-        for i2 in range(7)[::-1]:
-            setup.board.digital_write(setup.sevenSegSer,int(setup.sevenSegLookupDict[subStringToDisplay[i]][i2]))
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sevenSegSer,int(setup.sevenSegLookupDict[subStringToDisplay[i]][i2]))
-            time.sleep(subWait)
-            setup.board.digital_write(setup.lightSer,lightsInputArray[i2])
-            time.sleep(subWait)
-            setup.board.digital_write(setup.lightSer,lightsInputArray[i2])
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sSegControl,sSegControlOut[i2])
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sSegControl,sSegControlOut[i2])
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,1)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,1)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,0)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,0)
+        if lightBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(lightSer, lightBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(lightSer,lightBit)
+            if subWait:
+                time.sleep(subWait)
+        if ctrlBit is not None and (not dirtyCheck or outputmanager.pin_needs_write(sSegControl, ctrlBit, repeats)):
+            for _ in range(repeats):
+                board.digital_write(sSegControl,ctrlBit)
+            if subWait:
+                time.sleep(subWait)
+        for _ in range(repeats):
+            board.digital_write(srclk,1)
+        for _ in range(repeats):
+            board.digital_write(srclk,0)
+        if subWait:
             time.sleep(subWait)
 
-        # Push to shift register outputs
-        setup.board.digital_write(setup.rclk,1)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.rclk,1)
-        time.sleep(subWait)
-        # Reset rclk
-        setup.board.digital_write(setup.rclk,0)
+    # Push to shift register outputs
+    for _ in range(repeats):
+        board.digital_write(rclk,1)
+    if subWait:
         time.sleep(subWait)
-        setup.board.digital_write(setup.rclk,0)
+    # Reset rclk
+    for _ in range(repeats):
+        board.digital_write(rclk,0)
+    if subWait:
         time.sleep(subWait)
 
-def light_control():
+def light_control(state):
     """
     Function which controls shift registers only the for traffic lights. 
-    lightsInputArray must be set before calling this. The code was written this way as passing variables appears to affect performance.
+    state.lightsInputArray must be set before calling this.
     Parameters:
-        - None
+        - state (setup.state)
     Outputs:
         - None
     """
 
-    # Write bits to shift register
-    for i2 in range(8)[::-1]:
-        setup.board.digital_write(setup.lightSer,lightsInputArray[i2])
-        setup.board.digital_write(setup.srclk,1)
-        setup.board.digital_write(setup.srclk,0)
-
-    # Push to shift register outputs
-    setup.board.digital_write(setup.rclk,1)
-    # Reset rclk
-    setup.board.digital_write(setup.rclk,0)
+    # Write bits to shift register and push to outputs
+    frame = framecompiler.compile_frame("", 0, 0, state.lightsInputArray, 0, "lights")
+    emit_frames(state, [frame], 0, 1)
 
     time.sleep(0.001)
 
-def stage_tracker():
+def stage_tracker_reset(state):
     """
-    Function which manages and controls main normal operation output functions (traffic light and 7 seg) and tracks current stage. 
+    Function which restarts stage tracking from stage 1 and applies any night/temperature timing changes. Call on entry into normal operation.
     Parameters:
-        - None
+        - state (setup.state)
     Outputs:
         - None
     """
 
-    global lightsInputArray # [red main, yellow main, green main, red side, yellow side, green side, red pedestrian, green pedestrian]
-    global stringToDisplay
+    # Init loopStart variable to entry into normal op 
+    state.loopStart = time.perf_counter()
+    state.stageStart = time.perf_counter()
+    state.curStage = 1
+    sensorstore.record(sensorstore.STAGE, state.curStage)
+    state.thermistorTimingAdded = False
+    state.LDRTimingAdded = False
+    state.trafficTimingsBuffer = state.trafficTimingsDefault.copy()
+
+    # Let the sonars and pedestrian button decide the stage lengths if asked to
+    if setup.timingMode == "adaptive":
+        state.timingEngine = adaptivetiming.AdaptiveTiming(setup.pastSonarReading, setup.pastSonarReading2, setup.adaptiveGreenBounds, setup.adaptiveClearanceMinimums,
+                                                           setup.adaptiveGapSeconds, setup.approachDetectDistance, setup.sidePresenceDistance, state.stageStart)
+    else:
+        state.timingEngine = None
 
-    # Check if we need to iterate stage number
-    if time.perf_counter() - setup.stageStart > setup.trafficTimings[setup.curStage-1]:
-        setup.trafficTimings = setup.trafficTimingsBuffer
+    # Check LDR and set new timings if needed
+    if state.dayNightStatus == "night" and state.LDRTimingAdded != True:
+        state.trafficTimingsBuffer[0] = state.nightGreenTimings[0]
+        state.trafficTimingsBuffer[3] = state.nightGreenTimings[1]
+        state.LDRTimingAdded = True
+
+    # Check temperature and set new timings if needed
+    if state.pastThermReading.newest > state.hotTemperature and state.thermistorTimingAdded != True:
+        state.trafficTimingsBuffer[0] = state.trafficTimingsBuffer[0] + state.hotGreenExtra
+        state.trafficTimingsBuffer[3] = state.trafficTimingsBuffer[3] + state.hotGreenExtra
+        state.thermistorTimingAdded = True
+
+def stage_timing_update(state):
+    """
+    Function which moves on to the next stage once the current one's time is up (or the adaptive timing engine ends it), then applies any night/temperature timing changes to the next cycle.
+    Parameters:
+        - state (setup.state)
+    Outputs:
+        - stageChanged (True if a new stage was started)
+    """
 
-        setup.thermistorTimingAdded = False
-        setup.LDRTimingAdded = False
-        setup.trafficTimingsBuffer = setup.trafficTimingsDefault.copy()
+    stageChanged = False
 
-        setup.curStage = (setup.curStage + 1)
-        if setup.curStage == 7: # check if it has exceeded total stage number, don't use mod as stage count starts at 1
-            setup.curStage = 1
-        
-        setup.stageStart = time.perf_counter()
-        print("\nStage " + str(setup.curStage) + ": ")
+    # Check if we need to iterate stage number
+    now = time.perf_counter()
+    stageDuration = now - state.stageStart
+    timingEngine = state.timingEngine
+    if timingEngine is None:
+        stageOver = stageDuration > state.trafficTimings[state.curStage-1]
+    else:
+        stageOver = timingEngine.stage_done(state, stageDuration, now)
+    if stageOver:
+        stageLastDuration[state.curStage-1].set(stageDuration)
+        if timingEngine is None: # Adaptive stages have no set length to be late against
+            stageDurationError[state.curStage-1].observe(stageDuration - state.trafficTimings[state.curStage-1])
+
+        state.trafficTimings = state.trafficTimingsBuffer
+
+        state.thermistorTimingAdded = False
+        state.LDRTimingAdded = False
+        state.trafficTimingsBuffer = state.trafficTimingsDefault.copy()
+
+        curStage = state.curStage + 1
+        if curStage == 7: # check if it has exceeded total stage number, don't use mod as stage count starts at 1
+            curStage = 1
+        state.curStage = curStage
+
+        state.stageStart = time.perf_counter()
+        sensorstore.record(sensorstore.STAGE, curStage)
+        if timingEngine is not None:
+            timingEngine.stage_started(curStage, state.stageStart)
+        stageChanged = True
 
     # Check LDR and set new timings if needed
-    if setup.dayNightStatus == "night" and setup.LDRTimingAdded != True:
-        setup.trafficTimingsBuffer[0] = 45
-        setup.trafficTimingsBuffer[3] = 10
-        setup.LDRTimingAdded = True
+    if state.dayNightStatus == "night" and state.LDRTimingAdded != True:
+        state.trafficTimingsBuffer[0] = state.nightGreenTimings[0]
+        state.trafficTimingsBuffer[3] = state.nightGreenTimings[1]
+        state.LDRTimingAdded = True
 
     # Check temperature and set new timings if needed
-    if setup.pastThermReading[-1] > 35 and setup.thermistorTimingAdded != True:
-        setup.trafficTimingsBuffer[0] = setup.trafficTimingsBuffer[0] + 5
-        setup.trafficTimingsBuffer[3] = setup.trafficTimingsBuffer[3] + 5
-        setup.thermistorTimingAdded = True
+    if state.pastThermReading.newest > state.hotTemperature and state.thermistorTimingAdded != True:
+        state.trafficTimingsBuffer[0] = state.trafficTimingsBuffer[0] + state.hotGreenExtra
+        state.trafficTimingsBuffer[3] = state.trafficTimingsBuffer[3] + state.hotGreenExtra
+        state.thermistorTimingAdded = True
+
+    return stageChanged
+
+def stage_tracker(state):
+    """
+    Function which manages and controls main normal operation output functions (traffic light and 7 seg) and tracks current stage. 
+    Parameters:
+        - state (setup.state)
+    Outputs:
+        - None
+    """
+
+    if stage_timing_update(state):
+        print("\nStage " + str(state.curStage) + ": ")
+
+    branchStart = time.perf_counter()
+    curStage = state.curStage
 
     # Stage 1 check
-    if setup.curStage == 1:
-        lightsInputArray = [0,0,1,1,0,0,1,0]
+    if curStage == 1:
+        state.lightsInputArray = stageLights[0]
 
-        seven_seg_string_set()
-        pedestrian_tracker()
-        seven_seg_and_lights()
+        seven_seg_string_set(state)
+        pedestrian_tracker(state)
+        seven_seg_and_lights(state)
     # Stage 2 check
-    elif setup.curStage == 2:
-        lightsInputArray = [0,1,0,1,0,0,1,0]
+    elif curStage == 2:
+        state.lightsInputArray = stageLights[1]
 
-        seven_seg_string_set()
-        pedestrian_tracker()
-        seven_seg_and_lights()
+        seven_seg_string_set(state)
+        pedestrian_tracker(state)
+        seven_seg_and_lights(state)
     # Stage 3 check
-    elif setup.curStage == 3:
-        lightsInputArray = [1,0,0,1,0,0,1,0]
+    elif curStage == 3:
+        state.lightsInputArray = stageLights[2]
 
-        seven_seg_string_set()
-        pedestrian_tracker()
-        seven_seg_and_lights()
+        seven_seg_string_set(state)
+        pedestrian_tracker(state)
+        seven_seg_and_lights(state)
     # Stage 4 check
-    elif setup.curStage == 4:
-        lightsInputArray = [1,0,0,0,0,1,0,1]
+    elif curStage == 4:
+        state.lightsInputArray = stageLights[3]
 
-        seven_seg_string_set()
-        setup.pedButtonCount = 0
-        seven_seg_and_lights()
+        seven_seg_string_set(state)
+        state.pedButtonCount = 0
+        seven_seg_and_lights(state)
     # Stage 5 check
-    elif setup.curStage == 5:
-        setup.board.digital_write(setup.s5FlashPin,1) # Turn on flash
-        lightsInputArray = [1,0,0,0,1,0,0,0]
-
-        seven_seg_string_set()
-        pedestrian_tracker()
-        seven_seg_and_lights()
+    elif curStage == 5:
+        with state.boardLock:
+            state.board.digital_write(state.s5FlashPin,1) # Turn on flash
+        state.lightsInputArray = stageLights[4]
+
+        seven_seg_string_set(state)
+        pedestrian_tracker(state)
+        seven_seg_and_lights(state)
     # Stage 6 check
-    elif setup.curStage == 6:
-        setup.board.digital_write(setup.s5FlashPin,0) # Turn off flash 
-        lightsInputArray = [1,0,0,1,0,0,1,0]
+    elif curStage == 6:
+        with state.boardLock:
+            state.board.digital_write(state.s5FlashPin,0) # Turn off flash 
+        state.lightsInputArray = stageLights[5]
+
+        seven_seg_string_set(state)
+        pedestrian_tracker(state)
+        seven_seg_and_lights(state)
 
-        seven_seg_string_set()
-        pedestrian_tracker()
-        seven_seg_and_lights()
+    stageBranchTime[curStage-1].observe(time.perf_counter() - branchStart)
 
-def seven_seg_string_set():
+def seven_seg_string_set(state):
     """
     Function to check current seven segment mode and thus set the proper string to be displayed.
     Parameters:
-        None
+        state (setup.state)
     Outputs:
         None
     """
 
-    global stringToDisplay
-
     # Check which mode the 7 seg is in to have it display the right string
-    if setup.sevenSegMode == "custom":
-        stringToDisplay = setup.customSevenSegString + " "
-    elif setup.sevenSegMode == "stage":
-        stringToDisplay = "stg" + str(setup.curStage) + " "
-    elif setup.sevenSegMode == "opmode":
-        stringToDisplay = "norm" + " "
-    elif setup.sevenSegMode == "temp":
-        if setup.tempStatus == "hot":
-            stringToDisplay = "hot " + " "
-        elif setup.tempStatus == "normal":
-            stringToDisplay = "norm" + " "
-        elif setup.tempStatus == "cold":
-            stringToDisplay = "cold" + " "
+    sevenSegMode = state.sevenSegMode
+    if sevenSegMode == "stage":
+        state.stringToDisplay = "stg" + str(state.curStage) + " "
+    elif sevenSegMode == "custom":
+        state.stringToDisplay = state.customSevenSegString + " "
+    elif sevenSegMode == "opmode":
+        state.stringToDisplay = "norm" + " "
+    elif sevenSegMode == "temp":
+        if state.tempStatus == "hot":
+            state.stringToDisplay = "hot " + " "
+        elif state.tempStatus == "normal":
+            state.stringToDisplay = "norm" + " "
+        elif state.tempStatus == "cold":
+            state.stringToDisplay = "cold" + " "
         else:
-            stringToDisplay = "none" + " "
-    elif setup.sevenSegMode == "daynight":
-        if setup.dayNightStatus == "day":
-            stringToDisplay = "day " + " "
+            state.stringToDisplay = "none" + " "
+    elif sevenSegMode == "daynight":
+        if state.dayNightStatus == "day":
+            state.stringToDisplay = "day " + " "
         else:
-            stringToDisplay = "nght" + " "
+            state.stringToDisplay = "nght" + " "
 
-def pedestrian_tracker():
+def pedestrian_tracker(state):
     """
     Function which tracks pedestrian button presses. 
     Parameters:
+        - state (setup.state)
+    Outputs:
         - None
+    """
+
+    # Go through every button edge since the last call in callback mode, so short presses between loops aren't missed
+    if setup.acquisitionMode == "callback":
+        timeOffset = time.perf_counter() - time.time() # Callback timestamps are from time.time()
+        for timestamp, buttonValue in acquisition.drain("pedButton"):
+            pedestrian_button_update(state, buttonValue, timestamp + timeOffset)
+        # Then the current level, so a release inside the debounce time still gets picked up later
+        pedestrian_button_update(state, acquisition.latest("pedButton")[0], time.perf_counter())
+    else:
+        pedestrian_button_update(state, state.board.digital_read(state.pedButtonPin)[0], time.perf_counter())
+
+def pedestrian_button_update(state, buttonValue, curTime):
+    """
+    Function which debounces one pedestrian button reading and counts presses.
+    Parameters:
+        - state (setup.state)
+        - buttonValue (1 if the button is down)
+        - curTime (perf_counter time of the reading)
     Outputs:
         - None
     """
 
     # Check if button is down and debounce and make sure its not being held
-    if setup.board.digital_read(setup.pedButtonPin)[0] == 1 and time.perf_counter() > setup.lastPedButtonPress + 0.5 and setup.pedButtonDown == False:
-        setup.lastPedButtonPress = time.perf_counter()
-        setup.pedButtonCount += 1
-        setup.pedButtonDown = True
-        print("\nPedestrian button press count: " + str(setup.pedButtonCount) + ".") # Print to console for feature
+    if buttonValue == 1 and curTime > state.lastPedButtonPress + 0.5 and state.pedButtonDown == False:
+        state.lastPedButtonPress = curTime
+        state.pedButtonCount += 1
+        pedestrianPresses.inc()
+        sensorstore.record(sensorstore.PED_BUTTON, 1)
+        state.pedButtonDown = True
+        print("\nPedestrian button press count: " + str(state.pedButtonCount) + ".") # Print to console for feature
     # Or check if its not down and debounce and previously down
-    elif setup.board.digital_read(setup.pedButtonPin)[0] == 0 and time.perf_counter() > setup.lastPedButtonPress + 0.1 and setup.pedButtonDown == True:
-        setup.pedButtonDown = False
+    elif buttonValue == 0 and curTime > state.lastPedButtonPress + 0.1 and state.pedButtonDown == True:
+        state.pedButtonDown = False
+        sensorstore.record(sensorstore.PED_BUTTON, 0)
 
-def seven_seg_display():
+def seven_seg_display(state):
     """
     Function which manages and controls only the 7 segment display. 
-    stringToDisplay must be set before calling this. The code was written this way as passing variables appears to affect performance.
+    state.stringToDisplay must be set before calling this.
     Parameters:
-        - None
+        - state (setup.state)
     Outputs:
         - None
     """
@@ -282,66 +416,9 @@ def seven_seg_display():
     # Get offset for scrolling based on (kinda) random modulus and scroll every second
     stringScrollOffset = int(time.time()) % 5
 
-    # Slice string to get only 4 chars
-    subStringToDisplay = stringToDisplay[stringScrollOffset:min(stringScrollOffset+4,5)]
-    if stringScrollOffset != 0 and stringScrollOffset != 1:
-        subStringToDisplay = subStringToDisplay + stringToDisplay[0:(stringScrollOffset-1)]
-
-    # For correcting indexes if the string has a period
-    dotOffset = 0
-
     # Stabilise outputs by waiting this value
     subWait = 0.0020 # <------ Experimentally derived!!
 
-    # Display each digit 
-    for i in range(len(subStringToDisplay)):
-        sSegControlOut = [1,1,1,1,1,0,0,0]
-        sSegControlOut[i] = 0
-        # Skip seven segment related code if the string character we're on is .
-        if subStringToDisplay[i] == ".":
-            dotOffset += 1
-            for i in lightsInputArray[::-1]:
-                setup.board.digital_write(setup.lightSer,i)
-                time.sleep(subWait)
-                setup.board.digital_write(setup.srclk,1)
-                setup.board.digital_write(setup.srclk,0)
-            setup.board.digital_write(setup.rclk,1)
-            setup.board.digital_write(setup.rclk,0)
-            continue 
-        
-        # Writing our decimal place bit to shift register
-        if subStringToDisplay[(i+1) % 4] == ".":
-            setup.board.digital_write(setup.sevenSegSer,1)
-            setup.board.digital_write(setup.sevenSegSer,1)
-        else:
-            setup.board.digital_write(setup.sevenSegSer,0)
-            setup.board.digital_write(setup.sevenSegSer,0)
-        time.sleep(subWait)
-        setup.board.digital_write(setup.srclk,1)
-        setup.board.digital_write(setup.srclk,1)
-        setup.board.digital_write(setup.srclk,0)
-        setup.board.digital_write(setup.srclk,0)
-        time.sleep(subWait)
-        
-        # Write remaining bits to shift register. Write commands repeated to make sure they're sent. 
-        for i2 in range(7)[::-1]:
-            setup.board.digital_write(setup.sevenSegSer,int(setup.sevenSegLookupDict[subStringToDisplay[i]][i2]))
-            setup.board.digital_write(setup.sevenSegSer,int(setup.sevenSegLookupDict[subStringToDisplay[i]][i2]))
-            time.sleep(subWait)
-            setup.board.digital_write(setup.sSegControl,sSegControlOut[i2])
-            setup.board.digital_write(setup.sSegControl,sSegControlOut[i2])
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,1)
-            setup.board.digital_write(setup.srclk,1)
-            time.sleep(subWait)
-            setup.board.digital_write(setup.srclk,0)
-            setup.board.digital_write(setup.srclk,0)
-
-        time.sleep(subWait)
-        # Push to shift register outputs
-        setup.board.digital_write(setup.rclk,1)
-        setup.board.digital_write(setup.rclk,1)
-        time.sleep(subWait)
-        # Reset rclk
-        setup.board.digital_write(setup.rclk,0)
-        setup.board.digital_write(setup.rclk,0)
\ No newline at end of file
+    # Display each digit. Write commands repeated to make sure they're sent. 
+    frames = [framecompiler.compile_frame(state.stringToDisplay, stringScrollOffset, i, None, 0, "display") for i in range(4)]
+    emit_frames(state, frames, subWait, 2)
@@ -0,0 +1,93 @@
+# Port write script
+# This script clocks shift register frames out with whole port DIGITAL_MESSAGE writes, so data lines and clock edges share messages.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import time
+from pymata4.private_constants import PrivateConstants
+
+# Shadow of every Firmata port's output bits. This is the same list pymata4's digital_write uses,
+# so pins written either way (e.g. the stage 5 flash pin on port 0) don't get clobbered.
+portShadow = PrivateConstants.DIGITAL_OUTPUT_PORT_PINS
+
+def set_pin(pin, value):
+    """
+    Function to set a pin in the port shadow without sending anything.
+    Parameters:
+        pin (Arduino digital pin)
+        value (0 or 1)
+    Returns:
+        port (Firmata port the pin is on)
+    """
+    port = pin // 8
+    if value:
+        portShadow[port] |= 1 << (pin % 8)
+    else:
+        portShadow[port] &= ~(1 << (pin % 8))
+    return port
+
+def send_port(board, port, repeats=1):
+    """
+    Function to send a port's shadow value to the board as one DIGITAL_MESSAGE.
+    Firmata writes the pins of a port in ascending pin order, so a data pin below the clock pin is set before the clock edge.
+    Parameters:
+        board (pymata4 board)
+        port (Firmata port number)
+        repeats (number of times the message is sent)
+    Returns:
+        None
+    """
+    command = (PrivateConstants.DIGITAL_MESSAGE + port, portShadow[port] & 0x7f, (portShadow[port] >> 7) & 0x7f)
+    for _ in range(repeats):
+        board._send_command(command)
+
+def shift_out_frame(board, frame, pins, subWait, repeats):
+    """
+    Function which clocks a compiled frame into the shift registers and latches it using port writes.
+    Only ports whose data bits changed are re-sent, and data on the clock's port goes out with the rising edge, unless a data pin
+    there is above srclk (Firmata would set it after the clock), then it's sent on its own first.
+    Parameters:
+        board (pymata4 board)
+        frame (compiled frame from framecompiler.compile_frame)
+        pins (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+        subWait (time to wait after each step, 0 for no wait)
+        repeats (number of times each message is sent)
+    Returns:
+        None
+    """
+    sevenSegSer, lightSer, sSegControl, srclk, rclk = pins
+    clockPort = srclk // 8
+    dataAfterClock = any(pin // 8 == clockPort and pin > srclk for pin in (sevenSegSer, lightSer, sSegControl))
+
+    for step in frame:
+        dirtyPorts = set()
+        for pin, bit in zip((sevenSegSer, lightSer, sSegControl), step):
+            if bit is None:
+                continue
+            port = pin // 8
+            before = portShadow[port]
+            set_pin(pin, bit)
+            if portShadow[port] != before:
+                dirtyPorts.add(port)
+
+        # Data on other ports (and the clock's port, if a data pin there is above srclk) has to be out before the clock rises
+        for port in dirtyPorts:
+            if port != clockPort or dataAfterClock:
+                send_port(board, port, repeats)
+
+        set_pin(srclk, 1)
+        send_port(board, clockPort, repeats)
+        set_pin(srclk, 0)
+        send_port(board, clockPort, repeats)
+        if subWait:
+            time.sleep(subWait)
+
+    # Push to shift register outputs and reset rclk
+    latchPort = set_pin(rclk, 1)
+    send_port(board, latchPort, repeats)
+    set_pin(rclk, 0)
+    send_port(board, latchPort, repeats)
+    if subWait:
+        time.sleep(subWait)
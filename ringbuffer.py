@@ -0,0 +1,118 @@
+# Ring buffer script
+# This script has the fixed size sensor history buffer, with running mean/standard deviation over set windows.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed capacity history of float readings, newest last. Appending is O(1) no matter the capacity.
+    Every value is written twice (at i and i+capacity) so the history in order is always one contiguous slice, which lets ordered() return a view instead of a copy.
+    Indexing works like the old history lists ([-1] is the newest reading, [-6:] the last 6).
+    """
+
+    def __init__(self, capacity, windows=(), fill=0.0):
+        """
+        Parameters:
+            capacity (number of readings kept)
+            windows (window sizes to keep running mean/std for, each at most capacity)
+            fill (value the history starts full of, like the old [0] * 40 lists)
+        """
+        self.capacity = capacity
+        self._data = np.full(2 * capacity, fill, dtype=np.float64)
+        self._head = 0 # Index of the oldest reading
+        self.appendCount = 0
+        self.newest = float(fill) # Newest reading as a plain float, quicker than [-1] when only that one is needed
+
+        # Running mean and sum of squared differences from the mean (Welford) for each window
+        self._windowMean = {}
+        self._windowM2 = {}
+        for window in windows:
+            if window < 1 or window > capacity:
+                raise ValueError("Window size must be between 1 and the buffer capacity")
+            self._windowMean[window] = float(fill)
+            self._windowM2[window] = 0.0
+
+    def append(self, value):
+        """
+        Adds a reading and drops the oldest one.
+        Parameters:
+            value (new reading)
+        Returns:
+            None
+        """
+        value = float(value)
+        capacity = self.capacity
+        head = self._head
+
+        # Update each window for the value coming in and the one leaving it
+        for window in self._windowMean:
+            oldValue = self._data[head + capacity - window]
+            oldMean = self._windowMean[window]
+            newMean = oldMean + (value - oldValue) / window
+            self._windowM2[window] += (value - oldValue) * (value - newMean + oldValue - oldMean)
+            self._windowMean[window] = newMean
+
+        self._data[head] = value
+        self._data[head + capacity] = value
+        self.newest = value
+        self._head = (head + 1) % capacity
+        self.appendCount += 1
+
+        # Running sums slowly pick up float error, so recompute them exactly once per lap of the buffer (still O(1) per append on average)
+        if self._head == 0:
+            self._recompute_windows()
+
+    def _recompute_windows(self):
+        """
+        Recomputes the window stats from the stored readings.
+        """
+        ordered = self.ordered()
+        for window in self._windowMean:
+            values = ordered[-window:]
+            self._windowMean[window] = float(values.mean())
+            self._windowM2[window] = float(((values - values.mean())**2).sum())
+
+    def ordered(self):
+        """
+        Gets the whole history oldest first, as a view (no copy). Only valid until the next append.
+        Parameters:
+            None
+        Returns:
+            history (numpy array view)
+        """
+        return self._data[self._head:self._head + self.capacity]
+
+    def mean(self, window):
+        """
+        Gets the mean of the newest window readings.
+        Parameters:
+            window (one of the window sizes given when the buffer was made)
+        Returns:
+            mean
+        """
+        return self._windowMean[window]
+
+    def std(self, window):
+        """
+        Gets the (population, like np.std) standard deviation of the newest window readings.
+        Parameters:
+            window (one of the window sizes given when the buffer was made)
+        Returns:
+            standard deviation
+        """
+        return max(self._windowM2[window], 0.0) ** 0.5 / window ** 0.5
+
+    def __getitem__(self, key):
+        return self.ordered()[key]
+
+    def __len__(self):
+        return self.capacity
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.ordered()
+        return self.ordered().astype(dtype)
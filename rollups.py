@@ -0,0 +1,130 @@
+# Rollups script
+# This script keeps 1s/1min/1h summaries (count, mean, stddev, min, max) of each sensor's readings so long histories can be plotted without the raw samples.
+# Each reading updates every tier in O(1), and each tier is a fixed size ring of buckets so memory doesn't grow with uptime.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import numpy as np
+
+# (bucket length in s, buckets kept) for each tier: 1 hour of 1s buckets, 2 days of 1min buckets, 60 days of 1h buckets
+defaultTiers = ((1, 3600), (60, 2880), (3600, 1440))
+
+class RollupTier:
+    """
+    Ring of fixed length time buckets, each with the count, mean, sum of squared differences from the mean (Welford), min and max of its readings.
+    Readings a whole ring or more older than the newest bucket are dropped.
+    """
+
+    def __init__(self, bucketSeconds, capacity):
+        """
+        Parameters:
+            bucketSeconds (length of each bucket in s)
+            capacity (number of buckets kept)
+        """
+        self.bucketSeconds = bucketSeconds
+        self.capacity = capacity
+        self._bucket = None # Number (time // bucketSeconds) of the newest bucket
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._mean = np.zeros(capacity)
+        self._m2 = np.zeros(capacity)
+        self._min = np.zeros(capacity)
+        self._max = np.zeros(capacity)
+
+    def add(self, value, timestamp):
+        """
+        Adds a reading to its bucket.
+        Parameters:
+            value (reading)
+            timestamp (time.time() of the reading)
+        Returns:
+            None
+        """
+        bucket = int(timestamp // self.bucketSeconds)
+        if self._bucket is None:
+            self._bucket = bucket
+        elif bucket > self._bucket:
+            # Empty the buckets being moved into (no more than the whole ring, however long the gap)
+            for skippedBucket in range(max(self._bucket + 1, bucket - self.capacity + 1), bucket + 1):
+                self._count[skippedBucket % self.capacity] = 0
+            self._bucket = bucket
+        elif bucket <= self._bucket - self.capacity:
+            return
+
+        i = bucket % self.capacity
+        count = int(self._count[i]) + 1
+        self._count[i] = count
+        if count == 1:
+            self._mean[i] = value
+            self._m2[i] = 0.0
+            self._min[i] = value
+            self._max[i] = value
+            return
+        delta = value - self._mean[i]
+        self._mean[i] += delta / count
+        self._m2[i] += delta * (value - self._mean[i])
+        if value < self._min[i]:
+            self._min[i] = value
+        if value > self._max[i]:
+            self._max[i] = value
+
+    def series(self):
+        """
+        Gets the buckets with readings in, oldest first.
+        Parameters:
+            None
+        Returns:
+            summary (dict of numpy arrays: time (bucket start, time.time()), count, mean, std (population), min, max)
+        """
+        if self._bucket is None:
+            buckets = np.zeros(0, dtype=np.int64)
+        else:
+            buckets = np.arange(self._bucket - self.capacity + 1, self._bucket + 1)
+        indexes = buckets % self.capacity
+        filled = self._count[indexes] > 0
+        buckets = buckets[filled]
+        indexes = indexes[filled]
+        count = self._count[indexes]
+        return {
+            "time": buckets * float(self.bucketSeconds),
+            "count": count,
+            "mean": self._mean[indexes],
+            "std": np.sqrt(np.maximum(self._m2[indexes], 0.0) / np.maximum(count, 1)),
+            "min": self._min[indexes],
+            "max": self._max[indexes],
+        }
+
+class SensorRollup:
+    """
+    All the rollup tiers for one sensor.
+    """
+
+    def __init__(self, tiers=defaultTiers):
+        """
+        Parameters:
+            tiers ((bucket length in s, buckets kept) for each tier)
+        """
+        self.tiers = {bucketSeconds: RollupTier(bucketSeconds, capacity) for bucketSeconds, capacity in tiers}
+
+    def add(self, value, timestamp):
+        """
+        Adds a reading to every tier.
+        Parameters:
+            value (reading)
+            timestamp (time.time() of the reading)
+        Returns:
+            None
+        """
+        for tier in self.tiers.values():
+            tier.add(value, timestamp)
+
+    def series(self, bucketSeconds):
+        """
+        Gets one tier's buckets, see RollupTier.series.
+        Parameters:
+            bucketSeconds (bucket length of the tier, e.g. 60)
+        Returns:
+            summary (dict of numpy arrays)
+        """
+        return self.tiers[bucketSeconds].series()
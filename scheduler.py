@@ -0,0 +1,95 @@
+# Scheduler script
+# This script runs periodic jobs off a timer heap on the monotonic clock, sleeping until the next one is due instead of busy waiting.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import heapq
+import time
+
+class Scheduler:
+    """
+    Runs registered jobs every period seconds. Sleeps until the next job is due and counts missed deadlines per job.
+    Every slot (due time) that goes by while a run is late or still going is a missed deadline, worked out once per run as
+    floor((time the run finished - time it was due) / period). If any were missed the job runs again straight away (from then on keeping the new phase),
+    rather than running once for each missed slot to catch up.
+    """
+
+    def __init__(self):
+        self._heap = [] # (due time, order added, job name)
+        self._jobs = {} # job name -> [period, job]
+        self.runCount = {}
+        self.missedCount = {}
+        self.maxLateness = {}
+        self._running = False
+
+    def add_task(self, name, period, job, startDelay=0.0):
+        """
+        Registers a periodic job.
+        Parameters:
+            name (unique job name, used for the stats)
+            period (seconds between runs)
+            job (function with no arguments)
+            startDelay (seconds from now until the first run)
+        Returns:
+            None
+        """
+        self._jobs[name] = [period, job]
+        self.runCount[name] = 0
+        self.missedCount[name] = 0
+        self.maxLateness[name] = 0.0
+        heapq.heappush(self._heap, (time.perf_counter() + startDelay, len(self._jobs), name))
+
+    def stop(self):
+        """
+        Makes run() return once the current job finishes. Can be called from inside a job.
+        """
+        self._running = False
+
+    def run(self):
+        """
+        Runs the jobs until stop() is called.
+        Parameters:
+            None
+        Returns:
+            None
+        """
+        self._running = True
+        while self._running and self._heap:
+            due, order, name = self._heap[0]
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            heapq.heappop(self._heap)
+
+            period, job = self._jobs[name]
+            lateness = time.perf_counter() - due
+            if lateness > self.maxLateness[name]:
+                self.maxLateness[name] = lateness
+
+            job()
+            self.runCount[name] += 1
+
+            # Next run keeps the original phase, unless slots went by (starting late and/or overrunning), then it's due now
+            now = time.perf_counter()
+            missedSlots = int((now - due) // period)
+            if missedSlots > 0:
+                self.missedCount[name] += missedSlots
+                nextDue = now
+            else:
+                nextDue = due + period
+            heapq.heappush(self._heap, (nextDue, order, name))
+
+    def report(self):
+        """
+        Gets a one line summary per job of runs, missed deadlines and the worst lateness.
+        Parameters:
+            None
+        Returns:
+            reportLines (list of strings)
+        """
+        reportLines = []
+        for name in self._jobs:
+            reportLines.append(name + ": " + str(self.runCount[name]) + " runs, " + str(self.missedCount[name]) + " missed deadlines, worst " + str(round(self.maxLateness[name]*1000,1)) + " ms late")
+        return reportLines
@@ -0,0 +1,214 @@
+# Sensor store script
+# This script keeps a persistent append only log of timestamped sensor samples and stage changes, split into segment files rotated by size.
+# Samples are queued by the control loop and written by a background thread, readers memory map the segments so long ranges don't need loading.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import os
+import queue
+import struct
+import threading
+import time
+
+# Channels
+SONAR1 = 0
+SONAR2 = 1
+THERM = 2
+LDR = 3
+PED_BUTTON = 4
+STAGE = 5
+channelNames = ["sonar1", "sonar2", "therm", "LDR", "pedButton", "stage"]
+
+# Fixed width 16 byte records, in time order within and across segments. The writer packs them with recordStruct, the readers map them as recordFields
+# with numpy (imported by the readers only, so the control loop can record samples without loading it)
+recordStruct = struct.Struct("<dfB3x")
+recordFields = [("time", "<f8"), ("value", "<f4"), ("channel", "u1"), ("pad", "V3")]
+segmentPrefix = "sensors_"
+segmentSuffix = ".log"
+
+_queue = None
+_thread = None
+droppedCount = 0 # Samples thrown away because the queue was full
+writtenCount = 0
+
+def segment_files(directory):
+    """
+    Function to get the segment files in a store directory, oldest first.
+    Parameters:
+        directory (store directory)
+    Returns:
+        fileNames (list of paths)
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, fileName) for fileName in sorted(os.listdir(directory)) if fileName.startswith(segmentPrefix) and fileName.endswith(segmentSuffix)]
+
+def record(channel, value):
+    """
+    Function to queue a sample to be written, timestamped now (so the log stays in time order). Never blocks, if the queue is full the sample is dropped (and counted).
+    Does nothing if the store isn't running.
+    Parameters:
+        channel (one of the channel constants)
+        value (sample value)
+    Returns:
+        None
+    """
+    global droppedCount
+
+    if _queue is None:
+        return
+    try:
+        _queue.put_nowait((time.time(), value, channel))
+    except queue.Full:
+        droppedCount += 1
+
+def is_running():
+    """
+    Function to check if the writer is running.
+    Parameters:
+        None
+    Returns:
+        running (True/False)
+    """
+    return _thread is not None and _thread.is_alive()
+
+def start_store(directory, segmentBytes, queueSize=4096):
+    """
+    Function to start the writer thread. Does nothing if it's already running.
+    Parameters:
+        directory (store directory, made if needed)
+        segmentBytes (size a segment file is allowed to grow to before a new one is started)
+        queueSize (samples that can be waiting to be written before new ones are dropped)
+    Returns:
+        None
+    """
+    global _queue
+    global _thread
+
+    if is_running():
+        return
+    os.makedirs(directory, exist_ok=True)
+    _queue = queue.Queue(maxsize=queueSize)
+    _thread = threading.Thread(target=_writer, args=(_queue, directory, segmentBytes), daemon=True)
+    _thread.start()
+
+def stop_store():
+    """
+    Function to write out anything still queued and stop the writer thread.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global _queue
+    global _thread
+
+    if not is_running():
+        return
+    writeQueue = _queue
+    _queue = None # Stop taking new samples
+    writeQueue.put(None)
+    _thread.join()
+    _thread = None
+
+def _writer(writeQueue, directory, segmentBytes):
+    """
+    Writer thread. Writes queued samples in batches, starting a new segment when the current one is full.
+    """
+    global writtenCount
+
+    recordSize = recordStruct.size
+    segmentRecords = max(1, segmentBytes // recordSize)
+    existingSegments = segment_files(directory)
+    if existingSegments:
+        segmentFileName = existingSegments[-1]
+        segmentNumber = int(os.path.basename(segmentFileName)[len(segmentPrefix):-len(segmentSuffix)])
+    else:
+        segmentNumber = 1
+        segmentFileName = os.path.join(directory, segmentPrefix + '{:06d}'.format(segmentNumber) + segmentSuffix)
+    segmentFile = open(segmentFileName, "ab")
+    segmentFile.truncate(segmentFile.tell() // recordSize * recordSize) # Drop a partly written record left by a crash
+    recordsInSegment = segmentFile.tell() // recordSize
+
+    stopping = False
+    while not stopping:
+        # Wait for one sample then take whatever else is queued
+        samples = [writeQueue.get()]
+        while True:
+            try:
+                samples.append(writeQueue.get_nowait())
+            except queue.Empty:
+                break
+        if samples[-1] is None:
+            stopping = True
+            samples.pop()
+
+        records = b"".join([recordStruct.pack(sampleTime, value, channel) for sampleTime, value, channel in samples])
+
+        # Fill the current segment, then rotate
+        start = 0
+        while start < len(samples):
+            if recordsInSegment >= segmentRecords:
+                segmentFile.close()
+                segmentNumber += 1
+                segmentFile = open(os.path.join(directory, segmentPrefix + '{:06d}'.format(segmentNumber) + segmentSuffix), "ab")
+                recordsInSegment = 0
+            end = min(len(samples), start + segmentRecords - recordsInSegment)
+            segmentFile.write(records[start*recordSize:end*recordSize])
+            recordsInSegment += end - start
+            start = end
+        segmentFile.flush()
+        writtenCount += len(samples)
+    segmentFile.close()
+
+def map_segment(fileName):
+    """
+    Function to memory map a segment file as records (no data is read until it's used).
+    Parameters:
+        fileName (segment file)
+    Returns:
+        records (read only numpy memmap of recordFields, or an empty array if the file has no whole records)
+    """
+    import numpy as np
+
+    recordDtype = np.dtype(recordFields)
+    recordCount = os.path.getsize(fileName) // recordDtype.itemsize
+    if recordCount == 0:
+        return np.zeros(0, dtype=recordDtype)
+    return np.memmap(fileName, dtype=recordDtype, mode="r", shape=(recordCount,))
+
+def read_range(directory, channel=None, startTime=None, endTime=None):
+    """
+    Function to get the samples between two times. Only the parts of the segments in the range are read.
+    Parameters:
+        directory (store directory)
+        channel (one of the channel constants, or None for all)
+        startTime (time.time() to start from, None for the start of the log)
+        endTime (time.time() to stop at, None for the end of the log)
+    Returns:
+        times (numpy array of time.time() sample times)
+        values (numpy array of sample values)
+        channels (numpy array of channel numbers)
+    """
+    import numpy as np
+
+    selected = []
+    for fileName in segment_files(directory):
+        records = map_segment(fileName)
+        if len(records) == 0:
+            continue
+        # Segments are in time order, so skip whole segments outside the range and binary search the rest
+        if (startTime is not None and records["time"][-1] < startTime) or (endTime is not None and records["time"][0] > endTime):
+            continue
+        startIndex = 0 if startTime is None else np.searchsorted(records["time"], startTime, side="left")
+        endIndex = len(records) if endTime is None else np.searchsorted(records["time"], endTime, side="right")
+        chunk = records[startIndex:endIndex]
+        if channel is not None:
+            chunk = chunk[chunk["channel"] == channel]
+        selected.append(np.array(chunk)) # Copy out so the file can be closed
+    if not selected:
+        return np.zeros(0), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.uint8)
+    allRecords = np.concatenate(selected)
+    return allRecords["time"], allRecords["value"], allRecords["channel"]
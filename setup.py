@@ -5,17 +5,126 @@
 
 # Imports
 from pymata4 import pymata4
+import os
 import time
-import math
+import threading
+import bulkshift
+import portwrite
+import outputmanager
+import acquisition
+import metrics
+from sonarfilter import SonarFilter
+from sonarping import SonarPingScheduler
+from intersectionstate import IntersectionState
 
-# Board init at 500k baud
-board = pymata4.Pymata4(baud_rate=500000)
+board = None # Set by connect_board()
+state = None # IntersectionState, set by initialise()
+boardLock = threading.RLock() # Hold this when writing to the board from more than one thread (e.g. with the display refresh thread running)
+boardBackend = os.environ.get("BOARD_BACKEND", "pymata4") # Out of [pymata4, virtual], virtual runs on virtualboard's simulated board without an Arduino
+_boardReady = threading.Event() # Set once initialise() has finished (or the background connection failed)
+_boardError = None # Exception from the background connection, raised again by wait_for_board()
+pinNames = ["maintLockoutPin","sevenSegSer","rclk","srclk","sSegControl","lightSer","s5FlashPin","pedButtonPin","sonar1Trig","sonar1Echo","thermPin","LDRPin","sonar2Trig","sonar2Echo"] # Pins initialise() can be given a different wiring for
+boardTraceFile = os.environ.get("BOARD_TRACE_FILE") # Every board call is written to this binary trace file if set (read it with boardtrace.py)
+sonarMode = os.environ.get("SONAR_MODE", "firmata") # How the sonars are pinged, out of [firmata, scheduled]. scheduled takes turns with a gap between pings and needs the sonar ping firmware (firmware/sonarping.h). Set before initialise()
+sonarScheduler = None # sonarping.SonarPingScheduler in scheduled sonar mode, set by initialise()
 
-def initialise():
+def connect_board(newBoard=None):
     """
-    Primary initialisation function of the whole project. Inits and stores global variables to be accessed by different functions across different files.
+    Connects to the Arduino. Must be called before initialise().
     Parameters:
+        newBoard (optional board object to use instead of opening a pymata4 connection, e.g. the async runtime's bridge)
+    Returns:
         None
+    """
+    global board
+
+    # Board init at 500k baud
+    if newBoard is None and boardBackend == "virtual":
+        import virtualboard
+        newBoard = virtualboard.default_virtual_board(baud_rate=500000)
+    elif newBoard is None:
+        newBoard = pymata4.Pymata4(baud_rate=500000)
+
+    # Count per pin traffic and latency (and trace to file if asked)
+    import boardtrace # numpy backed like the calibration tables, ring buffers and rollups, so they're all imported on the way to the board instead of at startup
+    board = boardtrace.TracingBoard(newBoard, boardTraceFile)
+
+def start_board(startTime, newBoard=None):
+    """
+    Connects to the Arduino and runs initialise() in a background thread, so the menu can be shown during the Firmata handshake.
+    Use wait_for_board() before touching the board or the globals initialise() sets.
+    Parameters:
+        startTime (perf_counter time the program started, for the startup time report)
+        newBoard (optional board object, as in connect_board())
+    Returns:
+        None
+    """
+
+    def connect_and_initialise():
+        global _boardError
+
+        try:
+            handshakeStart = time.perf_counter()
+            connect_board(newBoard)
+            pinConfigStart = time.perf_counter()
+            initialise()
+            readyTime = time.perf_counter()
+        except Exception as error:
+            _boardError = error
+            _boardReady.set()
+            return
+
+        metrics.gauge("startup.handshake").set(pinConfigStart - handshakeStart)
+        metrics.gauge("startup.pin_config").set(readyTime - pinConfigStart)
+        metrics.gauge("startup.board_ready").set(readyTime - startTime)
+        print("\nBoard ready " + str(round(readyTime - startTime,2)) + "s after start (handshake " + str(round(pinConfigStart - handshakeStart,2)) + "s, pin config " + str(round(readyTime - pinConfigStart,2)) + "s).")
+
+    threading.Thread(target=connect_and_initialise, daemon=True).start()
+
+def board_ready():
+    """
+    Checks if the board is connected and initialised.
+    Parameters:
+        None
+    Returns:
+        ready (True/False)
+    """
+    return _boardReady.is_set() and _boardError is None
+
+def wait_for_board():
+    """
+    Waits for the background connection from start_board() to finish, raising its error if it failed.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    if not _boardReady.is_set():
+        print("Waiting for the board to connect...")
+        _boardReady.wait()
+    if _boardError is not None:
+        raise _boardError
+
+def shutdown_board():
+    """
+    Stops the sonar ping schedule (the firmware would carry on pinging otherwise) and disconnects from the board.
+    Parameters:
+        None
+    Returns:
+        None
+    """
+    global sonarScheduler
+
+    if sonarScheduler is not None:
+        sonarScheduler.stop()
+        sonarScheduler = None
+    board.shutdown()
+
+def initialise(pinMap=None):
+    """
+    Primary initialisation function of the whole project. Inits and stores global variables to be accessed by different functions across different files.
+    Parameters:
+        pinMap (optional dict of pin name (e.g. "sevenSegSer", "maintLockoutPin") -> Arduino pin, for boards wired differently to the defaults below)
     Returns:
         None
     """
@@ -25,12 +134,27 @@ def initialise():
     global PINLockoutTime
     global maintLockoutPin
     global maintPIN
-    global sevenSegMode
-    global customSevenSegString
     global board
     global normOpLoopTime
     global adminTimeoutTime
     global adminPassTime
+    global displayRefreshMode
+    global displayRefreshHz
+    global acquisitionMode
+    global sensorLogEnabled
+    global sensorLogDirectory
+    global sensorLogSegmentBytes
+    global livePlotMode
+    global livePlotMaxFps
+    global livePlotFile
+    global timingMode
+    global adaptiveGreenBounds
+    global adaptiveClearanceMinimums
+    global adaptiveGapSeconds
+    global approachDetectDistance
+    global sidePresenceDistance
+    global sonarPingGapMillis
+    global sonarMaxRange
 
     # Globals functions may need to use/edit
     maintenancePass = False # Needs to be True for maintenance mode to be enterable
@@ -41,15 +165,26 @@ def initialise():
     normOpLoopTime = 0.1 # Minimum loop time
     adminTimeoutTime = 30 # Time in seconds before admin perms are removed for inactivity
     adminPassTime = 0 # Init time at which admin was gained/last time activity was performed as admin
+    displayRefreshMode = "inline" # Where the 7 seg is multiplexed in normal operation, out of [inline, thread]
+    displayRefreshHz = 50 # Target full display refreshes per second for the refresh thread
+    acquisitionMode = "poll" # How normal operation gets sensor samples, out of [poll, callback]. callback uses the samples pymata4 pushes as they arrive
+    sensorLogEnabled = True # Keep a persistent log of sensor readings, button presses and stage changes during normal operation
+    sensorLogDirectory = "sensorlog" # Where the sensor log segment files go
+    sensorLogSegmentBytes = 4*1024*1024 # Size each sensor log segment file grows to before a new one is started
+    livePlotMode = "window" # How data observation's live graph is shown, out of [window, headless]. headless renders it to livePlotFile in a worker process
+    livePlotMaxFps = 5 # Most live graph updates per second
+    livePlotFile = "live_plot.png" # Where the headless live graph is saved
+    timingMode = "fixed" # How stage lengths are decided in normal operation, out of [fixed, adaptive]. adaptive extends/gaps out/maxes out the green stages from the sonars and pedestrian button
+    adaptiveGreenBounds = {1: (10, 45), 4: (7, 20)} # (min, max) green time in s for the main road (stage 1) and side road/pedestrians (stage 4) in adaptive mode
+    adaptiveClearanceMinimums = [0,3,1,0,3,1] # Shortest each amber/all red stage can be in adaptive mode, in s
+    adaptiveGapSeconds = 3 # A green can end once no vehicle has been detected on its approach for this long, in s
+    approachDetectDistance = 50 # Main road approach sonar readings under this (in cm) count as a vehicle
+    sidePresenceDistance = 50 # Sonar 2 readings under this (in cm) count as a vehicle waiting on the side road
+    sonarPingGapMillis = 10 # Gap after each sonar ping before the next one in scheduled mode, in ms
+    sonarMaxRange = 400 # Furthest sonar reading used, in cm. Further readings are thrown away and scheduled mode never waits longer than this for an echo
 
     # Editable parameters
     maintPIN = "1234"
-    sevenSegMode = "stage" # Out of [stage, custom]
-    customSevenSegString = "abcd" # This is a placeholder for before the user chooses to switch the 7 seg mode. 
-
-    # Init maintenance lockout pin
-    board.set_pin_mode_digital_input(maintLockoutPin)
-
 
     # Outputstage init
     # Globals
@@ -59,12 +194,9 @@ def initialise():
     global sSegControl
     global lightSer
     global stringToDisplay
-    global loopStart
     global sevenSegLookupDict
     global s5FlashPin
-    global pedButtonCount
     global pedButtonPin
-    global lastPedButtonPress
     global sonar1Trig
     global sonar1Echo
     global sonar2Trig
@@ -72,30 +204,34 @@ def initialise():
     global steinHartA
     global steinHartB
     global steinHartC
+    global thermistorTable
+    global thermistorLookup
+    global LDRTable
+    global LDRLookup
     global pastSonarReading
     global sonarReadCount
     global pastSonarReading2
     global sonarReadCount2
-    global pedButtonDown
     global lastS5Flash
     global s5FlashState
-    global trafficTimings
-    global stageStart
-    global curStage
-    global trafficTimingsDefault
-    global trafficTimingsBuffer
-    global thermistorTimingAdded
-    global LDRTimingAdded
-    global dayNightStatus
     global lastThermistor
     global lastLDR
     global LDRPin
-    global tempStatus
     global lastCloseDistPrint
     global pastThermReading
     global pastLDRReading
     global thermReadCount
     global LDRReadCount
+    global sensorHistoryLength
+    global sensorRollups
+    global sonarFilter1
+    global sonarFilter2
+    global sonarScheduler
+    global speedingVelocity
+    global breakdownStillVelocity
+    global breakdownStillSeconds
+    global breakdownDistance
+    global state
 
     # Digital pins
     sevenSegSer = 9
@@ -112,6 +248,16 @@ def initialise():
     sonar2Trig = 13
     sonar2Echo = 12
 
+    # Use a different wiring if given one
+    if pinMap:
+        for pinName, pin in pinMap.items():
+            if pinName not in pinNames:
+                raise ValueError("Unknown pin name '" + pinName + "' in pin map")
+            globals()[pinName] = pin
+
+    # Init maintenance lockout pin
+    board.set_pin_mode_digital_input(maintLockoutPin)
+
     # Config digital outputs 
     board.set_pin_mode_digital_output(sevenSegSer)
     board.set_pin_mode_digital_output(rclk)
@@ -119,11 +265,21 @@ def initialise():
     board.set_pin_mode_digital_output(sSegControl)
     board.set_pin_mode_digital_output(lightSer)
     board.set_pin_mode_digital_output(s5FlashPin)
-    board.set_pin_mode_digital_input(pedButtonPin)
-    board.set_pin_mode_analog_input(thermPin)
-    board.set_pin_mode_sonar(sonar1Trig,sonar1Echo,timeout=80000)
-    board.set_pin_mode_sonar(sonar2Trig,sonar2Echo,timeout=80000)
-    board.set_pin_mode_analog_input(LDRPin)
+    board.set_pin_mode_digital_input(pedButtonPin,callback=acquisition.register_sensor("pedButton",acquisition.DIGITAL_INPUT,pedButtonPin))
+    board.set_pin_mode_analog_input(thermPin,callback=acquisition.register_sensor("therm",acquisition.ANALOG_INPUT,thermPin))
+    if sonarScheduler is not None:
+        sonarScheduler.stop() # Initialised again, don't leave the old schedule running
+    if sonarMode == "scheduled":
+        # The firmware pings these itself, so they aren't set up as FirmataExpress sonars (it would ping them too)
+        acquisition.register_sensor("sonar1",acquisition.SONAR,sonar1Trig)
+        acquisition.register_sensor("sonar2",acquisition.SONAR,sonar2Trig)
+        sonarScheduler = SonarPingScheduler(board,[("sonar1",sonar1Trig,sonar1Echo),("sonar2",sonar2Trig,sonar2Echo)],gapMillis=sonarPingGapMillis,maxRange=sonarMaxRange,callback=acquisition.pin_callback,lock=boardLock)
+        sonarScheduler.start()
+    else:
+        sonarScheduler = None
+        board.set_pin_mode_sonar(sonar1Trig,sonar1Echo,callback=acquisition.register_sensor("sonar1",acquisition.SONAR,sonar1Trig),timeout=80000)
+        board.set_pin_mode_sonar(sonar2Trig,sonar2Echo,callback=acquisition.register_sensor("sonar2",acquisition.SONAR,sonar2Trig),timeout=80000)
+    board.set_pin_mode_analog_input(LDRPin,callback=acquisition.register_sensor("LDR",acquisition.ANALOG_INPUT,LDRPin))
 
     # Init value for string to display on 7 seg
     stringToDisplay = "     "
@@ -134,14 +290,6 @@ def initialise():
     board.digital_write(rclk,0)
     board.digital_write(s5FlashPin,0)
 
-    # Get start time of program for calculating current stage
-    loopStart = time.perf_counter()
-
-    # Pedestrian button variables
-    pedButtonCount = 0
-    lastPedButtonPress = -1
-    pedButtonDown = False
-
     # Dictionary for getting bits for seven segment display
     sevenSegLookupDict = {
         "0": "1111110",
@@ -189,37 +337,48 @@ def initialise():
     steinHartB = float(2.378405444e-04) #constant for Steinhart-Hart
     steinHartC = float(2.019202697e-07) #constant for Steinhart-Hart
 
-    pastSonarReading = [0] * 40 # init sonar reading list for dist sensor
+    import calibration
+    from ringbuffer import RingBuffer
+    from rollups import SensorRollup
+
+    # ADC value -> engineering unit tables, built once. The arrays are for converting in bulk, the lists for single reads (quicker to index one value)
+    thermistorTable = calibration.thermistor_table(steinHartA, steinHartB, steinHartC) # Temperature in celsius, 100k fixed resistor
+    thermistorLookup = thermistorTable.tolist()
+    LDRTable = calibration.LDR_voltage_table() # Voltage at divider junction
+    LDRLookup = LDRTable.tolist()
+
+    sensorHistoryLength = 40 # Number of readings (one every 0.5s) kept for each sensor
+    pastSonarReading = RingBuffer(sensorHistoryLength) # init sonar reading history for dist sensor
     sonarReadCount = 0 # init sonar read count for dist sensor
-    pastSonarReading2 = [0] * 40 # init sonar reading list for height sensor
+    pastSonarReading2 = RingBuffer(sensorHistoryLength) # init sonar reading history for height sensor
     sonarReadCount2 = 0 # init sonar read count for height sensor
-    pastThermReading = [0] * 40 # init sonar reading list for thermistor
+    pastThermReading = RingBuffer(sensorHistoryLength) # init sonar reading history for thermistor
     thermReadCount = 0 # init sonar read count for thermistor
-    pastLDRReading = [0] * 40 # init sonar reading list for LDR
+    pastLDRReading = RingBuffer(sensorHistoryLength) # init sonar reading history for LDR
     LDRReadCount = 0 # init sonar read count for LDR
+    sensorRollups = {sensorName: SensorRollup() for sensorName in ["sonar1","sonar2","therm","LDR"]} # 1s/1min/1h summaries of the readings for long history plots
+
+    # Sonar filtering (rolling median then Kalman filter), every reading goes through these and the histories get their estimates
+    sonarFilter1 = SonarFilter(medianWindow=5, maxRange=sonarMaxRange, measurementNoise=2.0, processNoise=5.0) # Median of 5 readings, readings over sonarMaxRange or 0 (no echo) thrown away
+    sonarFilter2 = SonarFilter(medianWindow=5, maxRange=sonarMaxRange, measurementNoise=2.0, processNoise=5.0)
+    speedingVelocity = 10 # Sonar 1 velocity (cm/s) over which a vehicle counts as speeding
+    breakdownStillVelocity = 3 # Sonar 1 speed (cm/s) under which a vehicle counts as stopped
+    breakdownStillSeconds = 3 # How long a vehicle has to be stopped for to count as broken down
+    breakdownDistance = 50 # Only vehicles stopped closer than this (cm) count as broken down
 
     lastS5Flash = 0 # init stage 5 led flash time keeping variable
     s5FlashState = 0 # init stage 5 led state
 
-    trafficTimingsDefault = [15,5,3,15,5,3] # Default traffic timings to copy from
-    trafficTimings = [15,5,3,15,5,3] # Init to default traffic timings in seconds
-    trafficTimingsBuffer = [15,5,3,15,5,3] # Init buffer for storing uncommitted changes to main timing array
-
-    stageStart = 0 # Init time the current stage started
-    curStage = 1 # Init current stage
-
-    thermistorTimingAdded = False # Init flag for whether timings were edited due to thermistor temp
     lastThermistor = 20 # Previous loop's thermistor reading
-    LDRTimingAdded = False # Init flag for whether timings were edited due to LDR readings
     lastLDR = 0 # Previous loop's LDR reading
 
-    dayNightStatus = "day" # Whether it is day or night right now
-
-    tempStatus = "normal" # Init temperature status
-    
     lastCloseDistPrint = 0 # Last time closest distance from approach ultrasonic was printed
 
+    # Shift register pins and output mode, timings, stage, pedestrian button, 7 seg mode and day/night/temperature statuses, passed into the hot path functions in outputstage
+    state = IntersectionState(board, boardLock, (sevenSegSer, lightSer, sSegControl, srclk, rclk), s5FlashPin, pedButtonPin, pastThermReading)
+
     shift_reg_reset()
+    _boardReady.set()
 
 def shift_reg_reset():
     """
@@ -231,17 +390,33 @@ def shift_reg_reset():
     """
     # Set shift register outputs off
     sSegControlOutput = [1,1,1,1,1,0,0,0]
-    for i in range(8)[::-1]:
-        board.digital_write(sevenSegSer,0)
-        board.digital_write(lightSer,0)
-        board.digital_write(sSegControl,sSegControlOutput[i])
-        board.digital_write(srclk,1)
-        board.digital_write(srclk,0)
-    board.digital_write(rclk,1)
-    board.digital_write(rclk,0)
+    frame = tuple((0, 0, sSegControlOutput[i]) for i in range(8)[::-1])
+    pins = (sevenSegSer, lightSer, sSegControl, srclk, rclk)
+
+    # Nothing to do if the outputs are already off, e.g. on every pass of the menus
+    frames = [frame]
+    if state.outputDirtyCheck:
+        frames = outputmanager.filter_frames(frames, pins[0:3], 1)
+    else:
+        outputmanager.invalidate()
+
+    if frames and state.outputMode == "port":
+        portwrite.shift_out_frame(board, frame, pins, 0, 1)
+    elif frames and state.outputMode == "sysex":
+        bulkshift.send_bulk_shift(board, frames, pins, 0)
+    elif frames:
+        for i in range(8)[::-1]:
+            board.digital_write(sevenSegSer,0)
+            board.digital_write(lightSer,0)
+            board.digital_write(sSegControl,sSegControlOutput[i])
+            board.digital_write(srclk,1)
+            board.digital_write(srclk,0)
+        board.digital_write(rclk,1)
+        board.digital_write(rclk,0)
 
     # Also reset light flash
-    board.digital_write(s5FlashPin,0)
+    if not state.outputDirtyCheck or outputmanager.pin_needs_write(s5FlashPin, 0):
+        board.digital_write(s5FlashPin,0)
 
 def thermistor_read():
     """
@@ -251,10 +426,19 @@ def thermistor_read():
     Returns:
         curTemp (current temperature, in celsius)
     """
-    thermVoltage = board.analog_read(thermPin)[0]*(5.0/1023.0) # Get voltage at divider junction
-    thermResistor2 = (100000*thermVoltage)/(5-thermVoltage) # Then get the resistance of the thermistor
-    curTemp = (1/(steinHartA + steinHartB*math.log(thermResistor2) + steinHartC*(math.log(thermResistor2)**3)))-273.15 # From https://en.wikipedia.org/wiki/Steinhart%E2%80%93Hart_equation
-    return curTemp
+    reading = board.analog_read(thermPin)
+    acquisition.poll_sample("therm", reading) # Keeps the freshness and sample rate counts up to date
+    return thermistor_convert(reading[0])
+
+def thermistor_convert(rawValue):
+    """
+    Function to convert a raw thermistor ADC value to a temperature, from the table built in initialise().
+    Parameters:
+        rawValue (0-1023 ADC value)
+    Returns:
+        curTemp (temperature, in celsius)
+    """
+    return thermistorLookup[int(rawValue)]
 
 def LDR_read():
     """
@@ -264,5 +448,16 @@ def LDR_read():
     Returns:
         LDRVoltage (Voltage at voltage divider junction, in V)
     """
-    LDRVoltage = board.analog_read(LDRPin)[0]*(5.0/1023.0) # Get voltage at divider junction
-    return LDRVoltage
\ No newline at end of file
+    reading = board.analog_read(LDRPin)
+    acquisition.poll_sample("LDR", reading) # Keeps the freshness and sample rate counts up to date
+    return LDR_convert(reading[0])
+
+def LDR_convert(rawValue):
+    """
+    Function to convert a raw LDR ADC value to the voltage at the divider junction, from the table built in initialise().
+    Parameters:
+        rawValue (0-1023 ADC value)
+    Returns:
+        LDRVoltage (Voltage at voltage divider junction, in V)
+    """
+    return LDRLookup[int(rawValue)]
\ No newline at end of file
@@ -0,0 +1,135 @@
+# Sonar filter script
+# This script smooths sonar readings as they arrive: a rolling median throws out single bad echoes, then a 1-D Kalman filter estimates distance and velocity.
+# Everything is kept in plain floats and fixed size lists, so each reading takes the same time and nothing is allocated per reading.
+# Once the sonar stops giving usable readings (the vehicle has gone out of range) the estimate is forgotten, so an old velocity or distance isn't kept forever.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import bisect
+
+class SonarFilter:
+    """
+    Streaming median + constant velocity Kalman filter for one sonar. Velocity is positive when the distance is growing.
+    With no current estimate (count is 0) distance is maxRange, nothing in range, and velocity is 0.
+    """
+
+    def __init__(self, medianWindow=5, maxRange=400, measurementNoise=2.0, processNoise=5.0, maxRejects=5, staleSeconds=1.0):
+        """
+        Parameters:
+            medianWindow (readings the median is taken over, odd)
+            maxRange (readings above this, in cm, or 0 (no echo) are thrown away)
+            measurementNoise (standard deviation of a reading, in cm)
+            processNoise (standard deviation of how fast a vehicle changes speed, in cm/s^2)
+            maxRejects (the estimate is forgotten after this many thrown away readings in a row)
+            staleSeconds (the estimate is forgotten if the last reading was thrown away and none has been used for this long, see check_stale())
+        """
+        self.medianWindow = medianWindow
+        self.maxRange = maxRange
+        self.maxRejects = maxRejects
+        self.staleSeconds = staleSeconds
+        self._measurementVariance = measurementNoise ** 2
+        self._processVariance = processNoise ** 2
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets every reading.
+        """
+        self._forget()
+        self.rejectedCount = 0 # Readings thrown away as out of range
+
+    def _forget(self):
+        """
+        Forgets the estimate and the median window.
+        """
+        self._window = [0.0] * self.medianWindow # Last readings in arrival order (a ring)
+        self._sorted = [] # The same readings, sorted
+        self._nextSlot = 0
+
+        self.distance = float(self.maxRange)
+        self.velocity = 0.0
+        self._p00 = 0.0 # Estimate covariance [[p00, p01], [p01, p11]]
+        self._p01 = 0.0
+        self._p11 = 0.0
+        self.timestamp = None # Time of the last reading used
+        self.count = 0 # Readings used
+        self._rejectsInRow = 0 # Readings thrown away since the last one used
+
+    def _median(self, reading):
+        """
+        Adds a reading to the window and gets the window's median.
+        """
+        if len(self._sorted) == self.medianWindow:
+            oldest = self._window[self._nextSlot]
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._window[self._nextSlot] = reading
+        self._nextSlot = (self._nextSlot + 1) % self.medianWindow
+        bisect.insort(self._sorted, reading)
+        return self._sorted[len(self._sorted) // 2]
+
+    def update(self, reading, timestamp):
+        """
+        Filters a new reading.
+        Parameters:
+            reading (sonar distance, in cm)
+            timestamp (time of the reading, in s)
+        Returns:
+            used (False if it was out of range or not newer than the last reading)
+        """
+        reading = float(reading)
+        if reading <= 0 or reading > self.maxRange:
+            self.rejectedCount += 1
+            self._rejectsInRow += 1
+            if self.count and self._rejectsInRow >= self.maxRejects:
+                self._forget() # Out of range, the vehicle has gone
+            return False
+        if self.timestamp is not None and timestamp <= self.timestamp:
+            return False # The same echo read again
+        self._rejectsInRow = 0
+        measurement = self._median(reading)
+
+        if self.count == 0:
+            # Start from the first reading, not moving, with a wide velocity uncertainty
+            self.distance = measurement
+            self.velocity = 0.0
+            self._p00 = self._measurementVariance
+            self._p01 = 0.0
+            self._p11 = 100.0 ** 2
+        else:
+            # Predict forward to this reading
+            dt = timestamp - self.timestamp
+            q = self._processVariance
+            self.distance += self.velocity * dt
+            self._p00 += 2*dt*self._p01 + dt*dt*self._p11 + q*dt**3/3
+            self._p01 += dt*self._p11 + q*dt*dt/2
+            self._p11 += q*dt
+
+            # Correct with the median
+            innovation = measurement - self.distance
+            innovationVariance = self._p00 + self._measurementVariance
+            gainDistance = self._p00 / innovationVariance
+            gainVelocity = self._p01 / innovationVariance
+            self.distance += gainDistance * innovation
+            self.velocity += gainVelocity * innovation
+            self._p11 -= gainVelocity * self._p01
+            self._p00 *= 1 - gainDistance
+            self._p01 *= 1 - gainDistance
+
+        self.timestamp = timestamp
+        self.count += 1
+        return True
+
+    def check_stale(self, now):
+        """
+        Function to forget the estimate if the sonar has gone out of range and stayed there. pymata4 only reports a reading when it changes,
+        so a vehicle going out of range can give one thrown away reading and then nothing. A vehicle standing still gives nothing at all and isn't stale.
+        Parameters:
+            now (time, in the same clock as the reading timestamps)
+        Returns:
+            stale (True if there's no current estimate)
+        """
+        if self.count and self._rejectsInRow and now - self.timestamp > self.staleSeconds:
+            self._forget()
+        return self.count == 0
@@ -0,0 +1,355 @@
+# Sonar ping script
+# This script has the board (firmware/sonarping.h) ping the sonars one at a time with a set gap between pings, instead of FirmataExpress pinging them on its own,
+# so one sonar can't hear another's ping and no time is lost waiting out an 80ms timeout when nothing that far away is being measured.
+# Every ping comes back with the board time it was triggered at, the echo timeout follows the range actually being measured, and each sonar's
+# sample rate and timeout/invalid rate are counted.
+# Run with: python sonarping.py [--virtual] [--gap <ms>] [--range <cm>] to watch the project's two sonars,
+# or python sonarping.py --height for the height tester (one sonar, trigger 7, echo 6) printing each distance as it arrives.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import argparse
+import threading
+import time
+
+# Sysex command ids, must match firmware/sonarping.h. 0x01-0x0F are left free by Firmata for user defined commands (bulkshift.py uses 0x0C).
+SONAR_SCHEDULE = 0x0D
+SONAR_ECHO = 0x0E
+maxScheduledSonars = 6
+
+SONAR = 12 # pymata4 callback pin type for sonars, so echoes can go straight into acquisition.pin_callback
+MICROS_PER_CM = 58 # Echo time for each cm of distance (there and back)
+timeoutAllowanceMicros = 1000 # Added to the echo time of the range, the sonar waits a bit before it starts its echo pulse
+minimumRange = 30 # The adaptive range never goes under this (cm)
+minimumValidDistance = 2 # HC-SR04s can't measure closer than this (cm)
+rangeMargin = 1.25 # The adaptive range is this much further than the furthest echo seen
+adaptWindow = 20 # Pings per sonar between range adjustments
+clockDriftAllowance = 0.01 # How fast (s per s) the board to host clock offset is allowed to grow, Arduino resonators are only good to about 0.5%
+_boardTimeWrap = 1 << 28 # Echo reports carry the low 28 bits of micros()
+
+def timeout_for_range(rangeCm):
+    """
+    Function to get the echo timeout needed to measure out to a range.
+    Parameters:
+        rangeCm (furthest distance to measure, in cm)
+    Returns:
+        timeoutMicros
+    """
+    return int(rangeCm * MICROS_PER_CM + timeoutAllowanceMicros)
+
+def encode_schedule(pins, gapMillis, timeoutMicros):
+    """
+    Function to build the sysex data for a ping schedule.
+    Parameters:
+        pins (list of (trigger pin, echo pin), pinged in this order, empty to stop pinging)
+        gapMillis (time after each ping before the next one, in ms, max 16383)
+        timeoutMicros (echo timeout, in us, max 2097151)
+    Returns:
+        sysexData (list of 7 bit data bytes, not including the sysex start/command/end bytes)
+    """
+    if len(pins) > maxScheduledSonars:
+        raise ValueError("The firmware can only schedule " + str(maxScheduledSonars) + " sonars")
+    if gapMillis < 0 or gapMillis > 0x3fff:
+        raise ValueError("gapMillis must be between 0 and 16383")
+    if timeoutMicros < 0 or timeoutMicros > 0x1fffff:
+        raise ValueError("timeoutMicros must be between 0 and 2097151")
+    sysexData = [gapMillis & 0x7f, (gapMillis >> 7) & 0x7f, timeoutMicros & 0x7f, (timeoutMicros >> 7) & 0x7f, (timeoutMicros >> 14) & 0x7f, len(pins)]
+    for triggerPin, echoPin in pins:
+        sysexData += [triggerPin, echoPin]
+    return sysexData
+
+def decode_schedule(sysexData):
+    """
+    Function which reads a ping schedule like the firmware does.
+    Parameters:
+        sysexData (data bytes from encode_schedule)
+    Returns:
+        pins, gapMillis, timeoutMicros
+    """
+    gapMillis = sysexData[0] | (sysexData[1] << 7)
+    timeoutMicros = sysexData[2] | (sysexData[3] << 7) | (sysexData[4] << 14)
+    pins = [(sysexData[6 + 2*i], sysexData[7 + 2*i]) for i in range(sysexData[5])]
+    return pins, gapMillis, timeoutMicros
+
+def encode_echo(index, distance, boardMicros):
+    """
+    Function to build an echo report like the firmware does (for the virtual board).
+    Parameters:
+        index (sonar index in the schedule)
+        distance (in cm, 0 for a timeout)
+        boardMicros (board micros() when the ping was triggered)
+    Returns:
+        sysexData
+    """
+    return [index, distance & 0x7f, (distance >> 7) & 0x7f] + [(boardMicros >> shift) & 0x7f for shift in (0, 7, 14, 21)]
+
+def decode_echo(sysexData):
+    """
+    Function to read an echo report.
+    Parameters:
+        sysexData (data bytes of a SONAR_ECHO message)
+    Returns:
+        index, distance (cm, 0 for a timeout), boardMicros (low 28 bits)
+    """
+    boardMicros = sysexData[3] | (sysexData[4] << 7) | (sysexData[5] << 14) | (sysexData[6] << 21)
+    return sysexData[0], sysexData[1] | (sysexData[2] << 7), boardMicros
+
+class SonarPingScheduler:
+    """
+    Runs the firmware ping schedule for a set of sonars and handles their echo reports (on pymata4's reader thread).
+    Every ping is passed to callback like a pymata4 sonar callback, [pin type, trigger pin, distance, timestamp], with the timestamp
+    being the host time.time() the ping was triggered at (worked out from the board's time). Timeouts have a distance of 0, so a sonar
+    filter can tell the sonar has nothing in range.
+    """
+
+    def __init__(self, board, sonars, gapMillis=10, maxRange=400, callback=None, adaptiveRange=True, lock=None):
+        """
+        Parameters:
+            board (pymata4 or virtual board running the sonar ping firmware)
+            sonars (list of (name, trigger pin, echo pin), pinged in this order)
+            gapMillis (time after each ping before the next one, in ms)
+            maxRange (furthest distance measured, in cm. Echoes further than this count as invalid)
+            callback (optional function given each ping, e.g. acquisition.pin_callback)
+            adaptiveRange (shorten the echo timeout to the range being measured)
+            lock (lock held when sending to the board, e.g. setup.boardLock)
+        """
+        if not hasattr(board, "report_dispatch"):
+            raise ValueError("Sonar ping scheduling needs a pymata4 or virtual board")
+        self.board = board
+        self.sonars = list(sonars)
+        self.gapMillis = gapMillis
+        self.maxRange = maxRange
+        self.callback = callback
+        self.adaptiveRange = adaptiveRange
+        self._lock = lock if lock is not None else threading.RLock()
+
+        self.range = maxRange
+        self.timeoutMicros = timeout_for_range(maxRange)
+        self.rangeChanges = 0
+        self.startTime = None
+        self.counts = {name: {"pings": 0, "samples": 0, "timeouts": 0, "invalid": 0} for name, _, _ in self.sonars}
+        self._latest = {name: [0, 0] for name, _, _ in self.sonars}
+
+        # Board clock
+        self._offset = None # host time.time() - board time, the smallest seen (least delayed report)
+        self._lastBoardMicros = None
+        self._boardWraps = 0
+        self._lastBoardSeconds = None
+
+        # Range adjustment
+        self._windowPings = 0
+        self._windowTimeouts = 0
+        self._windowFurthest = 0
+
+    def _send_schedule(self, pins):
+        with self._lock:
+            self.board._send_sysex(SONAR_SCHEDULE, encode_schedule(pins, self.gapMillis, self.timeoutMicros))
+
+    def start(self):
+        """
+        Starts the board pinging.
+        """
+        self.board.report_dispatch[SONAR_ECHO] = [self._echo, 7]
+        self.startTime = time.time()
+        self._send_schedule([(triggerPin, echoPin) for _, triggerPin, echoPin in self.sonars])
+
+    def stop(self):
+        """
+        Stops the board pinging.
+        """
+        self._send_schedule([])
+
+    def _host_time(self, boardMicros, arrivalTime):
+        """
+        Turns the board time of a ping into host time.time().
+        """
+        if self._lastBoardMicros is not None and boardMicros < self._lastBoardMicros:
+            self._boardWraps += 1
+        self._lastBoardMicros = boardMicros
+        boardSeconds = (self._boardWraps * _boardTimeWrap + boardMicros) / 1e6
+
+        # Reports are only ever delayed, so the smallest offset is the closest to the real one. It's let grow slowly in case the board clock runs slow.
+        sampleOffset = arrivalTime - boardSeconds
+        if self._offset is None:
+            self._offset = sampleOffset
+        else:
+            self._offset = min(sampleOffset, self._offset + clockDriftAllowance * (boardSeconds - self._lastBoardSeconds))
+        self._lastBoardSeconds = boardSeconds
+        return boardSeconds + self._offset
+
+    def _echo(self, data):
+        """
+        pymata4 sysex handler for echo reports.
+        """
+        arrivalTime = time.time()
+        index, distance, boardMicros = decode_echo(data)
+        if index >= len(self.sonars):
+            return
+        name, triggerPin, _ = self.sonars[index]
+        timestamp = self._host_time(boardMicros, arrivalTime)
+
+        counts = self.counts[name]
+        counts["pings"] += 1
+        if distance == 0:
+            counts["timeouts"] += 1
+        elif distance < minimumValidDistance or distance > self.maxRange:
+            counts["invalid"] += 1
+        else:
+            counts["samples"] += 1
+            self._latest[name] = [distance, timestamp]
+        if self.callback is not None:
+            self.callback([SONAR, triggerPin, distance, timestamp])
+
+        if self.adaptiveRange:
+            self._adapt_range(distance)
+
+    def _adapt_range(self, distance):
+        """
+        Shortens the range to just past the furthest echo, or doubles it back when pings start timing out.
+        """
+        self._windowPings += 1
+        if distance == 0:
+            self._windowTimeouts += 1
+        elif distance <= self.maxRange:
+            self._windowFurthest = max(self._windowFurthest, distance)
+        if self._windowPings < adaptWindow * len(self.sonars):
+            return
+
+        if self._windowTimeouts > 0:
+            newRange = min(self.maxRange, self.range * 2) # Something may be out past the range
+        else:
+            newRange = min(self.maxRange, max(minimumRange, self._windowFurthest * rangeMargin))
+        self._windowPings = 0
+        self._windowTimeouts = 0
+        self._windowFurthest = 0
+
+        # Only resend when it makes a real difference
+        newTimeout = timeout_for_range(newRange)
+        if abs(newTimeout - self.timeoutMicros) > 0.1 * self.timeoutMicros:
+            self.range = newRange
+            self.timeoutMicros = newTimeout
+            self.rangeChanges += 1
+            self._send_schedule([(triggerPin, echoPin) for _, triggerPin, echoPin in self.sonars])
+
+    def read(self, name):
+        """
+        Function to get a sonar's last valid echo, like pymata4's sonar_read.
+        Parameters:
+            name (sonar name)
+        Returns:
+            [distance, timestamp] ([0, 0] if there hasn't been one)
+        """
+        return list(self._latest[name])
+
+    def sensor_stats(self, now=None):
+        """
+        Function to get each sonar's ping counts and rates since start().
+        Parameters:
+            now (time.time() to measure up to, defaults to now)
+        Returns:
+            stats (dict of sonar name -> dict of pings, samples, timeouts, invalid, pingRate, sampleRate (per s), timeoutRate, invalidRate (fraction of pings))
+        """
+        elapsed = max((now if now is not None else time.time()) - (self.startTime or 0), 1e-9)
+        stats = {}
+        for name, counts in self.counts.items():
+            pings = max(counts["pings"], 1)
+            stats[name] = dict(counts, pingRate=counts["pings"] / elapsed, sampleRate=counts["samples"] / elapsed,
+                               timeoutRate=counts["timeouts"] / pings, invalidRate=counts["invalid"] / pings)
+        return stats
+
+    def report_lines(self):
+        """
+        Gets sensor_stats() as lines to print.
+        """
+        lines = ["Sonar pings " + str(self.gapMillis) + "ms apart, range " + str(round(self.range)) + "cm (timeout " + str(round(self.timeoutMicros / 1000, 1)) + "ms, "
+                 + str(self.rangeChanges) + " changes)."]
+        for name, stats in self.sensor_stats().items():
+            lines.append('{:<8}{:>7.1f} pings/s {:>7.1f} samples/s {:>6.1f}% timeouts {:>6.1f}% invalid'.format(
+                name, stats["pingRate"], stats["sampleRate"], stats["timeoutRate"] * 100, stats["invalidRate"] * 100))
+        return lines
+
+def _connect(virtual, sonars):
+    """
+    Connects to the board for the standalone modes.
+    """
+    if virtual:
+        import virtualboard
+        board = virtualboard.VirtualBoard()
+        for _, triggerPin, _ in sonars:
+            board.set_waveform("sonar", triggerPin, lambda t: 100)
+        return board
+    from pymata4 import pymata4
+    return pymata4.Pymata4()
+
+def height_mode(board=None, triggerPin=7, echoPin=6, gapMillis=10, maxRange=400, virtual=False):
+    """
+    Height tester. Prints each distance as it arrives until CTRL C, then the sample rates.
+    Parameters:
+        board (board to use, connects to one if None)
+        triggerPin, echoPin (height sonar pins)
+        gapMillis (time after each ping before the next one, in ms)
+        maxRange (furthest distance measured, in cm)
+        virtual (use a virtual board when connecting)
+    Returns:
+        None
+    """
+    sonars = [("height", triggerPin, echoPin)]
+    ownBoard = board is None
+    if ownBoard:
+        board = _connect(virtual, sonars)
+    scheduler = SonarPingScheduler(board, sonars, gapMillis=gapMillis, maxRange=maxRange, callback=lambda data: print(data[2]))
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("finished ")
+    finally:
+        scheduler.stop()
+        print("\n".join(scheduler.report_lines()))
+        if ownBoard:
+            board.shutdown()
+
+def watch_mode(board=None, sonars=(("sonar1", 5, 4), ("sonar2", 13, 12)), gapMillis=10, maxRange=400, virtual=False):
+    """
+    Pings the project's sonars and prints their latest distances and rates every second until CTRL C.
+    Parameters:
+        board (board to use, connects to one if None)
+        sonars (list of (name, trigger pin, echo pin), the default is the wiring in setup.initialise)
+        gapMillis (time after each ping before the next one, in ms)
+        maxRange (furthest distance measured, in cm)
+        virtual (use a virtual board when connecting)
+    Returns:
+        None
+    """
+    ownBoard = board is None
+    if ownBoard:
+        board = _connect(virtual, sonars)
+    scheduler = SonarPingScheduler(board, sonars, gapMillis=gapMillis, maxRange=maxRange)
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+            print("\n" + ", ".join(name + " " + str(scheduler.read(name)[0]) + "cm" for name, _, _ in sonars))
+            print("\n".join(scheduler.report_lines()))
+    except KeyboardInterrupt:
+        print("finished ")
+    finally:
+        scheduler.stop()
+        if ownBoard:
+            board.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduled sonar pinging (needs the firmware/sonarping.h firmware).")
+    parser.add_argument("--height", action="store_true", help="height tester, one sonar on trigger 7/echo 6, printing every distance")
+    parser.add_argument("--virtual", action="store_true", help="use a virtual board instead of an Arduino")
+    parser.add_argument("--gap", type=int, default=10, help="gap after each ping in ms")
+    parser.add_argument("--range", type=int, default=400, help="furthest distance measured in cm")
+    args = parser.parse_args()
+
+    if args.height:
+        height_mode(gapMillis=args.gap, maxRange=args.range, virtual=args.virtual)
+    else:
+        watch_mode(gapMillis=args.gap, maxRange=args.range, virtual=args.virtual)
@@ -0,0 +1,208 @@
+# Supervisor script
+# This script runs normal operation for several intersections from one computer, one worker process per board (each with its own setup globals),
+# so the boards run on separate cores and a slow board can't hold up another's stage timing.
+# Each worker writes its status into shared memory and its console output to its own log file, the supervisor shows them all in one table.
+# Run with: python supervisor.py <config file>, or python supervisor.py --virtual <number of boards> to try it without Arduinos.
+# The config file is a JSON list with one entry per board:
+#   {"name": "north", "comPort": "COM3", "backend": "pymata4", "pins": {"sevenSegSer": 9, ...}, "trafficTimings": [15,5,3,15,5,3], "settings": {"outputMode": "port"}}
+# Only name is needed, pins/settings are setup.initialise globals (or setup.state values, e.g. sevenSegMode, or setup module settings read by initialise, e.g. sonarMode)
+# to change and backend is pymata4 (default) or virtual.
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+# Worker states
+STARTING = 0
+RUNNING = 1
+STOPPED = 2
+FAILED = 3
+stateNames = ["starting", "running", "stopped", "failed"]
+
+# Status values each worker keeps up to date, one row of the shared array per board
+statusFields = ["state", "stage", "stageTime", "loops", "loopPeriod", "sonar1", "therm", "LDR", "pedPresses", "heartbeat"]
+statusPeriod = 0.25 # How often workers update their status
+
+def _worker(boardConfig, statusArray, row, stopEvent):
+    """
+    Worker process for one board. Connects, initialises and runs main.normal_operating_mode until the maintenance switch is closed or stopEvent is set.
+    """
+    # Imported here so each spawned worker gets its own setup globals and board
+    import setup
+    import main
+    import metrics
+    import sensorstore
+    from intersectionstate import IntersectionState
+
+    name = boardConfig["name"]
+    rowStart = row * len(statusFields)
+    status = statusArray # Written only by this worker (its own row), no lock needed
+    status[rowStart + statusFields.index("state")] = STARTING
+
+    with open("supervisor_" + name + ".log", "a") as logFile, contextlib.redirect_stdout(logFile):
+        try:
+            # Connect
+            setup.boardTraceFile = boardConfig.get("traceFile")
+            settings = boardConfig.get("settings", {})
+            if boardConfig.get("backend", "pymata4") == "virtual":
+                import virtualboard
+                setup.connect_board(virtualboard.default_virtual_board(pinMap=boardConfig.get("pins")))
+            else:
+                from pymata4 import pymata4
+                setup.connect_board(pymata4.Pymata4(com_port=boardConfig.get("comPort"), baud_rate=500000))
+            # Settings initialise() reads instead of setting (e.g. sonarMode) have to be in place before it runs
+            for settingName, value in settings.items():
+                if hasattr(setup, settingName):
+                    setattr(setup, settingName, value)
+            setup.initialise(boardConfig.get("pins"))
+
+            # This board's settings
+            for settingName, value in settings.items():
+                setattr(setup.state if settingName in IntersectionState.__slots__ else setup, settingName, value)
+            if "trafficTimings" in boardConfig:
+                setup.state.trafficTimingsDefault = list(boardConfig["trafficTimings"])
+                setup.state.trafficTimings = list(boardConfig["trafficTimings"])
+            setup.sensorLogDirectory = os.path.join(setup.sensorLogDirectory, name) # Keep each board's sensor log apart
+
+            loopPeriod = metrics.histogram("loop.period")
+            pedestrianPresses = metrics.counter("pedestrian.presses")
+
+            def publish_status():
+                values = [RUNNING, setup.state.curStage, time.perf_counter() - setup.state.stageStart, loopPeriod.count, loopPeriod.total / max(loopPeriod.count, 1),
+                          setup.pastSonarReading[-1], setup.pastThermReading[-1], setup.pastLDRReading[-1], pedestrianPresses.value, time.time()]
+                status[rowStart:rowStart + len(statusFields)] = values
+                if stopEvent.is_set():
+                    main.loopScheduler.stop()
+
+            main.normal_operating_mode(extraTasks=[("status", statusPeriod, publish_status)])
+            main.stop_display_refresh()
+            sensorstore.stop_store()
+            status[rowStart + statusFields.index("state")] = STOPPED
+        except KeyboardInterrupt:
+            status[rowStart + statusFields.index("state")] = STOPPED
+        except Exception:
+            traceback.print_exc(file=logFile)
+            status[rowStart + statusFields.index("state")] = FAILED
+        finally:
+            # Clear outputs and disconnect
+            if setup.board is not None:
+                try:
+                    setup.shift_reg_reset()
+                    setup.shutdown_board()
+                except Exception:
+                    traceback.print_exc(file=logFile)
+
+class Supervisor:
+    """
+    Starts a worker process per board and reads their shared status.
+    """
+
+    def __init__(self, boardConfigs):
+        """
+        Parameters:
+            boardConfigs (list of board config dicts, see the top of this file)
+        """
+        names = [boardConfig["name"] for boardConfig in boardConfigs]
+        if len(set(names)) != len(names):
+            raise ValueError("Board names must be unique")
+        self.boardConfigs = boardConfigs
+        context = multiprocessing.get_context("spawn") # Fresh interpreter per board, nothing inherited from this process
+        self.statusArray = context.RawArray("d", len(boardConfigs) * len(statusFields))
+        self.stopEvent = context.Event()
+        self.processes = [context.Process(target=_worker, args=(boardConfig, self.statusArray, row, self.stopEvent), name=boardConfig["name"])
+                          for row, boardConfig in enumerate(boardConfigs)]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def stop(self, timeout=10):
+        """
+        Asks every worker to stop, waits for them and kills any that don't.
+        """
+        self.stopEvent.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def running(self):
+        return any(process.is_alive() for process in self.processes)
+
+    def status(self):
+        """
+        Gets every board's status.
+        Parameters:
+            None
+        Returns:
+            statuses (dict of board name -> dict of status field -> value)
+        """
+        statuses = {}
+        for row, boardConfig in enumerate(self.boardConfigs):
+            rowStart = row * len(statusFields)
+            statuses[boardConfig["name"]] = dict(zip(statusFields, self.statusArray[rowStart:rowStart + len(statusFields)]))
+            # A worker that died without saying so shows as failed
+            if not self.processes[row].is_alive() and statuses[boardConfig["name"]]["state"] in (STARTING, RUNNING):
+                statuses[boardConfig["name"]]["state"] = FAILED
+        return statuses
+
+    def status_lines(self):
+        """
+        Gets the status of every board as a table, one line per board.
+        Parameters:
+            None
+        Returns:
+            lines (list of strings)
+        """
+        lines = ['{:<12}{:<10}{:>6}{:>10}{:>8}{:>10}{:>9}{:>8}{:>7}{:>9}{:>8}'.format("board", "state", "stage", "in stage", "loops", "loop ms", "sonar1", "temp", "LDR", "presses", "age")]
+        for name, values in self.status().items():
+            age = time.time() - values["heartbeat"] if values["heartbeat"] else float("nan")
+            lines.append('{:<12}{:<10}{:>6.0f}{:>9.1f}s{:>8.0f}{:>10.1f}{:>9.1f}{:>8.1f}{:>7.2f}{:>9.0f}{:>7.1f}s'.format(
+                name, stateNames[int(values["state"])], values["stage"], values["stageTime"], values["loops"], values["loopPeriod"]*1000,
+                values["sonar1"], values["therm"], values["LDR"], values["pedPresses"], age))
+        return lines
+
+def load_config(fileName):
+    """
+    Function to read the board config file.
+    Parameters:
+        fileName (JSON config file)
+    Returns:
+        boardConfigs (list of board config dicts)
+    """
+    with open(fileName) as configFile:
+        boardConfigs = json.load(configFile)
+    for boardConfig in boardConfigs:
+        if "name" not in boardConfig:
+            raise ValueError("Every board in " + fileName + " needs a name")
+    return boardConfigs
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--virtual":
+        boardConfigs = [{"name": "virtual" + str(i + 1), "backend": "virtual"} for i in range(int(sys.argv[2]))]
+    elif len(sys.argv) == 2:
+        boardConfigs = load_config(sys.argv[1])
+    else:
+        print("Usage: python supervisor.py <config file> | --virtual <number of boards>")
+        sys.exit(1)
+
+    supervisor = Supervisor(boardConfigs)
+    supervisor.start()
+    print("Started " + str(len(boardConfigs)) + " boards, each board's console output goes to supervisor_<name>.log. Press CTRL C to stop.")
+    try:
+        while supervisor.running():
+            print("\n" + "\n".join(supervisor.status_lines()))
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping all boards...")
+    finally:
+        supervisor.stop()
+        print("\n".join(supervisor.status_lines()))
@@ -0,0 +1,543 @@
+# Traffic simulator script
+# This script replays synthetic or recorded arrivals against the normal operation stage machine offline, to compare timing plans.
+# Every intersection (timing plan x arrival run) is stepped together as NumPy arrays of stage, stage start and queue length, one stage at a time,
+# with stage ends worked out on the same stage_tracker loop ticks so the stage sequence (and so the stageLights patterns) is the same as outputstage's.
+# Plans are searched (grid or random) over a process pool and each gets throughput, vehicle delay and pedestrian wait.
+# Run with: python trafficsim.py [--hours 100] [--grid stage1=10,15,20 stage4=10,15] [--random 50] [--log sensorlog] [--check]
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+import argparse
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+# get required global variables, functions, etc
+import outputstage
+import sensorstore
+
+# Approaches
+MAIN = 0
+SIDE = 1
+PED = 2
+approachNames = ["main", "side", "pedestrian"]
+greenLightIndex = [2, 5, 7] # Each approach's green in the stage light patterns
+
+# A plan is the 6 stage lengths plus the night and temperature adjustments (IntersectionState.nightGreenTimings and hotGreenExtra)
+planFields = ["stage1", "stage2", "stage3", "stage4", "stage5", "stage6", "nightMainGreen", "nightSideGreen", "hotGreenExtra"]
+defaultPlan = [15, 5, 3, 15, 5, 3, 45, 10, 5]
+tickSeconds = 0.1 # setup.normOpLoopTime, how often stage_tracker checks for the end of a stage
+saturationFlow = 0.5 # Vehicles per second a queue clears at on green
+
+class Scenario:
+    """
+    Arrivals and day/night/temperature conditions to replay. Times are in s from midnight of the first day.
+    Night and hot are given as hours of the day, which keeps them to at most one change during a stage (stages are all under an hour).
+    """
+
+    def __init__(self, arrivals, duration, nightHours=(19, 7), hotHours=(), runDurations=None):
+        """
+        Parameters:
+            arrivals (list with one entry per run of [main, side, pedestrian] sorted arrival time arrays)
+            duration (length of the scenario in s)
+            nightHours ((first hour, hour after the last) of night, e.g. (19, 7), or None for never)
+            hotHours (hours of the day, 0-23, that count as hot)
+            runDurations (length of each run in s if they're not all duration long)
+        """
+        self.arrivals = arrivals
+        self.duration = duration
+        self.runDurations = np.full(len(arrivals), float(duration)) if runDurations is None else np.asarray(runDurations, dtype=np.float64)
+        self.nightHours = nightHours
+        self.hotHours = list(hotHours)
+
+        # Whether each hour of the day is night/hot, looked up rather than worked out on every check
+        hours = np.arange(24)
+        if nightHours is None:
+            self._nightByHour = np.zeros(24, dtype=bool)
+        elif nightHours[0] > nightHours[1]:
+            self._nightByHour = (hours >= nightHours[0]) | (hours < nightHours[1])
+        else:
+            self._nightByHour = (hours >= nightHours[0]) & (hours < nightHours[1])
+        self._hotByHour = np.isin(hours, self.hotHours)
+
+    @property
+    def runs(self):
+        return len(self.arrivals)
+
+    def is_night(self, times):
+        return self._nightByHour[(np.asarray(times) // 3600).astype(np.int64) % 24]
+
+    def is_hot(self, times):
+        return self._hotByHour[(np.asarray(times) // 3600).astype(np.int64) % 24]
+
+    def split_days(self, days=1):
+        """
+        Function to cut every run into blocks of whole days, each its own run, so long scenarios are simulated as many short ones side by side.
+        Each block starts like a fresh entry into normal operation (stage 1, empty queues), the hours of the day still line up.
+        Parameters:
+            days (length of each block)
+        Returns:
+            scenario (Scenario)
+        """
+        blockLength = days * 86400
+        blockCount = int(np.ceil(self.duration / blockLength))
+        if blockCount <= 1:
+            return self
+        arrivals = []
+        runDurations = []
+        for runArrivals, runDuration in zip(self.arrivals, self.runDurations):
+            for block in range(blockCount):
+                blockStart = block * blockLength
+                if blockStart >= runDuration:
+                    break
+                arrivals.append([approachTimes[(approachTimes >= blockStart) & (approachTimes < blockStart + blockLength)] - blockStart for approachTimes in runArrivals])
+                runDurations.append(min(blockLength, runDuration - blockStart))
+        return Scenario(arrivals, blockLength, self.nightHours, self.hotHours, runDurations)
+
+def synthetic_scenario(hours, rates=(600, 150, 60), runs=4, seed=0, nightHours=(19, 7), hotHours=()):
+    """
+    Function to make a scenario of random (Poisson) arrivals.
+    Parameters:
+        hours (length of the scenario)
+        rates ((main, side, pedestrian) arrivals per hour)
+        runs (independent arrival runs, every plan is simulated against all of them)
+        seed (random seed, the same seed gives the same arrivals)
+        nightHours, hotHours (see Scenario)
+    Returns:
+        scenario (Scenario)
+    """
+    duration = hours * 3600
+    arrivals = []
+    for run in range(runs):
+        rng = np.random.default_rng([seed, run])
+        arrivals.append([np.sort(rng.uniform(0, duration, rng.poisson(rate * hours))) for rate in rates])
+    return Scenario(arrivals, duration, nightHours, hotHours)
+
+def _detections(times, values, detectDistance):
+    """
+    Function to get the times a sonar starts seeing a vehicle (reading goes under detectDistance).
+    """
+    detected = values < detectDistance
+    starts = detected & ~np.concatenate(([False], detected[:-1]))
+    return times[starts]
+
+def recorded_scenario(directory, hours, approachDetectDistance=50, sidePresenceDistance=50, nightHours=None, hotHours=None):
+    """
+    Function to make a scenario from the sensor log, repeated (whole days at a time) to fill the hours asked for.
+    Vehicles are counted when a sonar starts seeing one, pedestrians on each button press.
+    Night and hot hours are taken from the logged LDR and thermistor readings (averaged per hour of the day) unless given.
+    Parameters:
+        directory (sensor log directory)
+        hours (length of the scenario)
+        approachDetectDistance (sonar 1 readings under this, in cm, are a main road vehicle)
+        sidePresenceDistance (sonar 2 readings under this, in cm, are a side road vehicle)
+        nightHours, hotHours (see Scenario, None to work them out from the log)
+    Returns:
+        scenario (Scenario, one run)
+    """
+    times, values, channels = sensorstore.read_range(directory)
+    if len(times) == 0:
+        raise ValueError("No sensor log in " + directory)
+    firstTime = time.localtime(times[0])
+    midnight = times[0] - (firstTime.tm_hour*3600 + firstTime.tm_min*60 + firstTime.tm_sec)
+    times = times - midnight
+    values = values.astype(np.float64)
+
+    recorded = [
+        _detections(times[channels == sensorstore.SONAR1], values[channels == sensorstore.SONAR1], approachDetectDistance),
+        _detections(times[channels == sensorstore.SONAR2], values[channels == sensorstore.SONAR2], sidePresenceDistance),
+        times[(channels == sensorstore.PED_BUTTON) & (values == 1)],
+    ]
+
+    # Hourly conditions, same thresholds as inputstage (LDR) and IntersectionState.hotTemperature
+    def hourly_mean(channel):
+        channelHours = (times[channels == channel] // 3600).astype(np.int64) % 24
+        sums = np.bincount(channelHours, values[channels == channel], minlength=24)
+        counts = np.bincount(channelHours, minlength=24)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    if nightHours is None:
+        nightByHour = hourly_mean(sensorstore.LDR) >= 2.5
+        nightStarts = np.flatnonzero(nightByHour & ~np.roll(nightByHour, 1))
+        nightEnds = np.flatnonzero(~nightByHour & np.roll(nightByHour, 1))
+        if nightByHour.all():
+            nightHours = (0, 24)
+        elif len(nightStarts):
+            # The first night if there's more than one, ending at the first end after it (going round midnight if there isn't one later that day)
+            nightEnd = nightEnds[np.searchsorted(nightEnds, nightStarts[0], side="right") % len(nightEnds)]
+            nightHours = (int(nightStarts[0]), int(nightEnd))
+    if hotHours is None:
+        hotHours = np.flatnonzero(hourly_mean(sensorstore.THERM) > 35).tolist()
+
+    # Repeat the log whole days at a time so the hours of the day still line up
+    duration = hours * 3600
+    period = np.ceil(max(times[-1], 1) / 86400) * 86400
+    repeats = int(np.ceil(duration / period))
+    arrivals = []
+    for approachTimes in recorded:
+        tiled = np.concatenate([approachTimes + repeat*period for repeat in range(repeats)])
+        arrivals.append(tiled[tiled < duration])
+    return Scenario([arrivals], duration, nightHours, hotHours)
+
+def _check_plans(plans):
+    plans = np.atleast_2d(np.asarray(plans, dtype=np.float64))
+    if plans.shape[1] != len(planFields):
+        raise ValueError("Plans need " + str(len(planFields)) + " values: " + ", ".join(planFields))
+    if (plans[:, :8] <= 0).any() or (plans[:, 8] < 0).any():
+        raise ValueError("Plan times must be positive")
+    longest = np.maximum(plans[:, :6].max(axis=1), np.maximum(plans[:, 6], plans[:, 7]) + plans[:, 8])
+    if (longest >= 3600).any():
+        raise ValueError("Stages must be under an hour")
+    return plans
+
+def _end_tick(startTick, timing, tickSeconds):
+    """
+    Function to get the tick each stage ends on: the first one where (tick time - stage start time) > timing, the same float comparison stage_tracker makes.
+    """
+    endTick = startTick + np.maximum(np.floor(timing / tickSeconds).astype(np.int64) - 1, 1)
+    startTime = startTick * tickSeconds
+    while True:
+        early = (endTick * tickSeconds - startTime) <= timing
+        if not early.any():
+            return endTick
+        endTick = endTick + early
+
+def _first_true(condition, firstTick, lastTick, tickSeconds):
+    """
+    Function to get the first tick in [firstTick, lastTick] that condition is true on, or -1, assuming it changes at most once in that range.
+    """
+    first = np.full(len(firstTick), -1, dtype=np.int64)
+    startTrue = condition(firstTick * tickSeconds)
+    first[startTrue] = firstTick[startTrue]
+    search = ~startTrue & condition(lastTick * tickSeconds)
+    low = firstTick[search]
+    high = lastTick[search]
+    while True:
+        narrowing = high - low > 1
+        if not narrowing.any():
+            break
+        middle = (low + high) // 2
+        middleTrue = condition(middle * tickSeconds)
+        high = np.where(narrowing & middleTrue, middle, high)
+        low = np.where(narrowing & ~middleTrue, middle, low)
+    first[search] = high
+    return first
+
+def _stage_steps(plans, durations, scenario, tickSeconds):
+    """
+    Generator that steps every intersection through one stage at a time, the way stage_tracker_reset and stage_tracker (called every tick) do.
+    The timings each stage runs for are committed from the buffer built during the stage before, with the night greens set the first tick it's night
+    and the hot extra added the first tick it's hot (so heat before night is overwritten, like stage_tracker).
+    Parameters:
+        plans (one plan per intersection)
+        durations (length in s of each intersection's run)
+        scenario (Scenario, for the conditions)
+        tickSeconds (stage_tracker loop time)
+    Yields:
+        stage (1-6), startTick, endTick, active (stage started before the end of the run), one array entry per intersection
+    """
+    defaults = plans[:, :6]
+    timings = defaults.copy() # trafficTimings starts at the defaults, stage_tracker_reset only resets the buffer
+    stage = np.ones(len(plans), dtype=np.int64)
+    startTick = np.zeros(len(plans), dtype=np.int64)
+    rows = np.arange(len(plans))
+
+    while True:
+        active = startTick * tickSeconds < durations
+        if not active.any():
+            return
+        endTick = _end_tick(startTick, timings[rows, stage-1], tickSeconds)
+        yield stage, startTick, endTick, active
+
+        # Buffer for the next stage, from the ticks of this one (the transition tick in, up to the tick before the transition out)
+        nightFirst = _first_true(scenario.is_night, startTick, endTick - 1, tickSeconds)
+        hotFirst = _first_true(scenario.is_hot, startTick, endTick - 1, tickSeconds)
+        night = nightFirst >= 0
+        hotAdded = (hotFirst >= 0) & (~night | (hotFirst >= nightFirst))
+        nextTimings = defaults.copy()
+        nextTimings[:, 0] = np.where(night, plans[:, 6], defaults[:, 0]) + np.where(hotAdded, plans[:, 8], 0)
+        nextTimings[:, 3] = np.where(night, plans[:, 7], defaults[:, 3]) + np.where(hotAdded, plans[:, 8], 0)
+
+        timings = np.where(active[:, None], nextTimings, timings)
+        startTick = np.where(active, endTick, startTick)
+        stage = np.where(active, stage % 6 + 1, stage)
+
+def simulate(plans, scenario, tickSeconds=tickSeconds, saturationFlow=saturationFlow):
+    """
+    Function to simulate every plan against every run of a scenario at once.
+    Queues are treated as fluid within a stage: arrivals come in evenly, a green queue clears at saturationFlow and pedestrians all cross as soon as theirs is green.
+    Parameters:
+        plans (list of plans, each the planFields values)
+        scenario (Scenario)
+        tickSeconds (stage_tracker loop time)
+        saturationFlow (vehicles per second a green queue clears at)
+    Returns:
+        results (list of dicts, one per plan: plan, throughputPerHour, averageDelay (s per vehicle), pedestrianWait (s per pedestrian), cycleLength (s))
+    """
+    plans = _check_plans(plans)
+    runs = scenario.runs
+    intersections = np.repeat(plans, runs, axis=0)
+    runIndex = np.tile(np.arange(runs), len(plans))
+    durations = scenario.runDurations[runIndex]
+    lights = np.array(outputstage.stageLights)
+    serviceRate = np.array([saturationFlow, saturationFlow, np.inf])
+
+    # All the runs' arrivals in one sorted array per approach, each run shifted past the last, so they can all be counted with one searchsorted
+    runOffset = scenario.duration * 2
+    allArrivals = [np.concatenate([scenario.arrivals[run][approach] + run*runOffset for run in range(runs)]) for approach in range(3)]
+
+    queue = np.zeros((3, len(intersections)))
+    departed = np.zeros((3, len(intersections)))
+    waitTime = np.zeros((3, len(intersections))) # Total time spent queueing (area under the queue)
+    cycles = np.zeros(len(intersections))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for stage, startTick, endTick, active in _stage_steps(intersections, durations, scenario, tickSeconds):
+            startTime = startTick * tickSeconds
+            endTime = np.minimum(endTick * tickSeconds, durations)
+            length = np.where(active, endTime - startTime, 0.0)
+            cycles += active & (stage == 1)
+
+            for approach in range(3):
+                arrivals = (np.searchsorted(allArrivals[approach], endTime + runIndex*runOffset) - np.searchsorted(allArrivals[approach], startTime + runIndex*runOffset)) * active
+                green = lights[stage-1, greenLightIndex[approach]] == 1
+                clearRate = np.where(green, serviceRate[approach], 0.0)
+                startQueue = queue[approach]
+                netRate = np.where(length > 0, arrivals / length, 0.0) - clearRate
+                clearTime = np.where(netRate < 0, startQueue / -netRate, np.inf)
+                cleared = clearTime < length
+                endQueue = np.where(cleared, 0.0, startQueue + netRate*length)
+                area = np.where(cleared, startQueue*clearTime/2, (startQueue + endQueue)/2*length)
+
+                departed[approach] += np.where(active, startQueue + arrivals - endQueue, 0.0)
+                waitTime[approach] += np.where(active, area, 0.0)
+                queue[approach] = np.where(active, endQueue, startQueue)
+
+    # Combine each plan's runs
+    def per_plan(values):
+        return values.reshape(len(plans), runs).sum(axis=1)
+    vehicles = per_plan(departed[MAIN] + departed[SIDE])
+    vehicleWait = per_plan(waitTime[MAIN] + waitTime[SIDE])
+    pedestrians = per_plan(departed[PED])
+    pedestrianWait = per_plan(waitTime[PED])
+    planCycles = per_plan(cycles)
+    hours = scenario.runDurations.sum() / 3600 # Per plan
+
+    results = []
+    for i, plan in enumerate(plans):
+        results.append({
+            "plan": dict(zip(planFields, plan.tolist())),
+            "throughputPerHour": float(vehicles[i] / hours),
+            "averageDelay": float(vehicleWait[i] / vehicles[i]) if vehicles[i] else 0.0,
+            "pedestrianWait": float(pedestrianWait[i] / pedestrians[i]) if pedestrians[i] else 0.0,
+            "cycleLength": float(hours * 3600 / planCycles[i]) if planCycles[i] else 0.0,
+        })
+    return results
+
+def stage_sequence(plan, scenario, tickSeconds=tickSeconds):
+    """
+    Function to get the stage sequence the simulator runs one plan through.
+    Parameters:
+        plan (planFields values)
+        scenario (Scenario, only the duration and conditions are used)
+        tickSeconds (stage_tracker loop time)
+    Returns:
+        sequence (list of (start tick, stage, lights))
+    """
+    plans = _check_plans([plan])
+    return [(int(startTick[0]), int(stage[0]), outputstage.stageLights[stage[0]-1])
+            for stage, startTick, endTick, active in _stage_steps(plans, np.array([scenario.duration]), scenario, tickSeconds) if active[0]]
+
+class _TickClock:
+    """
+    Stands in for the time module in outputstage so stage_tracker runs on exact loop ticks.
+    """
+    def __init__(self, tickSeconds):
+        self.tick = 0
+        self.tickSeconds = tickSeconds
+
+    def perf_counter(self):
+        return self.tick * self.tickSeconds
+
+    def time(self):
+        return self.tick * self.tickSeconds
+
+def check_against_stage_tracker(plan, scenario, tickSeconds=tickSeconds):
+    """
+    Function to run outputstage's own stage_tracker_reset and stage_timing_update on exact loop ticks through a scenario's conditions
+    and check they give the same stage sequence as the simulator. The lights come from outputstage.stageLights for both, as stage_tracker sets them.
+    Parameters:
+        plan (planFields values)
+        scenario (Scenario)
+        tickSeconds (stage_tracker loop time)
+    Returns:
+        sequence (list of (start tick, stage, lights) both agree on)
+    Raises:
+        AssertionError if they don't match
+    """
+    import setup
+    from intersectionstate import IntersectionState
+    from ringbuffer import RingBuffer
+
+    plan = _check_plans([plan])[0].tolist()
+    state = IntersectionState(None, None, (9, 6, 10, 7, 8), 2, 11, RingBuffer(1))
+    state.trafficTimingsDefault = plan[:6]
+    state.trafficTimings = plan[:6]
+    state.nightGreenTimings = (plan[6], plan[7])
+    state.hotGreenExtra = plan[8]
+
+    clock = _TickClock(tickSeconds)
+    tickTimes = np.arange(int(np.ceil(scenario.duration / tickSeconds)) + 1) * tickSeconds
+    nightTicks = scenario.is_night(tickTimes).tolist()
+    hotTicks = scenario.is_hot(tickTimes).tolist()
+    realTime = outputstage.time
+    realTimingMode = getattr(setup, "timingMode", None)
+    trackerSequence = []
+    try:
+        outputstage.time = clock
+        setup.timingMode = "fixed"
+        while clock.perf_counter() < scenario.duration:
+            # Conditions as inputstage would have left them this tick
+            state.dayNightStatus = "night" if nightTicks[clock.tick] else "day"
+            state.pastThermReading.append(state.hotTemperature + 1 if hotTicks[clock.tick] else state.hotTemperature - 1)
+            if clock.tick == 0:
+                outputstage.stage_tracker_reset(state)
+                trackerSequence.append((0, state.curStage, outputstage.stageLights[state.curStage-1]))
+            elif outputstage.stage_timing_update(state):
+                trackerSequence.append((clock.tick, state.curStage, outputstage.stageLights[state.curStage-1]))
+            clock.tick += 1
+    finally:
+        outputstage.time = realTime
+        setup.timingMode = realTimingMode
+
+    simulatedSequence = stage_sequence(plan, scenario, tickSeconds)
+    if simulatedSequence != trackerSequence:
+        for i, (simulated, tracked) in enumerate(zip(simulatedSequence, trackerSequence)):
+            if simulated != tracked:
+                raise AssertionError("Stage " + str(i) + " differs: simulator " + str(simulated) + ", stage_tracker " + str(tracked))
+        raise AssertionError("Simulator gave " + str(len(simulatedSequence)) + " stages, stage_tracker " + str(len(trackerSequence)))
+    return trackerSequence
+
+def grid_plans(**fieldValues):
+    """
+    Function to make every combination of the given values, other fields are left at defaultPlan.
+    Parameters:
+        fieldValues (planFields name -> list of values, e.g. stage1=[10,15,20])
+    Returns:
+        plans (numpy array, one plan per row)
+    """
+    for name in fieldValues:
+        if name not in planFields:
+            raise ValueError("Unknown plan field '" + name + "'")
+    values = [fieldValues.get(name, [default]) for name, default in zip(planFields, defaultPlan)]
+    return np.array(list(itertools.product(*values)), dtype=np.float64)
+
+def random_plans(count, bounds, seed=0):
+    """
+    Function to make random plans, other fields are left at defaultPlan.
+    Parameters:
+        count (number of plans)
+        bounds (planFields name -> (lowest, highest), values are whole seconds)
+        seed (random seed)
+    Returns:
+        plans (numpy array, one plan per row)
+    """
+    rng = np.random.default_rng(seed)
+    plans = np.tile(np.array(defaultPlan, dtype=np.float64), (count, 1))
+    for name, (lowest, highest) in bounds.items():
+        plans[:, planFields.index(name)] = rng.integers(lowest, highest + 1, count)
+    return plans
+
+def search(plans, scenario, workers=None, chunkSize=None, blockDays=1, tickSeconds=tickSeconds, saturationFlow=saturationFlow):
+    """
+    Function to simulate many plans across a process pool, each worker simulating a chunk of plans against every run at once.
+    Parameters:
+        plans (list of plans)
+        scenario (Scenario)
+        workers (processes, None for one per core)
+        chunkSize (plans per worker job, None to split evenly)
+        blockDays (days long scenarios are split into, see Scenario.split_days, None to simulate each run straight through)
+        tickSeconds, saturationFlow (see simulate)
+    Returns:
+        results (simulate's results for every plan, lowest average delay first)
+    """
+    plans = _check_plans(plans)
+    if blockDays:
+        scenario = scenario.split_days(blockDays) # Time taken goes with the scenario length, not the number of runs, so many short runs are much quicker
+    workers = workers or os.cpu_count() or 1
+    chunkSize = chunkSize or max(1, int(np.ceil(len(plans) / workers)))
+    chunks = [plans[start:start + chunkSize] for start in range(0, len(plans), chunkSize)]
+
+    results = []
+    context = multiprocessing.get_context("spawn") # Same as the supervisor, nothing inherited from this process
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+        for chunkResults in executor.map(simulate, chunks, itertools.repeat(scenario), itertools.repeat(tickSeconds), itertools.repeat(saturationFlow)):
+            results += chunkResults
+    return sorted(results, key=lambda result: result["averageDelay"])
+
+def result_lines(results):
+    """
+    Gets search results as a table, one line per plan.
+    Parameters:
+        results (list of result dicts)
+    Returns:
+        lines (list of strings)
+    """
+    lines = ['{:<34}{:>10}{:>10}{:>10}{:>10}{:>9}{:>9}'.format("stage 1-6 (s)", "night", "hot", "veh/h", "delay s", "ped s", "cycle")]
+    for result in results:
+        plan = result["plan"]
+        stages = ",".join('{:g}'.format(plan["stage" + str(stage)]) for stage in range(1, 7))
+        lines.append('{:<34}{:>10}{:>10g}{:>10.1f}{:>10.1f}{:>9.1f}{:>9.1f}'.format(
+            stages, '{:g}/{:g}'.format(plan["nightMainGreen"], plan["nightSideGreen"]), plan["hotGreenExtra"],
+            result["throughputPerHour"], result["averageDelay"], result["pedestrianWait"], result["cycleLength"]))
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline timing plan simulator and search.")
+    parser.add_argument("--hours", type=float, default=100, help="length of each arrival run")
+    parser.add_argument("--runs", type=int, default=4, help="random arrival runs every plan is simulated against")
+    parser.add_argument("--rates", type=float, nargs=3, default=[600, 150, 60], metavar=("MAIN", "SIDE", "PED"), help="arrivals per hour")
+    parser.add_argument("--night", type=int, nargs=2, default=[19, 7], metavar=("START", "END"), help="night hours")
+    parser.add_argument("--hot", type=int, nargs="*", default=[], help="hot hours of the day")
+    parser.add_argument("--log", help="replay arrivals from this sensor log directory instead of random ones")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="FIELD=V1,V2", help="plan values to try every combination of, e.g. stage1=10,15,20")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="also try N random plans within the --grid values' ranges")
+    parser.add_argument("--workers", type=int, help="worker processes")
+    parser.add_argument("--block-days", type=int, default=1, help="days long runs are split into to simulate side by side, 0 to run them straight through")
+    parser.add_argument("--top", type=int, default=10, help="plans to show")
+    parser.add_argument("--output", help="JSON file to save every plan's results to")
+    parser.add_argument("--check", action="store_true", help="check the simulator against outputstage's stage_tracker first")
+    args = parser.parse_args()
+
+    if args.log:
+        scenario = recorded_scenario(args.log, args.hours)
+    else:
+        scenario = synthetic_scenario(args.hours, args.rates, args.runs, nightHours=tuple(args.night), hotHours=args.hot)
+
+    if args.check:
+        checkScenario = Scenario([[np.zeros(0)]*3], 86400, scenario.nightHours, scenario.hotHours or [13, 14])
+        checked = check_against_stage_tracker(defaultPlan, checkScenario)
+        print("Simulator matches stage_tracker over " + str(len(checked)) + " stages (1 day).")
+
+    fieldValues = {}
+    for item in args.grid:
+        name, values = item.split("=")
+        fieldValues[name] = [float(value) for value in values.split(",")]
+    plans = grid_plans(**fieldValues)
+    if args.random:
+        bounds = {name: (min(values), max(values)) for name, values in fieldValues.items()}
+        plans = np.concatenate([plans, random_plans(args.random, bounds)])
+
+    startTime = time.perf_counter()
+    results = search(plans, scenario, args.workers, blockDays=args.block_days)
+    print("Simulated " + str(len(plans)) + " plans x " + str(scenario.runs) + " runs x " + '{:g}'.format(scenario.duration / 3600) + " hours in " + str(round(time.perf_counter() - startTime, 1)) + "s.")
+    print("\n".join(result_lines(results[:args.top])))
+    if args.output:
+        with open(args.output, "w") as resultsFile:
+            json.dump(results, resultsFile, indent=2)
+        print("\nSaved results to " + args.output)
@@ -0,0 +1,296 @@
+# Virtual board script
+# This script is a stand in for the pymata4 board so the project can run (and be benchmarked) without an Arduino.
+# It models the serial link at a set baud rate, simulates the 74HC595 shift registers and plays back scripted sensor waveforms.
+# Use it by running with the BOARD_BACKEND=virtual environment variable, or pass a VirtualBoard to setup.connect_board().
+# Created by Emrys Pham
+# Creation date: 18/10/2026
+# Version: 1.0
+
+# Imports
+from collections import deque
+import threading
+import time
+from pymata4.private_constants import PrivateConstants
+
+import bulkshift
+import portwrite
+import sonarping
+
+class VirtualBoard:
+    """
+    Simulated Firmata board with the pymata4 methods this project uses.
+    Every message is counted (messagesSent, bytesSent) and takes bytes * 10 / baud seconds of link time (linkBusyTime).
+    With realtime=True writes also block until the simulated link has caught up, like a full serial buffer would.
+    Sensor values come from waveform functions of the time since the board was made, see set_waveform().
+    Sonar ping schedules (sonarping.py) are run like firmware/sonarping.h would, with echo reports going to the report_dispatch handler.
+    """
+
+    def __init__(self, baud_rate=500000, realtime=False, shiftRegisterPins=(9, 6, 10, 7, 8), reportInterval=0.019, latchHistoryLength=10000):
+        """
+        Parameters:
+            baud_rate (simulated serial baud rate)
+            realtime (block writes to the simulated link speed)
+            shiftRegisterPins (sevenSegSer, lightSer, sSegControl, srclk, rclk), as wired in setup.initialise
+            reportInterval (time between input reports to callbacks, Firmata's default sampling interval is 19ms)
+            latchHistoryLength (number of latched shift register states kept in latchHistory)
+        """
+        self.baudRate = baud_rate
+        self.realtime = realtime
+        self.reportInterval = reportInterval
+        self.startTime = time.perf_counter()
+
+        # Serial link model
+        self.messagesSent = 0
+        self.bytesSent = 0
+        self.linkBusyTime = 0.0
+        self._linkFreeAt = 0.0
+        self._lock = threading.RLock()
+
+        # Pins
+        self.pinLevels = [0] * 128
+        self.outputPins = set()
+        self.pinModes = {}
+        self._waveforms = {} # (pin type, pin) -> function of time
+        self._lastValues = {} # (pin type, pin) -> [value, timestamp]
+        self._callbacks = {} # (pin type, pin) -> callback
+        self.analogReporting = set()
+
+        # Shift registers, each a list of Q0-Q7
+        self.sevenSegSer, self.lightSer, self.sSegControl, self.srclk, self.rclk = shiftRegisterPins
+        self.shiftRegisters = [[0]*8, [0]*8, [0]*8]
+        self.latchedRegisters = [[0]*8, [0]*8, [0]*8]
+        self.latchCount = 0
+        self.latchHistory = deque(maxlen=latchHistoryLength) # (time since start, 7 seg outputs, light outputs, 7 seg control outputs)
+
+        self._reporter = None
+        self._shutdown = False
+
+        # Sonar ping scheduler firmware
+        self.report_dispatch = {} # sysex command -> [handler, data length], like pymata4's
+        self._pingSchedule = ([], 0, 0) # (pins, gap in ms, timeout in us)
+        self._pinger = None
+
+    # Serial link model
+    def _transmit(self, byteCount):
+        with self._lock:
+            now = time.perf_counter()
+            sendTime = byteCount * 10.0 / self.baudRate # 8N1, 10 bits per byte
+            self.messagesSent += 1
+            self.bytesSent += byteCount
+            self.linkBusyTime += sendTime
+            self._linkFreeAt = max(self._linkFreeAt, now) + sendTime
+            waitTime = self._linkFreeAt - now
+        if self.realtime and waitTime > 0:
+            time.sleep(waitTime)
+
+    # Simulated pin and shift register behaviour
+    def _set_level(self, pin, level):
+        previous = self.pinLevels[pin]
+        self.pinLevels[pin] = level
+        if level == 1 and previous == 0:
+            if pin == self.srclk:
+                # Each clock moves Qn to Qn+1 and shifts the serial line into Q0
+                for register, serPin in zip(self.shiftRegisters, (self.sevenSegSer, self.lightSer, self.sSegControl)):
+                    register.insert(0, self.pinLevels[serPin])
+                    register.pop()
+            elif pin == self.rclk:
+                self.latchedRegisters = [register.copy() for register in self.shiftRegisters]
+                self.latchCount += 1
+                self.latchHistory.append((time.perf_counter() - self.startTime, tuple(self.latchedRegisters[0]), tuple(self.latchedRegisters[1]), tuple(self.latchedRegisters[2])))
+
+    def _write_port(self, port, value):
+        # Like Firmata, the output pins of the port are written in ascending pin order
+        for pin in range(port * 8, port * 8 + 8):
+            if pin in self.outputPins:
+                self._set_level(pin, (value >> (pin % 8)) & 1)
+
+    def latched(self):
+        """
+        Gets the latched shift register outputs.
+        Parameters:
+            None
+        Returns:
+            (7 seg outputs, light outputs, 7 seg control outputs), each a list of Q0-Q7 (light outputs are in lightsInputArray order)
+        """
+        with self._lock:
+            return [register.copy() for register in self.latchedRegisters]
+
+    # pymata4 write methods
+    def digital_write(self, pin, value):
+        port = portwrite.set_pin(pin, value)
+        self._send_command((PrivateConstants.DIGITAL_MESSAGE + port, portwrite.portShadow[port] & 0x7f, (portwrite.portShadow[port] >> 7) & 0x7f))
+
+    def digital_pin_write(self, pin, value):
+        self._transmit(3)
+        with self._lock:
+            if pin in self.outputPins:
+                self._set_level(pin, value)
+
+    def _send_command(self, command):
+        command = list(command)
+        self._transmit(len(command))
+        with self._lock:
+            if PrivateConstants.DIGITAL_MESSAGE <= command[0] < PrivateConstants.DIGITAL_MESSAGE + 16:
+                self._write_port(command[0] - PrivateConstants.DIGITAL_MESSAGE, command[1] | (command[2] << 7))
+
+    def _send_sysex(self, sysex_command, sysex_data=None):
+        if not sysex_data:
+            sysex_data = []
+        self._transmit(len(sysex_data) + 3)
+        if sysex_command == bulkshift.BULK_SHIFT:
+            with self._lock:
+                for pin, value in bulkshift.decode_bulk_shift(sysex_data):
+                    self._set_level(pin, value)
+        elif sysex_command == sonarping.SONAR_SCHEDULE:
+            self._pingSchedule = sonarping.decode_schedule(sysex_data)
+            if self._pinger is None:
+                self._pinger = threading.Thread(target=self._ping_sonars, daemon=True)
+                self._pinger.start()
+
+    def set_pin_mode_digital_output(self, pin_number):
+        self._transmit(3)
+        self.outputPins.add(pin_number)
+        self.pinModes[pin_number] = "output"
+
+    def set_pin_mode_digital_input(self, pin_number, callback=None):
+        self._set_input_mode(PrivateConstants.INPUT, pin_number, callback)
+
+    def set_pin_mode_digital_input_pullup(self, pin_number, callback=None):
+        self._set_input_mode(PrivateConstants.INPUT, pin_number, callback)
+
+    def set_pin_mode_analog_input(self, pin_number, callback=None, differential=1):
+        self._set_input_mode(PrivateConstants.ANALOG, pin_number, callback)
+        self.analogReporting.add(pin_number)
+
+    def set_pin_mode_sonar(self, trigger_pin, echo_pin, callback=None, timeout=80000):
+        self._set_input_mode(PrivateConstants.SONAR, trigger_pin, callback)
+        self.pinModes[echo_pin] = "sonar"
+
+    def _set_input_mode(self, pinType, pin, callback):
+        self._transmit(3)
+        self.outputPins.discard(pin)
+        self.pinModes[pin] = pinType
+        self._lastValues.setdefault((pinType, pin), [0, 0])
+        if callback is not None:
+            self._callbacks[(pinType, pin)] = callback
+            if self._reporter is None:
+                self._reporter = threading.Thread(target=self._report_inputs, daemon=True)
+                self._reporter.start()
+
+    def enable_analog_reporting(self, pin, callback=None, differential=1):
+        self._transmit(2)
+        self.analogReporting.add(pin)
+
+    def disable_analog_reporting(self, pin):
+        self._transmit(2)
+        self.analogReporting.discard(pin)
+
+    def set_sampling_interval(self, interval):
+        self._transmit(5)
+        self.reportInterval = interval / 1000.0
+
+    def shutdown(self):
+        self._shutdown = True
+        if self._reporter is not None:
+            self._reporter.join()
+        if self._pinger is not None:
+            self._pinger.join()
+
+    # Scripted sensor waveforms
+    def set_waveform(self, pinType, pin, waveform):
+        """
+        Sets the function a sensor's value comes from.
+        Parameters:
+            pinType ("digital", "analog" or "sonar")
+            pin (pin number as used with the read method, the trigger pin for sonars)
+            waveform (function of the time since the board was made, in s, giving the raw value (0/1, 0-1023 or cm))
+        Returns:
+            None
+        """
+        pinTypes = {"digital": PrivateConstants.INPUT, "analog": PrivateConstants.ANALOG, "sonar": PrivateConstants.SONAR}
+        self._waveforms[(pinTypes[pinType], pin)] = waveform
+
+    def _sample(self, pinType, pin):
+        """
+        Gets the current [value, timestamp] of an input. The timestamp is when the value last changed, like pymata4.
+        """
+        lastValue = self._lastValues.setdefault((pinType, pin), [0, 0])
+        waveform = self._waveforms.get((pinType, pin))
+        if waveform is not None:
+            value = waveform(time.perf_counter() - self.startTime)
+            if pinType != PrivateConstants.SONAR or value != 0: # pymata4 ignores 0 (no echo) sonar reports
+                if value != lastValue[0]:
+                    lastValue[0] = value
+                    lastValue[1] = time.time()
+                    return lastValue, True
+        return lastValue, False
+
+    def _report_inputs(self):
+        """
+        Reporter thread, calls the pin callbacks when an input's value changes (like pymata4 does when Firmata reports it).
+        """
+        while not self._shutdown:
+            for (pinType, pin), callback in list(self._callbacks.items()):
+                if pinType == PrivateConstants.ANALOG and pin not in self.analogReporting:
+                    continue
+                lastValue, changed = self._sample(pinType, pin)
+                if changed:
+                    callback([pinType, pin, lastValue[0], lastValue[1]])
+            time.sleep(self.reportInterval)
+
+    def _ping_sonars(self):
+        """
+        Ping scheduler thread, pings the scheduled sonars' waveforms in turn like firmware/sonarping.h. A waveform value of 0 is no echo.
+        """
+        index = 0
+        while not self._shutdown:
+            pins, gapMillis, timeoutMicros = self._pingSchedule
+            if not pins:
+                time.sleep(0.01)
+                continue
+            index %= len(pins)
+            triggerTime = time.perf_counter()
+            waveform = self._waveforms.get((PrivateConstants.SONAR, pins[index][0]))
+            distance = int(waveform(triggerTime - self.startTime)) if waveform is not None else 0
+            echoMicros = distance * sonarping.MICROS_PER_CM
+            if distance <= 0 or echoMicros > timeoutMicros:
+                distance = 0
+                echoMicros = timeoutMicros
+            time.sleep(echoMicros / 1e6)
+
+            handler = self.report_dispatch.get(sonarping.SONAR_ECHO)
+            if handler is not None:
+                handler[0](sonarping.encode_echo(index, distance, int((triggerTime - self.startTime) * 1e6) & 0xfffffff))
+            index += 1
+            time.sleep(gapMillis / 1000)
+
+    # pymata4 read methods
+    def digital_read(self, pin):
+        return list(self._sample(PrivateConstants.INPUT, pin)[0])
+
+    def analog_read(self, pin):
+        return tuple(self._sample(PrivateConstants.ANALOG, pin)[0])
+
+    def sonar_read(self, trigger_pin):
+        return list(self._sample(PrivateConstants.SONAR, trigger_pin)[0])
+
+# Same wiring as setup.initialise
+defaultPins = {"sevenSegSer": 9, "rclk": 8, "srclk": 7, "sSegControl": 10, "lightSer": 6, "thermPin": 1, "LDRPin": 0, "sonar1Trig": 5, "sonar2Trig": 13}
+
+def default_virtual_board(baud_rate=500000, pinMap=None):
+    """
+    Function to make a virtual board with steady, plausible sensor values for this project's wiring.
+    Parameters:
+        baud_rate (simulated serial baud rate)
+        pinMap (optional dict of pin name -> pin for a different wiring, as given to setup.initialise)
+    Returns:
+        board (VirtualBoard)
+    """
+    pins = dict(defaultPins)
+    pins.update(pinMap or {})
+    board = VirtualBoard(baud_rate=baud_rate, realtime=True, shiftRegisterPins=(pins["sevenSegSer"], pins["lightSer"], pins["sSegControl"], pins["srclk"], pins["rclk"]))
+    board.set_waveform("analog", pins["thermPin"], lambda t: 100) # Thermistor, about 23 degrees
+    board.set_waveform("analog", pins["LDRPin"], lambda t: 300) # LDR, about 1.5V (day)
+    board.set_waveform("sonar", pins["sonar1Trig"], lambda t: 100) # Approach ultrasonic, nothing close
+    board.set_waveform("sonar", pins["sonar2Trig"], lambda t: 100) # Height ultrasonic
+    return board